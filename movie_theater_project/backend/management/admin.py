@@ -4,7 +4,7 @@ from django.utils.html import format_html
 from .models import (
     User, Movie, Genre, Seat, Review, Showtime, Booking, Notification,
     Actor, Director, Producer, Payment, watchlist, Role, Auditorium, Theater,
-    RateService, Favourite, News
+    RateService, Favourite, News, SeatLayout, PriceRule
 )
 
 
@@ -80,6 +80,8 @@ class SeatAdmin(admin.ModelAdmin):
 
 
 class SeatInline(admin.TabularInline):
+    # for auditoriums with a layout only held/booked seats have a row;
+    # the rest of the hall is summarised by ShowtimeAdmin.seat_summary
     model = Seat
     fields = ('seat_number', 'is_booked', 'price',)
     readonly_fields = ('seat_number', 'is_booked', 'price',)
@@ -99,8 +101,20 @@ class ShowtimeAdmin(admin.ModelAdmin):
         'language', 'auditorium',
     )
     search_fields = ('movie__title',)
+    readonly_fields = ('seat_summary',)
     inlines = [SeatInline]
 
+    def seat_summary(self, obj):
+        layout = obj.seat_layout
+        booked = obj.seats.filter(is_booked=True).count()
+        if layout is None:
+            return f"{booked} of {obj.seats.count()} seats booked"
+        return (
+            f"{booked} of {layout.capacity} seats booked "
+            f"({layout.rows} rows x {layout.columns} columns)"
+        )
+    seat_summary.short_description = "Seats"
+
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
@@ -207,10 +221,17 @@ class RoleAdmin(admin.ModelAdmin):
     search_fields = ('actor__name', 'movie__title', 'character_name')
 
 
+class SeatLayoutInline(admin.StackedInline):
+    model = SeatLayout
+    fields = ('rows', 'columns', 'default_price', 'price_tiers', 'blocked_seats')
+    extra = 0
+
+
 @admin.register(Auditorium)
 class AuditoriumAdmin(admin.ModelAdmin):
     list_display = ('name', 'total_seats', 'available_seats', 'theater')
     search_fields = ('name', 'theater__name')
+    inlines = [SeatLayoutInline]
 
 
 @admin.register(Theater)
@@ -219,6 +240,13 @@ class TheaterAdmin(admin.ModelAdmin):
     search_fields = ('name', 'location')
 
 
+@admin.register(PriceRule)
+class PriceRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'applies_to', 'theater', 'start_hour', 'end_hour', 'amount', 'percent', 'is_active')
+    list_filter = ('applies_to', 'is_active', 'theater')
+    search_fields = ('name',)
+
+
 @admin.register(RateService)
 class RateServiceAdmin(admin.ModelAdmin):
     list_display = (
@@ -0,0 +1,97 @@
+"""
+Race-free seat allocation.
+
+Seats are claimed with a single conditional ``UPDATE ... WHERE is_booked =
+false``: the database decides which request gets a contended seat, so no
+row has to be read and locked first and two overlapping bookings can never
+both succeed. ``Showtime.available_seats`` is only ever moved by the number
+of rows such an update actually changed, which keeps the counter in step
+with the seats.
+
+Both functions expect to run inside the caller's transaction, so the seats
+and the booking that references them commit together.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from . import seatmap
+from .models import Seat, Showtime
+
+
+class SeatConflict(Exception):
+    """Raised when some of the requested seats could not be claimed."""
+
+    def __init__(self, conflicts):
+        super().__init__("One or more seats are not available.")
+        # {seat_number: 'booked' | 'unknown'}; empty when every seat was
+        # free but the showtime had no capacity left
+        self.conflicts = conflicts
+
+
+class _Incomplete(Exception):
+    pass
+
+
+def describe_conflicts(showtime_id, seat_ids):
+    """Explain, per seat, why the given seats cannot be claimed."""
+    found = {
+        seat_id: (seat_number, is_booked)
+        for seat_id, seat_number, is_booked in Seat.objects.filter(
+            showtime_id=showtime_id, id__in=seat_ids
+        ).values_list('id', 'seat_number', 'is_booked')
+    }
+    conflicts = {}
+    for seat_id in seat_ids:
+        if seat_id not in found:
+            conflicts[str(seat_id)] = 'unknown'
+        elif found[seat_id][1]:
+            conflicts[found[seat_id][0]] = 'booked'
+    return conflicts
+
+
+def claim(showtime_id, seat_ids):
+    """
+    Mark all of ``seat_ids`` booked, or none of them. Raises SeatConflict
+    naming the seats that were taken or do not belong to the showtime.
+    """
+    seat_ids = set(seat_ids)
+    if not seat_ids:
+        return 0
+    try:
+        with transaction.atomic():
+            claimed = Seat.objects.filter(
+                showtime_id=showtime_id, id__in=seat_ids, is_booked=False
+            ).update(is_booked=True)
+            if claimed != len(seat_ids):
+                raise _Incomplete
+            updated = Showtime.objects.filter(
+                pk=showtime_id, available_seats__gte=claimed
+            ).update(available_seats=F('available_seats') - claimed)
+            if not updated:
+                raise _Incomplete
+    except _Incomplete:
+        # the savepoint is rolled back, so this sees the other bookings only
+        raise SeatConflict(describe_conflicts(showtime_id, seat_ids))
+    # only this showtime's seat map changes; the catalog's showtime lists
+    # pick up the new available_seats when their conditional window expires
+    seatmap.invalidate(showtime_id)
+    return claimed
+
+
+def release(showtime_id, seat_ids):
+    """
+    Free the given seats and give back exactly as many to the showtime as
+    were booked. Returns the number of seats released.
+    """
+    seat_ids = set(seat_ids)
+    if not seat_ids:
+        return 0
+    released = Seat.objects.filter(
+        showtime_id=showtime_id, id__in=seat_ids, is_booked=True
+    ).update(is_booked=False)
+    if released:
+        Showtime.objects.filter(pk=showtime_id).update(
+            available_seats=F('available_seats') + released
+        )
+        seatmap.invalidate(showtime_id)
+    return released
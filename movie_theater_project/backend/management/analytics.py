@@ -0,0 +1,97 @@
+"""
+Seat utilization analytics.
+
+Occupancy is measured per showtime as the auditorium capacity minus the
+seats still available, and summed per auditorium or per theater with
+grouped queries: one for the summary rows and one for the hour-by-weekday
+breakdown of all the rows on a page, however many halls there are.
+"""
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import Cast, ExtractHour, ExtractWeekDay, NullIf
+
+from .models import Showtime
+
+GROUPS = {
+    'auditorium': ('auditorium_id', 'auditorium__name'),
+    'theater': ('auditorium__theater_id', 'auditorium__theater__name'),
+}
+
+ORDERINGS = {
+    'occupancy': ('-occupancy_rate', 'id'),
+    '-occupancy': ('occupancy_rate', 'id'),
+    'name': ('name', 'id'),
+    'seats': ('-seats', 'id'),
+}
+
+PEAK_HOURS = 3
+
+
+def _occupancy(queryset):
+    return queryset.annotate(
+        showtimes=Count('id'),
+        seats=Sum('auditorium__total_seats'),
+        booked=Sum(F('auditorium__total_seats') - F('available_seats')),
+    ).annotate(
+        occupancy_rate=Cast('booked', FloatField()) / NullIf(Cast('seats', FloatField()), 0.0),
+    )
+
+
+def showtimes(start=None, end=None, theater=None, auditorium=None):
+    """Showtimes with a hall, starting in ``[start, end)`` if given."""
+    queryset = Showtime.objects.filter(auditorium__isnull=False)
+    if start:
+        queryset = queryset.filter(start_time__gte=start)
+    if end:
+        queryset = queryset.filter(start_time__lt=end)
+    if theater:
+        queryset = queryset.filter(auditorium__theater_id=theater)
+    if auditorium:
+        queryset = queryset.filter(auditorium_id=auditorium)
+    return queryset
+
+
+def utilization(queryset, group='auditorium', ordering='occupancy'):
+    """One row per auditorium or theater: id, name, showtimes, seats, booked, occupancy_rate."""
+    key, name = GROUPS[group]
+    return _occupancy(
+        queryset.filter(**{f'{key}__isnull': False}).values(key, name).order_by()
+    ).values(
+        'showtimes', 'seats', 'booked', 'occupancy_rate', id=F(key), name=F(name),
+    ).order_by(*ORDERINGS[ordering])
+
+
+def breakdown(queryset, group, ids):
+    """
+    Peak hours and a weekday/hour heatmap for each of ``ids``, from a
+    single query. Weekdays run from 1 (Sunday) to 7 (Saturday), in local
+    time.
+    """
+    key, _ = GROUPS[group]
+    rows = _occupancy(
+        queryset.filter(**{f'{key}__in': ids})
+        .annotate(weekday=ExtractWeekDay('start_time'), hour=ExtractHour('start_time'))
+        .values(key, 'weekday', 'hour').order_by()
+    ).order_by(key, 'weekday', 'hour')
+
+    heatmaps = {pk: [] for pk in ids}
+    hours = {pk: {} for pk in ids}
+    for row in rows:
+        heatmaps[row[key]].append({
+            'weekday': row['weekday'],
+            'hour': row['hour'],
+            'showtimes': row['showtimes'],
+            'occupancy_rate': row['occupancy_rate'] or 0,
+        })
+        hour = hours[row[key]].setdefault(row['hour'], {'hour': row['hour'], 'seats': 0, 'booked': 0})
+        hour['seats'] += row['seats']
+        hour['booked'] += row['booked']
+
+    result = {}
+    for pk in ids:
+        peaks = [
+            {'hour': h['hour'], 'occupancy_rate': h['booked'] / h['seats'] if h['seats'] else 0}
+            for h in hours[pk].values()
+        ]
+        peaks.sort(key=lambda h: (-h['occupancy_rate'], h['hour']))
+        result[pk] = {'peak_hours': peaks[:PEAK_HOURS], 'heatmap': heatmaps[pk]}
+    return result
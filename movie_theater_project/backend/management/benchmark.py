@@ -0,0 +1,228 @@
+"""
+Endpoint latency benchmark.
+
+Runs the key API endpoints through the Django test client against
+whatever data is in the database (usually made by ``seeding``) and
+reports per endpoint the p50/p95/p99 latency, the queries of one request
+and the peak Python memory it allocated. The requests are authenticated,
+so the anonymous response cache is bypassed and every request does the
+full work. Results are plain JSON; ``compare`` diffs two runs. Used by the
+``benchmark_endpoints`` command.
+"""
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from . import seeding
+from .models import Booking, Movie, Seat, Showtime
+from .stress import percentile
+
+BENCH_USER = 'benchmark'
+BENCH_STAFF = 'benchmark-staff'
+
+
+def clients():
+    """Logged-in clients for a customer and a staff member."""
+    User = get_user_model()
+    customer, _ = User.objects.get_or_create(username=BENCH_USER, defaults={'email_verified': True})
+    staff, _ = User.objects.get_or_create(username=BENCH_STAFF, defaults={'is_staff': True})
+    logged_in = []
+    for user in (customer, staff):
+        client = Client()
+        client.force_login(user)
+        logged_in.append(client)
+    return logged_in
+
+
+def upcoming_showtime_ids(limit=200):
+    return list(
+        Showtime.objects.filter(start_time__gte=timezone.now(), available_seats__gt=0)
+        .order_by('start_time').values_list('id', flat=True)[:limit])
+
+
+def free_seats(count, seats_per_booking=2):
+    """``count`` pairs of ``(showtime_id, seat_ids)`` of free seats, one per booking."""
+    groups, current = [], {}
+    seats = (Seat.objects.filter(is_booked=False, showtime_id__in=upcoming_showtime_ids())
+             .order_by('showtime_id', 'id').values_list('showtime_id', 'id'))
+    for showtime_id, seat_id in seats.iterator():
+        group = current.setdefault(showtime_id, [])
+        group.append(seat_id)
+        if len(group) == seats_per_booking:
+            groups.append((showtime_id, current.pop(showtime_id)))
+            if len(groups) == count:
+                break
+    return groups
+
+
+class Endpoint:
+    """A named endpoint and a way to pick the next request to it."""
+
+    def __init__(self, name, method='get', staff=False):
+        self.name = name
+        self.method = method
+        self.staff = staff
+
+    def prepare(self, rnd, count):
+        """Called once before timing with the number of requests to come."""
+
+    def request(self, rnd):
+        """``(path, data)`` of the next request."""
+        raise NotImplementedError
+
+
+class MovieList(Endpoint):
+
+    def request(self, rnd):
+        return '/api/movies/', {'ordering': rnd.choice(['-review_average', 'title', '-release_date'])}
+
+
+class MovieSearch(Endpoint):
+
+    def request(self, rnd):
+        return '/api/movies/', {'search': rnd.choice(seeding.WORDS)}
+
+
+class ShowtimeFilter(Endpoint):
+
+    def request(self, rnd):
+        day = timezone.localdate() + timedelta(days=rnd.randint(0, 7))
+        return '/api/showtimes/', {'start_time__date': day.isoformat(), 'language': 'English'}
+
+
+class SeatMap(Endpoint):
+
+    def prepare(self, rnd, count):
+        self.showtime_ids = upcoming_showtime_ids() or [0]
+
+    def request(self, rnd):
+        return f'/api/showtimes/{rnd.choice(self.showtime_ids)}/seat-map/', None
+
+
+class BookingCreate(Endpoint):
+
+    def prepare(self, rnd, count):
+        self.groups = free_seats(count)
+
+    def request(self, rnd):
+        showtime_id, seat_ids = self.groups.pop()
+        return '/api/bookings/', {'showtime_id': showtime_id, 'seat_ids': seat_ids}
+
+
+class Dashboard(Endpoint):
+
+    def request(self, rnd):
+        return '/api/admin/dashboard/', None
+
+
+ENDPOINTS = [
+    MovieList('movie_list'),
+    MovieSearch('movie_search'),
+    ShowtimeFilter('showtime_filter'),
+    SeatMap('seat_map'),
+    BookingCreate('booking_create', method='post'),
+    Dashboard('dashboard', staff=True),
+]
+
+
+def measure(endpoint, client, requests=50, warmup=5, seed=0):
+    rnd = random.Random(seed)
+    # the traced request is the last one
+    endpoint.prepare(rnd, warmup + requests + 1)
+    send = getattr(client, endpoint.method)
+
+    def call():
+        path, data = endpoint.request(rnd)
+        return send(path, data) if data is not None else send(path)
+
+    for _ in range(warmup):
+        call()
+    latencies = []
+    statuses = set()
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = call()
+        latencies.append((time.perf_counter() - started) * 1000)
+        statuses.add(response.status_code)
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    latencies.sort()
+    return {
+        'requests': requests,
+        'status': sorted(statuses),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 2),
+        'queries': len(queries),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def volumes():
+    return {
+        'movies': Movie.objects.count(),
+        'showtimes': Showtime.objects.count(),
+        'seats': Seat.objects.count(),
+        'bookings': Booking.objects.count(),
+    }
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=settings.BASE_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names=None, requests=50, warmup=5, seed=0):
+    """Benchmark the endpoints called ``names`` (default: all); returns the report."""
+    customer, staff = clients()
+    results = {}
+    # bookings notify inline, as under test, so no broker is needed
+    with override_settings(NOTIFICATION_OUTBOX_EAGER=True,
+                           ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for endpoint in ENDPOINTS:
+            if names and endpoint.name not in names:
+                continue
+            client = staff if endpoint.staff else customer
+            results[endpoint.name] = measure(endpoint, client, requests, warmup, seed)
+    return {
+        'database': connection.vendor,
+        'commit': commit(),
+        'volumes': volumes(),
+        'endpoints': results,
+    }
+
+
+def compare(baseline, report, tolerance=0.2):
+    """
+    Regressions of ``report`` against ``baseline``: endpoints whose p95
+    grew by more than ``tolerance`` or that run more queries.
+    """
+    regressions = []
+    for name, current in report['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if previous is None:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']} ms -> {current['p95_ms']} ms")
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: {previous['queries']} -> {current['queries']} queries")
+    return regressions
@@ -0,0 +1,137 @@
+"""
+Time-limited seat holds.
+
+While a user is checking out, the seats they picked are held for a few
+minutes in a fast store instead of being locked in the database by a
+pending booking. Holds are taken atomically per seat, expire on their own
+and are promoted to a confirmed ``Booking`` when the payment goes through.
+
+The store is pluggable through ``settings.SEAT_HOLD_STORE``: any class
+with the methods of ``CacheHoldStore``. That default keeps holds in the
+Django cache, so it needs a shared cache (Redis) when more than one
+worker serves the API.
+"""
+import uuid
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import seatmap
+
+
+class HoldConflict(Exception):
+    """Raised when some of the requested seats cannot be held."""
+
+    def __init__(self, conflicts):
+        super().__init__("One or more seats are not available.")
+        # {seat_number: 'booked' | 'held' | 'unknown'}
+        self.conflicts = conflicts
+
+
+class CacheHoldStore:
+    """Holds kept in the Django cache; ``cache.add`` makes each seat atomic."""
+
+    def seat_key(self, showtime_id, seat_number):
+        return f"hold:seat:{showtime_id}:{seat_number}"
+
+    def hold_key(self, hold_id):
+        return f"hold:{hold_id}"
+
+    def acquire(self, showtime_id, seat_numbers, user_id, ttl):
+        """
+        Hold all of ``seat_numbers`` or none of them. Returns the hold as a
+        dict, or raises HoldConflict naming the seats held by someone else.
+        """
+        hold_id = uuid.uuid4().hex
+        seconds = int(ttl.total_seconds())
+        taken = []
+        conflicts = {}
+        for seat_number in seat_numbers:
+            key = self.seat_key(showtime_id, seat_number)
+            if cache.add(key, hold_id, seconds):
+                taken.append(key)
+            else:
+                conflicts[seat_number] = 'held'
+        if conflicts:
+            cache.delete_many(taken)
+            raise HoldConflict(conflicts)
+        hold = {
+            'id': hold_id,
+            'showtime': showtime_id,
+            'seats': list(seat_numbers),
+            'user': user_id,
+            'expires_at': timezone.now() + ttl,
+        }
+        cache.set(self.hold_key(hold_id), hold, seconds)
+        return hold
+
+    def get(self, hold_id):
+        """Return a live hold, or None once it expired or was released."""
+        return cache.get(self.hold_key(hold_id))
+
+    def get_many(self, hold_ids):
+        """Map the live holds among ``hold_ids`` to the holds, in one round trip."""
+        found = cache.get_many([self.hold_key(hold_id) for hold_id in hold_ids])
+        return {hold['id']: hold for hold in found.values()}
+
+    def release(self, hold_id):
+        hold = self.get(hold_id)
+        if hold is None:
+            return
+        keys = [self.seat_key(hold['showtime'], n) for n in hold['seats']]
+        # only drop seat keys that still belong to this hold
+        owned = [key for key, value in cache.get_many(keys).items() if value == hold_id]
+        cache.delete_many(owned + [self.hold_key(hold_id)])
+
+    def holders(self, showtime_id, seat_numbers):
+        """Map the held seats among ``seat_numbers`` to their hold ids."""
+        keys = {self.seat_key(showtime_id, n): n for n in seat_numbers}
+        return {keys[key]: hold_id for key, hold_id in cache.get_many(list(keys)).items()}
+
+
+@lru_cache(maxsize=None)
+def get_store():
+    return import_string(settings.SEAT_HOLD_STORE)()
+
+
+def place_hold(showtime_id, seat_numbers, user):
+    """
+    Hold seats of a showtime for ``user``. The seat map (cached) is used to
+    reject unknown and already booked seats without touching the database.
+    Returns None if the showtime does not exist.
+    """
+    seat_map = seatmap.get(showtime_id)
+    if seat_map is None:
+        return None
+    booked = {seat[1]: seat[2] for seat in seat_map.seats}
+    conflicts = {}
+    for seat_number in seat_numbers:
+        if seat_number not in booked:
+            conflicts[seat_number] = 'unknown'
+        elif booked[seat_number]:
+            conflicts[seat_number] = 'booked'
+    if conflicts:
+        raise HoldConflict(conflicts)
+    ttl = timedelta(minutes=settings.SEAT_HOLD_TTL_MINUTES)
+    return get_store().acquire(seat_map.showtime_id, sorted(set(seat_numbers)), user.pk, ttl)
+
+
+def held_by_others(showtime_id, seat_numbers, user):
+    """Seat numbers among ``seat_numbers`` held by someone other than ``user``."""
+    store = get_store()
+    holders = store.holders(showtime_id, seat_numbers)
+    live = store.get_many(set(holders.values()))
+    return {
+        seat_number: 'held' for seat_number, hold_id in holders.items()
+        if hold_id in live and live[hold_id]['user'] != user.pk
+    }
+
+
+def held_seats(seat_map):
+    """Seat numbers of a seat map currently held by anyone."""
+    numbers = [seat[1] for seat in seat_map.seats if not seat[2]]
+    return set(get_store().holders(seat_map.showtime_id, numbers))
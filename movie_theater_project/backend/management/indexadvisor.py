@@ -0,0 +1,207 @@
+"""
+Index advisor.
+
+Captures the queries of a workload (the test suite, or a recorded list
+of queries replayed against the configured database), EXPLAINs one
+example of each distinct query shape and flags the tables the planner
+reads in full although the query filters them. For each flagged table it
+proposes a composite index: the columns compared for equality, then the
+columns the query sorts by, then at most one range column. Proposals
+already covered by an existing index are dropped, and the rest can be
+timed by running their queries before and after creating the index for a
+moment. Used by the ``advise_indexes`` command.
+"""
+import json
+import re
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Index
+
+IN_LIST_RE = re.compile(r'\((?:%s, )*%s\)')
+PREDICATE_RE = re.compile(r'"(\w+)"\."(\w+)"\s*(=|IN\b|IS\b|<=|>=|<|>|BETWEEN\b)', re.I)
+COLUMN_RE = re.compile(r'"(\w+)"\."(\w+)"')
+CLAUSE_END_RE = re.compile(r'\b(GROUP BY|ORDER BY|LIMIT|HAVING)\b')
+ORDER_BY_RE = re.compile(r'\bORDER BY\b(.*?)(?:\bLIMIT\b|\bOFFSET\b|$)')
+SQLITE_SCAN_RE = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+RANGE_OPS = {'<', '>', '<=', '>=', 'BETWEEN'}
+MAX_COLUMNS = 3
+
+
+def shape(sql):
+    """The query with ``IN (%s, %s, ...)`` lists collapsed."""
+    return IN_LIST_RE.sub('(%s...)', sql)
+
+
+class Recorder:
+    """
+    ``connection.execute_wrapper`` that keeps one example, the count and
+    the total time of each distinct SELECT / UPDATE / DELETE shape.
+    """
+
+    def __init__(self):
+        self.queries = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not many and sql.lstrip()[:6].upper() in ('SELECT', 'UPDATE', 'DELETE'):
+                entry = self.queries.setdefault(
+                    shape(sql), {'sql': sql, 'params': list(params or ()), 'count': 0, 'time': 0.0})
+                entry['count'] += 1
+                entry['time'] += time.perf_counter() - started
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            for entry in self.queries.values():
+                f.write(json.dumps(entry, cls=DjangoJSONEncoder) + '\n')
+
+
+def load(path):
+    """Queries recorded by ``Recorder.dump``, keyed by shape."""
+    with open(path) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    return {shape(entry['sql']): entry for entry in entries}
+
+
+def scanned_tables(sql, params):
+    """Tables the planner reads in full for one query."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return {
+                match.group(1) for *_, detail in cursor.fetchall()
+                if (match := SQLITE_SCAN_RE.match(detail))
+            }
+        # tiny test tables are always cheapest to read in full; ask
+        # whether any index could serve the query at all
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return set(_seq_scans(plan[0]['Plan']))
+
+
+def _seq_scans(node):
+    if node.get('Node Type') == 'Seq Scan' and node.get('Filter'):
+        yield node['Relation Name']
+    for child in node.get('Plans', ()):
+        yield from _seq_scans(child)
+
+
+def strip_filters(sql):
+    """``sql`` without the ``FILTER (WHERE ...)`` clauses of its aggregates."""
+    while (start := sql.find('FILTER (WHERE ')) != -1:
+        depth, end = 0, start + len('FILTER ')
+        for end in range(end, len(sql)):
+            depth += {'(': 1, ')': -1}.get(sql[end], 0)
+            if not depth:
+                break
+        sql = sql[:start] + sql[end + 1:]
+    return sql
+
+
+def proposal(sql, table):
+    """
+    Index columns for ``table`` from the predicates and ordering of ``sql``;
+    an ordering alone only counts when the query is limited.
+    """
+    sql = strip_filters(sql)
+    where = sql.split(' WHERE ', 1)[1] if ' WHERE ' in sql else ''
+    where = CLAUSE_END_RE.split(where, 1)[0]
+    equality, ranges = [], []
+    for name, column, op in PREDICATE_RE.findall(where):
+        if name == table:
+            (ranges if op.upper() in RANGE_OPS else equality).append(column)
+    order = ORDER_BY_RE.search(sql)
+    ordering = [column for name, column in COLUMN_RE.findall(order.group(1)) if name == table] if order else []
+    if not (equality or ranges or ' LIMIT ' in sql):
+        return ()
+    columns = list(dict.fromkeys(equality + ordering + ranges[:1]))
+    return tuple(columns[:MAX_COLUMNS])
+
+
+def existing_indexes(table):
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return [tuple(info['columns']) for info in constraints.values()
+            if (info['index'] or info['unique'] or info['primary_key']) and info['columns']]
+
+
+def model_for(table):
+    return next((model for model in apps.get_models() if model._meta.db_table == table), None)
+
+
+def analyze(queries):
+    """
+    ``[{table, model, columns, shapes, count, examples}]`` for every full
+    scan of a filtered table, most frequent first.
+    """
+    found = defaultdict(lambda: {'shapes': 0, 'count': 0, 'examples': []})
+    for entry in queries.values():
+        try:
+            tables = scanned_tables(entry['sql'], entry['params'])
+        except Exception:  # statements that cannot be explained on their own
+            continue
+        for table in tables:
+            columns = proposal(entry['sql'], table)
+            model = model_for(table)
+            if not columns or model is None:
+                continue
+            if any(index[:len(columns)] == columns for index in existing_indexes(table)):
+                continue
+            item = found[(table, columns)]
+            item.update(table=table, model=model, columns=columns)
+            item['shapes'] += 1
+            item['count'] += entry['count']
+            item['examples'].append(entry)
+    return sorted(found.values(), key=lambda item: -item['count'])
+
+
+def fields_for(model, columns):
+    by_column = {field.column: field.name for field in model._meta.concrete_fields}
+    return [by_column[column] for column in columns]
+
+
+def index_for(item):
+    fields = fields_for(item['model'], item['columns'])
+    name = f"{item['model']._meta.model_name}_{'_'.join(fields)}_idx"
+    if len(name) > Index.max_name_length:
+        name = f"{item['model']._meta.model_name[:10]}_{'_'.join(f[:6] for f in fields)}_idx"[:Index.max_name_length]
+    return Index(fields=fields, name=name)
+
+
+def run_examples(examples, repeat):
+    """Best-of-``repeat`` seconds to run every example query once."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with transaction.atomic(), connection.cursor() as cursor:
+            for entry in examples:
+                cursor.execute(entry['sql'], entry['params'])
+                if cursor.description:
+                    cursor.fetchall()
+            transaction.set_rollback(True)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def time_index(item, repeat=5):
+    """``(before, after)`` seconds for the item's queries without and with its index."""
+    index = index_for(item)
+    before = run_examples(item['examples'], repeat)
+    with connection.schema_editor() as editor:
+        editor.add_index(item['model'], index)
+    try:
+        after = run_examples(item['examples'], repeat)
+    finally:
+        with connection.schema_editor() as editor:
+            editor.remove_index(item['model'], index)
+    return before, after
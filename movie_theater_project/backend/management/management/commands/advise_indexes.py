@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from management import indexadvisor
+from movie_theater.test_runner import TestRunner
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the test suite (or replay a recorded workload) with query capture, "
+        "EXPLAIN every distinct query and propose composite indexes for the "
+        "filtered tables the planner scans in full."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('labels', nargs='*', default=['management.tests'],
+                            help="Test labels to run as the workload.")
+        parser.add_argument('--workload',
+                            help="Replay queries recorded with --record against the "
+                                 "configured database instead.")
+        parser.add_argument('--record', help="Write the captured queries to this file.")
+        parser.add_argument('--timings', action='store_true',
+                            help="Time each proposal's queries without and with the index.")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if options['workload']:
+            recorder = indexadvisor.Recorder()
+            recorder.queries = indexadvisor.load(options['workload'])
+            self.report(recorder, options)
+            return
+
+        command = self
+        recorder = indexadvisor.Recorder()
+
+        class Runner(TestRunner):
+            def run_suite(self, suite, **kwargs):
+                with connection.execute_wrapper(recorder):
+                    return super().run_suite(suite, **kwargs)
+
+            def teardown_databases(self, old_config, **kwargs):
+                # the proposals are explained against the test database
+                command.report(recorder, options)
+                super().teardown_databases(old_config, **kwargs)
+
+        failures = Runner(verbosity=0, interactive=False).run_tests(options['labels'])
+        if failures:
+            raise CommandError(f"{failures} tests failed; the proposals above may be incomplete.")
+
+    def report(self, recorder, options):
+        if options['record']:
+            recorder.dump(options['record'])
+        items = indexadvisor.analyze(recorder.queries)
+        self.stdout.write(
+            f"{len(recorder.queries)} distinct queries, {len(items)} index proposals on {connection.vendor}.")
+        for item in items:
+            index = indexadvisor.index_for(item)
+            self.stdout.write(
+                f"\n{item['model'].__name__}: {item['shapes']} query shapes, "
+                f"{item['count']} executions scan {item['table']}")
+            self.stdout.write(f"    e.g. {item['examples'][0]['sql'][:300]}")
+            self.stdout.write(f"    models.Index(fields={index.fields!r}, name={index.name!r}),")
+            if options['timings']:
+                before, after = indexadvisor.time_index(item, options['repeat'])
+                self.stdout.write(f"    {before * 1000:.2f} ms -> {after * 1000:.2f} ms")
+        if items:
+            self.stdout.write(
+                "\nAdd the indexes worth keeping to the models' Meta.indexes and run makemigrations.")
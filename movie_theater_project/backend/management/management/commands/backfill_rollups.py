@@ -0,0 +1,29 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from management import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the admin dashboard rollup tables from the source data."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, default=None,
+                            help="First day to rebuild (YYYY-MM-DD); defaults to the oldest data.")
+        parser.add_argument('--end', type=date.fromisoformat, default=None,
+                            help="Last day to rebuild (YYYY-MM-DD); defaults to the last showtime or today.")
+        parser.add_argument('--chunk-days', type=int, default=31,
+                            help="Days recomputed per transaction.")
+
+    def handle(self, *args, **options):
+        if options['start'] and options['end'] and options['start'] > options['end']:
+            raise CommandError("--start must not be after --end.")
+        chunks = 0
+        for first, last in rollups.backfill(options['start'], options['end'], options['chunk_days']):
+            chunks += 1
+            self.stdout.write(f"Rebuilt {first} .. {last}")
+        if not chunks:
+            self.stdout.write("Nothing to rebuild.")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups in {chunks} chunks."))
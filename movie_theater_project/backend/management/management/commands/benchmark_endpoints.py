@@ -0,0 +1,74 @@
+import json
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from management import benchmark, seeding
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throw-away database with synthetic data and measure the latency, "
+        "queries and memory of the key API endpoints. Prints a JSON report; "
+        "--compare fails on regressions against an earlier one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--existing', action='store_true',
+                            help="Benchmark the configured database as it is instead of "
+                                 "seeding a test database.")
+        parser.add_argument('--movies', type=int, default=500)
+        parser.add_argument('--showtimes', type=int, default=5000)
+        parser.add_argument('--seats-per-showtime', type=int, default=40)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--occupancy', type=float, default=0.3,
+                            help="Average share of booked seats.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--endpoints',
+                            help="Comma-separated endpoints to run; default all of "
+                                 + ', '.join(endpoint.name for endpoint in benchmark.ENDPOINTS))
+        parser.add_argument('--requests', type=int, default=50,
+                            help="Timed requests per endpoint.")
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--output', help="Also write the report to this file.")
+        parser.add_argument('--compare', help="Report from an earlier run to compare against.")
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help="Allowed p95 growth against --compare, as a fraction.")
+
+    def handle(self, *args, **options):
+        names = options['endpoints'].split(',') if options['endpoints'] else None
+        unknown = set(names or ()) - {endpoint.name for endpoint in benchmark.ENDPOINTS}
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+        if options['existing']:
+            report = benchmark.run(names, options['requests'], options['warmup'], options['seed'])
+        else:
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                cache.clear()
+                seeding.seed(
+                    movies=options['movies'],
+                    showtimes=options['showtimes'],
+                    seats_per_showtime=options['seats_per_showtime'],
+                    users=options['users'],
+                    occupancy=options['occupancy'],
+                    seed=options['seed'],
+                    log=lambda line: self.stderr.write(f"Seeded {line}"),
+                )
+                report = benchmark.run(names, options['requests'], options['warmup'], options['seed'])
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            regressions = benchmark.compare(baseline, report, options['tolerance'])
+            if regressions:
+                raise CommandError("Regressions:\n" + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from management import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the movie full-text search index from the catalog."
+
+    def handle(self, *args, **options):
+        count = search.rebuild()
+        self.stdout.write(f"Indexed {count} movies.")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from management import ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute every movie's review count, average and histogram from its reviews."
+
+    def handle(self, *args, **options):
+        corrected = ratings.reconcile()
+        self.stdout.write(f"Corrected the rating aggregates of {corrected} movies.")
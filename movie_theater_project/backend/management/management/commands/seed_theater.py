@@ -0,0 +1,55 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from management import seeding
+from management.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the configured database with synthetic theaters, movies, showtimes, "
+        "seats, bookings, payments, reviews and notifications, using bulk inserts. "
+        "The same --seed always produces the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--theaters', type=int, default=5)
+        parser.add_argument('--auditoriums-per-theater', type=int, default=4)
+        parser.add_argument('--seats-per-showtime', type=int, default=40)
+        parser.add_argument('--movies', type=int, default=200)
+        parser.add_argument('--showtimes', type=int, default=2000)
+        parser.add_argument('--days-back', type=int, default=30,
+                            help="Showtimes (and signups, reviews) spread over this many past days...")
+        parser.add_argument('--days-ahead', type=int, default=14,
+                            help="...and this many upcoming ones.")
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--reviews', type=int, default=None,
+                            help="Default: five per movie.")
+        parser.add_argument('--occupancy', type=float, default=0.3,
+                            help="Average share of booked seats per showtime.")
+        parser.add_argument('--skew', type=float, default=1.0,
+                            help="Zipf exponent of movie popularity; 0 spreads showtimes "
+                                 "and reviews evenly.")
+        parser.add_argument('--peak-share', type=float, default=0.6,
+                            help="Share of showtimes starting between 18:00 and 23:00.")
+        parser.add_argument('--failed-payments', type=float, default=0.05,
+                            help="Share of bookings with a failed payment attempt.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help="Showtimes (or other rows) written per transaction.")
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith='seed-').exists():
+            raise CommandError("The database already holds seeded data; seed a fresh one.")
+        volumes = {name: options[name] for name in (
+            'theaters', 'auditoriums_per_theater', 'seats_per_showtime', 'movies', 'showtimes',
+            'days_back', 'days_ahead', 'users', 'reviews', 'occupancy', 'skew', 'peak_share',
+            'failed_payments', 'seed', 'chunk_size')}
+        started = time.perf_counter()
+        counts = seeding.seed(log=lambda line: self.stdout.write(f"Seeded {line}"), **volumes)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(json.dumps(counts, indent=2))
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {sum(counts.values())} rows in {elapsed:.1f}s."))
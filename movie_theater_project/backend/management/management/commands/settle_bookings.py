@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from management.tasks import settle_finished_bookings
+
+
+class Command(BaseCommand):
+    help = (
+        "Mark confirmed bookings of finished showtimes as attended and cancel "
+        "the pending ones, releasing their seats."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report what would change.")
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help="Bookings per transaction.")
+
+    def handle(self, *args, **options):
+        summary = settle_finished_bookings(
+            chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        prefix = "Would update" if options['dry_run'] else "Updated"
+        self.stdout.write(
+            f"{prefix}: {summary['attended']} bookings marked as attended, "
+            f"{summary['cancelled']} bookings cancelled, "
+            f"{summary['seats_released']} seats released across {summary['showtimes']} showtimes."
+        )
+        self.stdout.write(
+            f"{summary['attended'] + summary['cancelled']} bookings in {summary['elapsed_s']}s "
+            f"({summary['rows_per_second']} rows/s)."
+        )
@@ -0,0 +1,50 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from management import stress
+
+
+class Command(BaseCommand):
+    help = (
+        "Book overlapping seats of one showtime from many threads at once and "
+        "report throughput, latency percentiles and invariant violations. "
+        "Runs against the configured database; set LOCAL_DATABASE_URL to "
+        "point it at a local Postgres."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--attempts', type=int, default=25,
+                            help="Booking attempts per thread.")
+        parser.add_argument('--seats', type=int, default=200,
+                            help="Seats in the test showtime.")
+        parser.add_argument('--seats-per-booking', type=int, default=2)
+        parser.add_argument('--update-ratio', type=float, default=0.2,
+                            help="Share of successful bookings that are then re-booked to other seats.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--keep', action='store_true',
+                            help="Keep the test showtime, users and bookings.")
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError("The stress test needs a file-backed or server database.")
+        showtime, users = stress.create_fixture(options['seats'], options['threads'])
+        try:
+            report = stress.run(
+                showtime,
+                users,
+                attempts=options['attempts'],
+                seats_per_booking=options['seats_per_booking'],
+                update_ratio=options['update_ratio'],
+                seed=options['seed'],
+            )
+        finally:
+            if not options['keep']:
+                stress.drop_fixture(showtime)
+        report['database'] = connection.vendor
+        self.stdout.write(json.dumps(report, indent=2))
+        if report['violations']:
+            raise CommandError(f"{len(report['violations'])} invariant violations")
+        self.stdout.write(self.style.SUCCESS("No invariant violations."))
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_seats(apps, schema_editor):
+    """
+    Seats were not unique per showtime before this migration: keep the
+    first of each (showtime, seat_number), move the bookings of the others
+    onto it and delete them.
+    """
+    Seat = apps.get_model('management', 'Seat')
+    BookingSeat = apps.get_model('management', 'Booking').seats.through
+    duplicates = (
+        Seat.objects.order_by().values('showtime_id', 'seat_number')
+        .annotate(n=Count('id'), keep=Min('id')).filter(n__gt=1)
+    )
+    for row in duplicates:
+        others = list(
+            Seat.objects.filter(showtime_id=row['showtime_id'], seat_number=row['seat_number'])
+            .exclude(id=row['keep']).values_list('id', flat=True))
+        linked = set(BookingSeat.objects.filter(seat_id=row['keep']).values_list('booking_id', flat=True))
+        for link in BookingSeat.objects.filter(seat_id__in=others):
+            if link.booking_id not in linked:
+                BookingSeat.objects.create(booking_id=link.booking_id, seat_id=row['keep'])
+                linked.add(link.booking_id)
+        if Seat.objects.filter(id__in=others, is_booked=True).exists():
+            Seat.objects.filter(id=row['keep']).update(is_booked=True)
+        BookingSeat.objects.filter(seat_id__in=others).delete()
+        Seat.objects.filter(id__in=others).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0017_movie_poster_url_alter_movie_actors_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatLayout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rows', models.PositiveSmallIntegerField()),
+                ('columns', models.PositiveSmallIntegerField()),
+                ('default_price', models.DecimalField(decimal_places=2, default=10.0, max_digits=6)),
+                ('price_tiers', models.JSONField(blank=True, default=list)),
+                ('blocked_seats', models.JSONField(blank=True, default=list)),
+            ],
+        ),
+        migrations.RunPython(merge_duplicate_seats, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='seat',
+            constraint=models.UniqueConstraint(fields=('showtime', 'seat_number'), name='unique_seat_per_showtime'),
+        ),
+        migrations.AddField(
+            model_name='seatlayout',
+            name='auditorium',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='layout', to='management.auditorium'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0019_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('upcoming_24h', 'Showtime within 24 hours')], max_length=30)),
+                ('sent_at', models.DateTimeField()),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='management.booking')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('booking', 'kind'), name='unique_reminder_per_booking')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0020_bookingreminder'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bookingreminder',
+            name='kind',
+            field=models.CharField(choices=[('upcoming_24h', 'Showtime within 24 hours'), ('pending_payment', 'Payment still pending')], max_length=30),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'created_at'], name='booking_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='showtime',
+            index=models.Index(fields=['start_time'], name='showtime_start_idx'),
+        ),
+    ]
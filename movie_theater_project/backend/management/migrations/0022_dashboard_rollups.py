@@ -0,0 +1,81 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0021_booking_sweeper_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('signups', models.PositiveIntegerField(default=0)),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('bookings_pending', models.PositiveIntegerField(default=0)),
+                ('bookings_confirmed', models.PositiveIntegerField(default=0)),
+                ('bookings_cancelled', models.PositiveIntegerField(default=0)),
+                ('bookings_attended', models.PositiveIntegerField(default=0)),
+                ('lead_seconds', models.FloatField(default=0)),
+                ('lead_bookings', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('refunds', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('failed_payments', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='HourlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(unique=True)),
+                ('signups', models.PositiveIntegerField(default=0)),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupDirtyDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AuditoriumDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('seats', models.PositiveIntegerField(default=0)),
+                ('seats_booked', models.PositiveIntegerField(default=0)),
+                ('service_ratings', models.PositiveIntegerField(default=0)),
+                ('service_rating_sum', models.PositiveIntegerField(default=0)),
+                ('auditorium', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='management.auditorium')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'auditorium'), name='unique_auditorium_rollup_per_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MovieDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('reviews', models.PositiveIntegerField(default=0)),
+                ('review_rating_sum', models.FloatField(default=0)),
+                ('favourites', models.PositiveIntegerField(default=0)),
+                ('watchlists', models.PositiveIntegerField(default=0)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='management.movie')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'movie'), name='unique_movie_rollup_per_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+from django.db import migrations
+
+CREATE = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE management_movie_search USING fts5("
+        "title, people, genres, description, tokenize='unicode61 remove_diacritics 2')",
+    ],
+    'postgresql': [
+        "CREATE TABLE management_movie_search ("
+        "movie_id integer PRIMARY KEY REFERENCES management_movie (id) ON DELETE CASCADE "
+        "DEFERRABLE INITIALLY DEFERRED, document tsvector NOT NULL)",
+        "CREATE INDEX management_movie_search_document_idx ON management_movie_search USING GIN (document)",
+    ],
+}
+
+# the same documents and weights as management.search
+INSERT = {
+    'sqlite': "INSERT INTO management_movie_search (rowid, title, people, genres, description) "
+              "VALUES (%s, %s, %s, %s, %s)",
+    'postgresql': "INSERT INTO management_movie_search (movie_id, document) VALUES (%s, "
+                  "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B') || "
+                  "setweight(to_tsvector('simple', %s), 'C') || setweight(to_tsvector('simple', %s), 'D'))",
+}
+BATCH_SIZE = 2000
+
+
+def create_index(apps, schema_editor):
+    # kept current by signals from here on
+    for statement in CREATE[schema_editor.connection.vendor]:
+        schema_editor.execute(statement)
+    fill_index(apps, schema_editor)
+
+
+def fill_index(apps, schema_editor):
+    """Index the existing catalog, as ``search.rebuild`` does."""
+    Movie = apps.get_model('management', 'Movie')
+    movies = Movie.objects.select_related('director', 'producer').prefetch_related(
+        'genre', 'actors', 'roles__actor').order_by('id')
+    insert = INSERT[schema_editor.connection.vendor]
+    rows = []
+    with schema_editor.connection.cursor() as cursor:
+        for movie in movies.iterator(chunk_size=BATCH_SIZE):
+            people = [person.name for person in (movie.director, movie.producer) if person]
+            people += [actor.name for actor in movie.actors.all()]
+            for role in movie.roles.all():
+                people += [role.actor.name, role.character_name]
+            rows.append((
+                movie.id,
+                movie.title,
+                ' '.join(dict.fromkeys(people)),
+                ' '.join(genre.name for genre in movie.genre.all()),
+                movie.description or '',
+            ))
+            if len(rows) == BATCH_SIZE:
+                cursor.executemany(insert, rows)
+                rows = []
+        if rows:
+            cursor.executemany(insert, rows)
+
+
+def drop_index(apps, schema_editor):
+    schema_editor.execute("DROP TABLE management_movie_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0023_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:21
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill(apps, schema_editor):
+    Movie = apps.get_model('management', 'Movie')
+    Review = apps.get_model('management', 'Review')
+    stars = {
+        1: Q(rating__lt=1.5),
+        2: Q(rating__gte=1.5, rating__lt=2.5),
+        3: Q(rating__gte=2.5, rating__lt=3.5),
+        4: Q(rating__gte=3.5, rating__lt=4.5),
+        5: Q(rating__gte=4.5),
+    }
+    rows = Review.objects.order_by().values('movie_id').annotate(
+        review_count=Count('id'), review_total=Sum('rating'),
+        **{f'rating_{star}_count': Count('id', filter=q) for star, q in stars.items()})
+    for row in rows:
+        movie_id = row.pop('movie_id')
+        row['review_average'] = row['review_total'] / row['review_count']
+        Movie.objects.filter(pk=movie_id).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0024_movie_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='review_average',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='review_total',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['review_average', 'id'], name='movie_review_average_idx'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
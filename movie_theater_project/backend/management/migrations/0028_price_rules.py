@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0027_advised_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('applies_to', models.CharField(choices=[('all', 'All showtimes'), ('vip', 'VIP showtimes'), ('3d', '3D showtimes')], default='all', max_length=10)),
+                ('start_hour', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('end_hour', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, help_text='Added to every seat.', max_digits=6)),
+                ('percent', models.DecimalField(decimal_places=2, default=0, help_text='Percentage of the seat price added to every seat.', max_digits=5)),
+                ('is_active', models.BooleanField(default=True)),
+                ('theater', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='price_rules', to='management.theater')),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('management', '0028_price_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('users', models.PositiveIntegerField(default=0)),
+                ('active', models.PositiveIntegerField(default=0)),
+                ('verified', models.PositiveIntegerField(default=0)),
+                ('booked', models.PositiveIntegerField(default=0)),
+                ('paid', models.PositiveIntegerField(default=0)),
+                ('established', models.PositiveIntegerField(default=0)),
+                ('retained', models.PositiveIntegerField(default=0)),
+                ('repeat_customers', models.PositiveIntegerField(default=0)),
+                ('one_time_customers', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-points'], name='user_points_idx'),
+        ),
+    ]
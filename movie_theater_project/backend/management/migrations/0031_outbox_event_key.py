@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0030_notification_event_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='event_key',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
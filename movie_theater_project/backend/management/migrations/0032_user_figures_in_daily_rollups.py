@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+def queue_existing_days(apps, schema_editor):
+    """The next rollup refresh fills the new columns of every existing day."""
+    DailyRollup = apps.get_model('management', 'DailyRollup')
+    RollupDirtyDay = apps.get_model('management', 'RollupDirtyDay')
+    RollupDirtyDay.objects.bulk_create(
+        [RollupDirtyDay(day=day) for day in DailyRollup.objects.values_list('day', flat=True)],
+        ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0031_outbox_event_key'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='UserRollup',
+        ),
+        migrations.AddField(
+            model_name='dailyrollup',
+            name='active_signups',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dailyrollup',
+            name='first_bookings',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dailyrollup',
+            name='first_payments',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dailyrollup',
+            name='repeat_bookings',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dailyrollup',
+            name='retained_users',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dailyrollup',
+            name='verified_signups',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(queue_existing_days, migrations.RunPython.noop),
+    ]
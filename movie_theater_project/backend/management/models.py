@@ -1,5 +1,8 @@
 from django.contrib.auth.models import AbstractUser
+from decimal import Decimal
+
 from django.db import models
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -8,6 +11,14 @@ class User(AbstractUser):
     email_verified = models.BooleanField(
         default=True)  # Add email verification field
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # dashboard rollups count signups per day
+            models.Index(fields=['date_joined'], name='user_date_joined_idx'),
+            # the dashboard's top users by points
+            models.Index(fields=['-points'], name='user_points_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -28,6 +39,23 @@ class Movie(models.Model):
     producer = models.ForeignKey('Producer', on_delete=models.SET_NULL, null=True, blank=True)
     genre = models.ManyToManyField('Genre', blank=True)
     actors = models.ManyToManyField('Actor', blank=True)
+    # user review aggregates, maintained by management.ratings
+    review_count = models.PositiveIntegerField(default=0)
+    review_total = models.FloatField(default=0.0)
+    review_average = models.FloatField(default=0.0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # listing movies by user rating
+            models.Index(fields=['review_average', 'id'], name='movie_review_average_idx'),
+            # the movie list is paginated in title order
+            models.Index(fields=['title'], name='movie_title_idx'),
+        ]
 
     def get_poster_url(self):
         """Return poster URL - prefer URL field, then uploaded file"""
@@ -69,6 +97,13 @@ class Seat (models.Model):
         decimal_places=2,
         default=10.00)  # Add price field
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['showtime', 'seat_number'],
+                name='unique_seat_per_showtime'),
+        ]
+
     def __str__(self):
         return f"{self.showtime.movie.title} - Seat {self.seat_number}"
 
@@ -96,12 +131,29 @@ class Showtime(models.Model):
     available_seats = models.PositiveIntegerField(
         default=0)  # Add available_seats field
 
+    class Meta:
+        indexes = [
+            # upcoming-showtime reminders and listings filter on start_time;
+            # the id makes it the key of the showtime list's cursor
+            models.Index(fields=['start_time', 'id'], name='showtime_start_id_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         # only seed available_seats on first create
         if self._state.adding and self.auditorium:
             self.available_seats = self.auditorium.total_seats
         super().save(*args, **kwargs)
 
+    @property
+    def seat_layout(self):
+        """Layout of the auditorium, or None when seats are stored per row."""
+        if self.auditorium is None:
+            return None
+        try:
+            return self.auditorium.layout
+        except SeatLayout.DoesNotExist:
+            return None
+
     def __str__(self):
         start = self.start_time.strftime("%Y-%m-%d %H:%M:%S")
         end = self.end_time.strftime("%Y-%m-%d %H:%M:%S")
@@ -123,6 +175,12 @@ class Review(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     anonymous = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # keyset pagination of the review list
+            models.Index(fields=['-created_at', '-id'], name='review_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.movie.title} Review"
 
@@ -155,6 +213,33 @@ class Booking(models.Model):
         default='Pending')  # Add status field
     attended = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # the booking sweeper looks for pending bookings by age
+            models.Index(fields=['status', 'created_at'], name='booking_status_created_idx'),
+            # keyset pagination of the booking list
+            models.Index(fields=['-created_at', '-id'], name='booking_created_idx'),
+            # a user's bookings, newest first
+            models.Index(fields=['user', '-created_at'], name='booking_user_created_idx'),
+        ]
+
+    @staticmethod
+    def attendance(now=None):
+        """
+        Whether a booking counts as attended, as an annotation: marked so,
+        or confirmed for a showtime that has started. The stored flag is
+        only written by the settlement batch and the admin.
+        """
+        return models.ExpressionWrapper(
+            models.Q(attended=True)
+            | models.Q(status='Confirmed', showtime__start_time__lt=now or timezone.now()),
+            output_field=models.BooleanField())
+
+    def has_attended(self, now=None):
+        """``attendance`` for one booking."""
+        return self.attended or (
+            self.status == 'Confirmed' and self.showtime.start_time < (now or timezone.now()))
+
     def __str__(self):
         return (
             f"{self.user.username} booked "
@@ -163,6 +248,33 @@ class Booking(models.Model):
         )
 
 
+class BookingReminder(models.Model):
+    """
+    Records that a reminder of one kind was sent for a booking, so periodic
+    reminder jobs can run often without sending it twice.
+    """
+    KIND_CHOICES = [
+        ('upcoming_24h', 'Showtime within 24 hours'),
+        ('pending_payment', 'Payment still pending'),
+    ]
+    booking = models.ForeignKey(
+        Booking,
+        on_delete=models.CASCADE,
+        related_name="reminders")
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    sent_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['booking', 'kind'],
+                name='unique_reminder_per_booking'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} reminder for booking {self.booking_id}"
+
+
 class Notification(models.Model):
     user = models.ForeignKey(
         User,
@@ -170,12 +282,43 @@ class Notification(models.Model):
         related_name="notifications")
     message = models.CharField(max_length=255)
     is_read = models.BooleanField(default=False)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # not auto_now_add: outbox deliveries keep the time of the event
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            # a user's notifications, newest first, paginated by keyset
+            models.Index(fields=['user', '-created_at', '-id'], name='notification_user_created_idx'),
+        ]
 
     def __str__(self):
         return (f"Notification for {self.user.username}: {self.message}")
 
 
+class NotificationOutbox(models.Model):
+    """
+    A notification waiting to be delivered. Rows are written in the same
+    transaction as the change they report and turned into ``Notification``
+    rows (or other channels) by a worker; see ``management.notifications``.
+    """
+    CHANNEL_CHOICES = [
+        ('in_app', 'In-app'),
+    ]
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+")
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES, default='in_app')
+    message = models.CharField(max_length=255)
+    # identifies the event: rows with the same key are one delivery (a
+    # retried write), rows with the same message are not
+    event_key = models.CharField(max_length=64, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.channel} notification for user {self.user_id}: {self.message}"
+
+
 class Actor(models.Model):
     name = models.CharField(max_length=100, unique=True)
     date_of_birth = models.DateField(blank=True, null=True)
@@ -241,6 +384,12 @@ class Payment(models.Model):
         blank=True,
         null=True)  # Add created_at field
 
+    class Meta:
+        indexes = [
+            # dashboard rollups sum payments per day
+            models.Index(fields=['created_at'], name='payment_created_idx'),
+        ]
+
     def __str__(self):
         return (f"Payment {self.pk} for Booking"
                 f" {self.booking_id}: {self.status}")
@@ -295,6 +444,132 @@ class Auditorium(models.Model):
         )
 
 
+class SeatLayout(models.Model):
+    """
+    Seating plan of an auditorium, shared by all of its showtimes.
+    Showtimes in an auditorium with a layout only store ``Seat`` rows for
+    seats that have been booked; the rest are derived from here.
+    """
+    auditorium = models.OneToOneField(
+        Auditorium,
+        on_delete=models.CASCADE,
+        related_name='layout')
+    rows = models.PositiveSmallIntegerField()
+    columns = models.PositiveSmallIntegerField()
+    default_price = models.DecimalField(
+        max_digits=6,
+        decimal_places=2,
+        default=10.00)
+    # [{"name": "Premium", "rows": ["H", "J"], "price": "14.00"}, ...]
+    price_tiers = models.JSONField(default=list, blank=True)
+    # seat numbers that do not exist (aisles, wheelchair spaces, ...)
+    blocked_seats = models.JSONField(default=list, blank=True)
+
+    @staticmethod
+    def row_label(index):
+        """0 -> A, 25 -> Z, 26 -> AA, ..."""
+        label = ''
+        index += 1
+        while index:
+            index, rest = divmod(index - 1, 26)
+            label = chr(ord('A') + rest) + label
+        return label
+
+    def row_labels(self):
+        return [self.row_label(i) for i in range(self.rows)]
+
+    def seat_numbers(self):
+        """All bookable seat numbers, row by row."""
+        blocked = set(self.blocked_seats)
+        for row in self.row_labels():
+            for column in range(1, self.columns + 1):
+                number = f"{row}{column}"
+                if number not in blocked:
+                    yield number
+
+    def has_seat(self, seat_number):
+        row = seat_number.rstrip('0123456789')
+        column = seat_number[len(row):]
+        return (
+            row in self.row_labels()
+            and column.isdigit()
+            and 1 <= int(column) <= self.columns
+            and seat_number not in self.blocked_seats
+        )
+
+    def price_for(self, seat_number):
+        row = seat_number.rstrip('0123456789')
+        for tier in self.price_tiers:
+            if row in tier.get('rows', []):
+                return Decimal(str(tier['price']))
+        return self.default_price
+
+    @property
+    def capacity(self):
+        return self.rows * self.columns - len(set(self.blocked_seats))
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # the layout is the source of truth for the hall size
+        Auditorium.objects.filter(pk=self.auditorium_id).update(
+            total_seats=self.capacity)
+
+    def __str__(self):
+        return f"Layout of {self.auditorium.name} ({self.rows}x{self.columns})"
+
+
+class PriceRule(models.Model):
+    """
+    A surcharge (or, when negative, a discount) on top of the seat price
+    for the showtimes it matches; see ``management.pricing``. Zone prices
+    stay with the seats (``SeatLayout.price_tiers``).
+    """
+    APPLIES_TO_CHOICES = [
+        ('all', 'All showtimes'),
+        ('vip', 'VIP showtimes'),
+        ('3d', '3D showtimes'),
+    ]
+    name = models.CharField(max_length=100)
+    applies_to = models.CharField(max_length=10, choices=APPLIES_TO_CHOICES, default='all')
+    # limits the rule to one theater's showtimes
+    theater = models.ForeignKey(
+        'Theater',
+        on_delete=models.CASCADE,
+        related_name='price_rules',
+        blank=True,
+        null=True)
+    # local start hours [start_hour, end_hour) the rule applies to; may
+    # wrap past midnight, empty for all day
+    start_hour = models.PositiveSmallIntegerField(blank=True, null=True)
+    end_hour = models.PositiveSmallIntegerField(blank=True, null=True)
+    amount = models.DecimalField(
+        max_digits=6,
+        decimal_places=2,
+        default=0,
+        help_text="Added to every seat.")
+    percent = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        default=0,
+        help_text="Percentage of the seat price added to every seat.")
+    is_active = models.BooleanField(default=True)
+
+    def matches(self, showtime):
+        if self.applies_to == 'vip' and not showtime.is_VIP:
+            return False
+        if self.applies_to == '3d' and not showtime.thD_available:
+            return False
+        if self.start_hour is None or self.end_hour is None:
+            return True
+        hour = timezone.localtime(showtime.start_time).hour
+        if self.start_hour <= self.end_hour:
+            return self.start_hour <= hour < self.end_hour
+        return hour >= self.start_hour or hour < self.end_hour
+
+    def __str__(self):
+        return self.name
+
+
 class Theater(models.Model):
     name = models.CharField(max_length=100)
     location = models.CharField(max_length=255)
@@ -357,5 +632,106 @@ class News(models.Model):
     content = models.TextField()
     published_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # keyset pagination of the news list
+            models.Index(fields=['-published_at', '-id'], name='news_published_idx'),
+        ]
+
     def __str__(self):
         return self.title
+
+
+# ------------------------------------------------------------------------------
+# Dashboard rollups, maintained by management.rollups
+# ------------------------------------------------------------------------------
+class DailyRollup(models.Model):
+    """Per-day totals for the admin dashboard."""
+    day = models.DateField(unique=True)
+    signups = models.PositiveIntegerField(default=0)
+    active_signups = models.PositiveIntegerField(default=0)
+    verified_signups = models.PositiveIntegerField(default=0)
+    # users whose first / second booking and first completed payment fell
+    # on that day: summed, the users who ever booked, booked again, paid
+    first_bookings = models.PositiveIntegerField(default=0)
+    repeat_bookings = models.PositiveIntegerField(default=0)
+    first_payments = models.PositiveIntegerField(default=0)
+    # users registered over 30 days before the day who booked in the 30
+    # days up to it
+    retained_users = models.PositiveIntegerField(default=0)
+    # bookings created that day, by their current status
+    bookings = models.PositiveIntegerField(default=0)
+    bookings_pending = models.PositiveIntegerField(default=0)
+    bookings_confirmed = models.PositiveIntegerField(default=0)
+    bookings_cancelled = models.PositiveIntegerField(default=0)
+    bookings_attended = models.PositiveIntegerField(default=0)
+    # booking -> showtime lead time of confirmed bookings
+    lead_seconds = models.FloatField(default=0)
+    lead_bookings = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    refunds = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    failed_payments = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Rollup {self.day}"
+
+
+class HourlyRollup(models.Model):
+    """Per-hour signups, bookings and revenue."""
+    hour = models.DateTimeField(unique=True)
+    signups = models.PositiveIntegerField(default=0)
+    bookings = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"Rollup {self.hour:%Y-%m-%d %H:00}"
+
+
+class MovieDailyRollup(models.Model):
+    """Per-day, per-movie activity used for the top movie lists."""
+    day = models.DateField()
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="+")
+    bookings = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    reviews = models.PositiveIntegerField(default=0)
+    review_rating_sum = models.FloatField(default=0)
+    favourites = models.PositiveIntegerField(default=0)
+    watchlists = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'movie'], name='unique_movie_rollup_per_day'),
+        ]
+
+
+class AuditoriumDailyRollup(models.Model):
+    """Per-showtime-day, per-auditorium occupancy and service ratings."""
+    day = models.DateField()
+    auditorium = models.ForeignKey(Auditorium, on_delete=models.CASCADE, related_name="+")
+    seats = models.PositiveIntegerField(default=0)
+    seats_booked = models.PositiveIntegerField(default=0)
+    service_ratings = models.PositiveIntegerField(default=0)
+    service_rating_sum = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'auditorium'], name='unique_auditorium_rollup_per_day'),
+        ]
+
+
+class RollupDirtyDay(models.Model):
+    """A day whose rollups must be recomputed on the next refresh."""
+    day = models.DateField(unique=True)
+
+
+class ModelVersion(models.Model):
+    """
+    Change counter of one model, bumped after every committed write to it;
+    the validators of conditional GETs (see management.versions).
+    """
+    model = models.CharField(max_length=100, unique=True)  # app_label.model_name
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.model} v{self.version}"
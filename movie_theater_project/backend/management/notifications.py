@@ -0,0 +1,93 @@
+"""
+Notification outbox.
+
+Views do not insert ``Notification`` rows themselves: ``notify`` adds an
+event to ``NotificationOutbox`` inside the caller's transaction, and once
+that commits a Celery task drains the outbox in batches, drops duplicate
+events (same user, channel and event key) and bulk-inserts the
+notifications. Each channel has its own
+delivery function, so email or push can be added next to ``in_app``.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Notification, NotificationOutbox
+
+DRAIN_SCHEDULED_KEY = "outbox:drain-scheduled"
+
+
+def notify(user, message, channel='in_app', key=None):
+    """
+    Queue a notification for ``user``; delivered after commit. Events
+    written again under the same ``key`` are delivered once; without a key
+    every call is its own event.
+    """
+    NotificationOutbox.objects.create(
+        user=user, message=message, channel=channel, event_key=key or uuid.uuid4().hex)
+    transaction.on_commit(schedule_drain)
+
+
+def notify_many(user, messages, channel='in_app'):
+    """``notify`` for several messages, in one insert."""
+    NotificationOutbox.objects.bulk_create([
+        NotificationOutbox(user=user, message=message, channel=channel, event_key=uuid.uuid4().hex)
+        for message in messages
+    ])
+    transaction.on_commit(schedule_drain)
+
+
+def schedule_drain():
+    if settings.NOTIFICATION_OUTBOX_EAGER:
+        drain()
+        return
+    # one queued drain covers every event written until it starts; the key
+    # outlives the countdown so a lost task only delays delivery until the
+    # periodic drain
+    if cache.add(DRAIN_SCHEDULED_KEY, True, 60):
+        from .tasks import drain_notification_outbox
+        drain_notification_outbox.apply_async(countdown=settings.NOTIFICATION_OUTBOX_DELAY_SECONDS)
+
+
+def deliver_in_app(events):
+    Notification.objects.bulk_create(
+        [Notification(user_id=event.user_id, message=event.message, created_at=event.created_at)
+         for event in events])
+
+
+CHANNELS = {
+    'in_app': deliver_in_app,
+}
+
+
+def drain(batch_size=None):
+    """
+    Deliver pending outbox events, oldest first, ``batch_size`` at a time.
+    Repeated events (same user, channel and event key) in a batch are
+    delivered once; rows without a key are always delivered. Returns the number of events taken off the outbox.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_OUTBOX_BATCH_SIZE
+    drained = 0
+    while True:
+        with transaction.atomic():
+            # concurrent drains skip each other's rows on Postgres
+            events = list(
+                NotificationOutbox.objects.select_for_update(skip_locked=True)
+                .order_by('id')[:batch_size])
+            if not events:
+                break
+            unique = {}
+            for event in events:
+                unique.setdefault((event.user_id, event.channel, event.event_key or event.id), event)
+            by_channel = {}
+            for event in unique.values():
+                by_channel.setdefault(event.channel, []).append(event)
+            for channel, channel_events in by_channel.items():
+                CHANNELS[channel](channel_events)
+            NotificationOutbox.objects.filter(id__in=[event.id for event in events]).delete()
+        drained += len(events)
+        if len(events) < batch_size:
+            break
+    return drained
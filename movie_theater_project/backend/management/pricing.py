@@ -0,0 +1,134 @@
+"""
+Seat pricing.
+
+A seat costs its zone price (``Seat.price``, set from the layout's price
+tiers) adjusted by the ``PriceRule`` rows matching its showtime: VIP and
+3D surcharges, time-of-day rules, per-theater rules. The rules of a
+showtime are compiled into one fixed amount and one percentage and kept
+in the cache; any change to rules, showtimes, auditoriums or theaters
+drops every compiled set by moving the cache generation. A quote is then a
+single aggregate query that counts the requested seats per zone price,
+without loading the seats themselves.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import PriceRule, Seat, Showtime
+
+GENERATION_KEY = 'pricing:generation'
+CENT = Decimal('0.01')
+
+
+class UnknownSeats(Exception):
+    """Some of the quoted seats do not belong to the showtime."""
+
+
+def cache_key(showtime_id, generation):
+    return f"pricing:{generation}:{showtime_id}"
+
+
+def generation():
+    value = cache.get(GENERATION_KEY)
+    if value is None:
+        cache.add(GENERATION_KEY, 1, None)
+        value = cache.get(GENERATION_KEY, 1)
+    return value
+
+
+def invalidate():
+    """Drop every compiled rule set, now and again after commit."""
+    def bump():
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            cache.add(GENERATION_KEY, 1, None)
+    bump()
+    transaction.on_commit(bump)
+
+
+class RuleSet:
+    """The price rules of one showtime, compiled."""
+
+    def __init__(self, amount=Decimal(0), percent=Decimal(0), rules=()):
+        self.amount = amount
+        self.percent = percent
+        self.rules = list(rules)
+
+    def unit_price(self, price):
+        price = price + price * self.percent / 100 + self.amount
+        return max(price, Decimal(0)).quantize(CENT)
+
+    def as_dict(self):
+        return {'amount': self.amount, 'percent': self.percent, 'rules': self.rules}
+
+
+def compile_rules(showtime):
+    theater_id = showtime.auditorium.theater_id if showtime.auditorium else None
+    rules = [
+        rule for rule in PriceRule.objects.filter(
+            Q(theater__isnull=True) | Q(theater_id=theater_id), is_active=True).order_by('id')
+        if rule.matches(showtime)
+    ]
+    return RuleSet(
+        amount=sum((rule.amount for rule in rules), Decimal(0)),
+        percent=sum((rule.percent for rule in rules), Decimal(0)),
+        rules=[rule.name for rule in rules],
+    )
+
+
+def rules_for(showtime_id):
+    """The compiled rules of a showtime, or None if it does not exist."""
+    key = cache_key(showtime_id, generation())
+    compiled = cache.get(key)
+    if compiled is None:
+        showtime = Showtime.objects.select_related('auditorium').filter(pk=showtime_id).first()
+        if showtime is None:
+            return None
+        compiled = compile_rules(showtime).as_dict()
+        cache.set(key, compiled, settings.PRICING_CACHE_TIMEOUT)
+    return RuleSet(**compiled)
+
+
+def quote(showtime_id, seat_ids):
+    """
+    Price of the seats ``seat_ids`` of a showtime: the seats per zone
+    price, their unit price after the showtime's rules, and the total.
+    Raises ``UnknownSeats`` if a seat is not one of the showtime's and
+    ``Showtime.DoesNotExist`` if the showtime does not exist.
+    """
+    showtime_id = int(showtime_id)
+    rules = rules_for(showtime_id)
+    if rules is None:
+        raise Showtime.DoesNotExist(showtime_id)
+    seat_ids = set(seat_ids)
+    zones = (
+        Seat.objects.filter(showtime_id=showtime_id, id__in=seat_ids)
+        .values('price').annotate(seats=Count('id')).order_by('price')
+    )
+    lines = []
+    for zone in zones:
+        unit_price = rules.unit_price(zone['price'])
+        lines.append({
+            'price': zone['price'],
+            'unit_price': unit_price,
+            'seats': zone['seats'],
+            'subtotal': unit_price * zone['seats'],
+        })
+    if sum(line['seats'] for line in lines) != len(seat_ids):
+        raise UnknownSeats("One or more seats do not exist.")
+    return {
+        'showtime': showtime_id,
+        'seats': len(seat_ids),
+        'lines': lines,
+        'rules': rules.rules,
+        'total': sum((line['subtotal'] for line in lines), Decimal('0.00')),
+    }
+
+
+def cost(showtime_id, seat_ids):
+    """Total price of the seats, for a booking."""
+    return quote(showtime_id, seat_ids)['total']
@@ -0,0 +1,91 @@
+"""
+Per-movie user rating aggregates.
+
+``Movie.review_count``, ``review_total``, ``review_average`` and the
+``rating_<n>_count`` histogram follow every review write through signals,
+each as a single ``UPDATE`` of F-expressions, so concurrent reviews of the
+same movie never overwrite each other's counts and reads need no
+aggregation. ``reconcile`` recomputes them all from the reviews in one
+grouped query (``manage.py reconcile_ratings``).
+"""
+import math
+
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+
+from . import versions
+from .models import Movie, Review
+
+STARS = range(1, 6)
+FIELDS = ['review_count', 'review_total', 'review_average'] + [f'rating_{star}_count' for star in STARS]
+# each row adds a WHEN per field to the CASE of bulk_update; SQLite
+# rejects expression trees deeper than 1000
+UPDATE_BATCH_SIZE = 100
+
+
+def star(rating):
+    """Histogram bucket of a rating: the nearest whole star, 1 to 5."""
+    return min(5, max(1, int(rating + 0.5)))
+
+
+def star_filter(star):
+    q = Q()
+    if star > 1:
+        q &= Q(rating__gte=star - 0.5)
+    if star < 5:
+        q &= Q(rating__lt=star + 0.5)
+    return q
+
+
+def apply(movie_id, rating, sign):
+    """Add (``sign=1``) or remove (``sign=-1``) one review of ``rating``."""
+    count = F('review_count') + sign
+    total = F('review_total') + sign * rating
+    Movie.objects.filter(pk=movie_id).update(
+        review_count=count,
+        review_total=total,
+        review_average=Case(
+            When(review_count=-sign, then=Value(0.0)),
+            default=total / count,
+            output_field=FloatField()),
+        **{f'rating_{star(rating)}_count': F(f'rating_{star(rating)}_count') + sign},
+    )
+    versions.bump(Movie)
+
+
+def add(review):
+    apply(review.movie_id, review.rating, 1)
+
+
+def remove(review):
+    apply(review.movie_id, review.rating, -1)
+
+
+def histogram(movie):
+    return {star: getattr(movie, f'rating_{star}_count') for star in STARS}
+
+
+def reconcile(batch_size=500):
+    """
+    Recompute every movie's aggregates from its reviews. Returns the
+    number of movies whose stored values were wrong.
+    """
+    rows = Review.objects.order_by().values('movie_id').annotate(
+        review_count=Count('id'),
+        review_total=Sum('rating'),
+        **{f'rating_{star}_count': Count('id', filter=star_filter(star)) for star in STARS},
+    )
+    actual = {row.pop('movie_id'): row for row in rows}
+    stale = []
+    for movie in Movie.objects.only('id', *FIELDS).iterator(chunk_size=batch_size):
+        values = actual.get(movie.id) or dict.fromkeys(FIELDS, 0)
+        values['review_average'] = (
+            values['review_total'] / values['review_count'] if values['review_count'] else 0.0)
+        # the running average may differ from a fresh division in the last bit
+        if any(not math.isclose(getattr(movie, field), values[field]) for field in FIELDS):
+            for field in FIELDS:
+                setattr(movie, field, values[field])
+            stale.append(movie)
+    if stale:
+        Movie.objects.bulk_update(stale, FIELDS, batch_size=min(batch_size, UPDATE_BATCH_SIZE))
+        versions.bump(Movie)
+    return len(stale)
@@ -0,0 +1,63 @@
+"""
+Shared cache of anonymous catalog responses.
+
+Entries hold the serialized data of a response together with the ETag it
+was built under (see ``versions``), keyed by path and query string, so a
+write to any model the view renders invalidates it precisely: the next
+request computes a different ETag and the entry no longer matches.
+
+One request at a time rebuilds an entry. The others answer with the entry
+they found if there is one, or wait for the rebuild, so an expiry or a
+catalog change sends one query burst to the database instead of one per
+concurrent request.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+POLL_INTERVAL = 0.05
+
+
+def cache_key(request):
+    digest = hashlib.md5(
+        f"{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}".encode(),
+        usedforsecurity=False)
+    return f"response:{digest.hexdigest()}"
+
+
+def fetch(request, etag, render):
+    """
+    ``(etag, response)`` for ``request``: from the cache when an entry was
+    built under ``etag``, otherwise rendered by ``render()``. The etag
+    returned is that of the data actually served, which is an older one
+    while another request is rebuilding the entry.
+    """
+    key = cache_key(request)
+    entry = cache.get(key)
+    if entry and entry[0] == etag:
+        return etag, Response(entry[1])
+    lock = f"{key}:lock"
+    if cache.add(lock, 1, settings.RESPONSE_CACHE_LOCK_TIMEOUT):
+        try:
+            response = render()
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, (etag, response.data), settings.RESPONSE_CACHE_TIMEOUT)
+            return etag, response
+        finally:
+            cache.delete(lock)
+    if entry:
+        return entry[0], Response(entry[1])
+    deadline = time.monotonic() + settings.RESPONSE_CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry and entry[0] == etag:
+            return etag, Response(entry[1])
+        if cache.get(lock) is None:
+            break
+    # the rebuild had nothing to cache (an error) or is taking too long
+    return etag, render()
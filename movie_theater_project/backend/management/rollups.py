@@ -0,0 +1,284 @@
+"""
+Daily and hourly rollups behind the admin dashboard.
+
+Every metric is rebuilt per day from the source tables, so a day can be
+recomputed at any time and the result does not depend on what happened
+before. Writes mark the day they affect in ``RollupDirtyDay`` (signals
+for single rows, explicit calls for bulk updates); ``refresh_dirty`` runs
+periodically and recomputes those days together with today and every
+day that still has upcoming showtimes, whose occupancy keeps changing.
+``backfill`` rebuilds a whole range. Per-user figures are counted on the
+day they first happen (a user's first booking, second booking, first
+completed payment), so they add up across days like the others; changes
+that can move those firsts mark their days with ``mark_user_firsts_dirty``.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncHour
+from django.utils import timezone
+
+from .models import (
+    AuditoriumDailyRollup, Booking, DailyRollup, Favourite, HourlyRollup, MovieDailyRollup,
+    Payment, RateService, Review, RollupDirtyDay, Showtime, watchlist,
+)
+
+User = get_user_model()
+
+
+def local_day(moment):
+    return timezone.localtime(moment).date() if moment else None
+
+
+def mark_dirty(*moments):
+    """Queue the days of the given datetimes for the next refresh."""
+    days = {local_day(moment) for moment in moments} - {None}
+    RollupDirtyDay.objects.bulk_create(
+        [RollupDirtyDay(day=day) for day in days], ignore_conflicts=True)
+
+
+def mark_bookings_dirty(booking_ids):
+    """Queue the days of bookings changed with ``QuerySet.update``."""
+    moments = Booking.objects.filter(id__in=booking_ids).values_list('created_at', flat=True)
+    mark_dirty(*set(moments))
+
+
+def mark_showtimes_dirty(showtime_ids):
+    """Queue the days of showtimes whose seats changed in bulk."""
+    moments = Showtime.objects.filter(id__in=showtime_ids).values_list('start_time', flat=True)
+    mark_dirty(*set(moments))
+
+
+def mark_user_firsts_dirty(user_id):
+    """
+    Queue the days of a user's first two bookings and completed payments:
+    deleting a booking or changing a payment can move which rows those are.
+    """
+    firsts = (
+        Booking.objects.filter(user_id=user_id),
+        Payment.objects.filter(user_id=user_id, status='Completed'),
+    )
+    mark_dirty(*(
+        moment for queryset in firsts
+        for moment in queryset.order_by('created_at', 'id').values_list('created_at', flat=True)[:2]
+    ))
+
+
+def _prior(model, **filters):
+    """The number of the same user's earlier rows of ``model``, as an annotation."""
+    earlier = (
+        model.objects.filter(
+            Q(created_at__lt=OuterRef('created_at')) | Q(created_at=OuterRef('created_at'), id__lt=OuterRef('id')),
+            user_id=OuterRef('user_id'), **filters)
+        .order_by().values('user_id').annotate(n=Count('id')).values('n')
+    )
+    return Coalesce(Subquery(earlier), 0)
+
+
+def _bounds(first_day, last_day):
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(first_day, time.min), tz),
+        timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min), tz),
+    )
+
+
+def _by_day(queryset, field, *group, **aggregates):
+    """Group ``queryset`` by the local day of ``field`` (plus ``group``)."""
+    return (
+        queryset.annotate(day=TruncDate(field))
+        .values('day', *group)
+        .annotate(**aggregates)
+        .order_by()
+    )
+
+
+def refresh_range(first_day, last_day):
+    """Recompute every rollup of the days ``first_day`` to ``last_day``."""
+    start, end = _bounds(first_day, last_day)
+
+    daily = defaultdict(dict)
+    for row in _by_day(User.objects.filter(date_joined__gte=start, date_joined__lt=end),
+                       'date_joined', n=Count('id'),
+                       active=Count('id', filter=Q(is_active=True)),
+                       verified=Count('id', filter=Q(is_active=True, email_verified=True))):
+        daily[row['day']].update(
+            signups=row['n'], active_signups=row['active'], verified_signups=row['verified'])
+    for row in _by_day(
+            Booking.objects.filter(created_at__gte=start, created_at__lt=end).annotate(prior=_prior(Booking)),
+            'created_at',
+            first=Count('id', filter=Q(prior=0)),
+            repeat=Count('id', filter=Q(prior=1))):
+        daily[row['day']].update(first_bookings=row['first'], repeat_bookings=row['repeat'])
+    for row in _by_day(
+            Payment.objects.filter(created_at__gte=start, created_at__lt=end, status='Completed')
+            .annotate(prior=_prior(Payment, status='Completed')),
+            'created_at', first=Count('id', filter=Q(prior=0))):
+        daily[row['day']]['first_payments'] = row['first']
+    # retention looks back 30 days from each past day and today
+    day = first_day
+    while day <= min(last_day, timezone.localdate()):
+        window_end = _bounds(day, day)[1]
+        window_start = window_end - timedelta(days=30)
+        retained = (
+            Booking.objects.filter(created_at__gte=window_start, created_at__lt=window_end,
+                                   user__date_joined__lt=window_start)
+            .values('user_id').distinct().count())
+        if retained:
+            daily[day]['retained_users'] = retained
+        day += timedelta(days=1)
+    confirmed = Q(status='Confirmed')
+    for row in _by_day(
+            Booking.objects.filter(created_at__gte=start, created_at__lt=end), 'created_at',
+            total=Count('id'),
+            pending=Count('id', filter=Q(status='Pending')),
+            confirmed=Count('id', filter=confirmed),
+            cancelled=Count('id', filter=Q(status='Cancelled')),
+            attended=Count('id', filter=Q(attended=True)),
+            lead=Sum(F('showtime__start_time') - F('created_at'), filter=confirmed)):
+        daily[row['day']].update(
+            bookings=row['total'],
+            bookings_pending=row['pending'],
+            bookings_confirmed=row['confirmed'],
+            bookings_cancelled=row['cancelled'],
+            bookings_attended=row['attended'],
+            lead_seconds=row['lead'].total_seconds() if row['lead'] else 0,
+            lead_bookings=row['confirmed'],
+        )
+    for row in _by_day(
+            Payment.objects.filter(created_at__gte=start, created_at__lt=end), 'created_at',
+            revenue=Sum('amount', filter=Q(status='Completed')),
+            refunds=Sum('amount', filter=Q(status='Refunded')),
+            failed=Count('id', filter=Q(status__in=['Failed', 'Error']))):
+        daily[row['day']].update(
+            revenue=row['revenue'] or Decimal('0'),
+            refunds=row['refunds'] or Decimal('0'),
+            failed_payments=row['failed'],
+        )
+
+    hourly = defaultdict(dict)
+    for model, field, key, value in (
+            (User, 'date_joined', 'signups', Count('id')),
+            (Booking, 'created_at', 'bookings', Count('id')),
+            (Payment, 'created_at', 'revenue', Sum('amount', filter=Q(status='Completed')))):
+        rows = (
+            model.objects.filter(**{f'{field}__gte': start, f'{field}__lt': end})
+            .annotate(hour=TruncHour(field)).values('hour').annotate(value=value).order_by()
+        )
+        for row in rows:
+            hourly[row['hour']][key] = row['value'] or 0
+
+    movies = defaultdict(dict)
+    for row in _by_day(Booking.objects.filter(created_at__gte=start, created_at__lt=end),
+                       'created_at', 'showtime__movie_id', n=Count('id')):
+        movies[row['day'], row['showtime__movie_id']]['bookings'] = row['n']
+    for row in _by_day(
+            Payment.objects.filter(created_at__gte=start, created_at__lt=end, status='Completed',
+                                   booking__isnull=False),
+            'created_at', 'booking__showtime__movie_id', total=Sum('amount')):
+        movies[row['day'], row['booking__showtime__movie_id']]['revenue'] = row['total']
+    for row in _by_day(Review.objects.filter(created_at__gte=start, created_at__lt=end),
+                       'created_at', 'movie_id', n=Count('id'), total=Sum('rating')):
+        movies[row['day'], row['movie_id']].update(reviews=row['n'], review_rating_sum=row['total'] or 0)
+    for model, key in ((Favourite, 'favourites'), (watchlist, 'watchlists')):
+        for row in _by_day(model.objects.filter(added_at__gte=start, added_at__lt=end),
+                           'added_at', 'movie_id', n=Count('id')):
+            movies[row['day'], row['movie_id']][key] = row['n']
+
+    # occupancy and service ratings count on the day of the showtime
+    auditoriums = defaultdict(dict)
+    for row in _by_day(
+            Showtime.objects.filter(start_time__gte=start, start_time__lt=end, auditorium__isnull=False),
+            'start_time', 'auditorium_id',
+            seats=Sum('auditorium__total_seats'),
+            free=Sum('available_seats')):
+        auditoriums[row['day'], row['auditorium_id']].update(
+            seats=row['seats'], seats_booked=max(row['seats'] - row['free'], 0))
+    for row in _by_day(
+            RateService.objects.filter(
+                booking__showtime__start_time__gte=start, booking__showtime__start_time__lt=end,
+                booking__showtime__auditorium__isnull=False),
+            'booking__showtime__start_time', 'booking__showtime__auditorium_id',
+            n=Count('id'), total=Sum('all_rating')):
+        auditoriums[row['day'], row['booking__showtime__auditorium_id']].update(
+            service_ratings=row['n'], service_rating_sum=row['total'] or 0)
+
+    with transaction.atomic():
+        DailyRollup.objects.filter(day__gte=first_day, day__lte=last_day).delete()
+        HourlyRollup.objects.filter(hour__gte=start, hour__lt=end).delete()
+        MovieDailyRollup.objects.filter(day__gte=first_day, day__lte=last_day).delete()
+        AuditoriumDailyRollup.objects.filter(day__gte=first_day, day__lte=last_day).delete()
+        DailyRollup.objects.bulk_create(
+            [DailyRollup(day=day, **values) for day, values in daily.items()])
+        HourlyRollup.objects.bulk_create(
+            [HourlyRollup(hour=hour, **values) for hour, values in hourly.items()])
+        MovieDailyRollup.objects.bulk_create(
+            [MovieDailyRollup(day=day, movie_id=movie_id, **values)
+             for (day, movie_id), values in movies.items()])
+        AuditoriumDailyRollup.objects.bulk_create(
+            [AuditoriumDailyRollup(day=day, auditorium_id=auditorium_id, **values)
+             for (day, auditorium_id), values in auditoriums.items()])
+
+
+def refresh_dirty():
+    """
+    Recompute the queued days, today and the days with upcoming showtimes.
+    Returns the number of days recomputed.
+    """
+    today = timezone.localdate()
+    with transaction.atomic():
+        # taken off the queue first: a write during the refresh re-queues
+        # its day for the next run
+        dirty = set(RollupDirtyDay.objects.values_list('day', flat=True))
+        RollupDirtyDay.objects.filter(day__in=dirty).delete()
+    last_showtime = Showtime.objects.filter(start_time__gte=timezone.now()).aggregate(
+        last=Max('start_time'))['last']
+    last_day = max(today, local_day(last_showtime) or today)
+    refresh_range(today, last_day)
+    past = sorted(day for day in dirty if day < today or day > last_day)
+    for day in past:
+        refresh_range(day, day)
+    return (last_day - today).days + 1 + len(past)
+
+
+def history_bounds():
+    """First and last day with any dashboard data, or None."""
+    firsts = []
+    lasts = []
+    for queryset, field in (
+            (User.objects, 'date_joined'),
+            (Booking.objects, 'created_at'),
+            (Payment.objects, 'created_at'),
+            (Review.objects, 'created_at'),
+            (Favourite.objects, 'added_at'),
+            (watchlist.objects, 'added_at'),
+            (Showtime.objects, 'start_time')):
+        bounds = queryset.aggregate(first=Min(field), last=Max(field))
+        if bounds['first']:
+            firsts.append(bounds['first'])
+            lasts.append(bounds['last'])
+    if not firsts:
+        return None
+    return local_day(min(firsts)), max(local_day(max(lasts)), timezone.localdate())
+
+
+def backfill(first_day=None, last_day=None, chunk_days=31):
+    """
+    Rebuild the rollups of ``first_day`` to ``last_day`` (default: the
+    whole history), ``chunk_days`` at a time. Yields each finished chunk.
+    """
+    bounds = history_bounds()
+    if bounds is None:
+        return
+    first_day = first_day or bounds[0]
+    last_day = last_day or bounds[1]
+    day = first_day
+    while day <= last_day:
+        chunk_end = min(day + timedelta(days=chunk_days - 1), last_day)
+        refresh_range(day, chunk_end)
+        yield day, chunk_end
+        day = chunk_end + timedelta(days=1)
@@ -0,0 +1,175 @@
+"""
+Ranked full-text search over the movie catalog.
+
+Each movie is indexed as one denormalized document (title; cast, crew and
+character names; genres; description, weighted in that order) in a
+search table created by migration 0024: an FTS5 virtual table on SQLite
+and a tsvector column with a GIN index on PostgreSQL. ``matching`` joins
+a movie queryset to the search table, keeping the movies that match every
+query term as a prefix and annotating their ``search_rank`` (lower is
+better), so ranking and pagination run in SQL over every match.
+Signals call ``reindex`` when a movie, its roles or its people change;
+``rebuild`` (the ``rebuild_search_index`` command) indexes everything.
+"""
+import re
+
+from django.db import connection
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from . import versions
+from .models import Movie
+
+TABLE = 'management_movie_search'
+
+
+def documents(movie_ids=None):
+    """``{movie_id: (title, people, genres, description)}``"""
+    movies = Movie.objects.select_related('director', 'producer').prefetch_related(
+        'genre', 'actors', 'roles__actor')
+    if movie_ids is not None:
+        movies = movies.filter(id__in=movie_ids)
+    docs = {}
+    for movie in movies:
+        people = [person.name for person in (movie.director, movie.producer) if person]
+        people += [actor.name for actor in movie.actors.all()]
+        for role in movie.roles.all():
+            people += [role.actor.name, role.character_name]
+        docs[movie.id] = (
+            movie.title,
+            ' '.join(dict.fromkeys(people)),
+            ' '.join(genre.name for genre in movie.genre.all()),
+            movie.description or '',
+        )
+    return docs
+
+
+def terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+class SQLiteBackend:
+    # bm25 weights of title, people, genres, description
+    weights = '10.0, 4.0, 2.0, 1.0'
+
+    def store(self, cursor, docs):
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (rowid, title, people, genres, description) VALUES (%s, %s, %s, %s, %s)",
+            [(movie_id, *doc) for movie_id, doc in docs.items()])
+
+    def delete(self, cursor, movie_ids):
+        cursor.execute(
+            f"DELETE FROM {TABLE} WHERE rowid IN ({', '.join(['%s'] * len(movie_ids))})", list(movie_ids))
+
+    def clear(self, cursor):
+        cursor.execute(f"DELETE FROM {TABLE}")
+
+    def join(self, queryset, words):
+        match = ' '.join(f'"{word}"*' for word in words)
+        return queryset.extra(
+            tables=[TABLE],
+            where=[f"{TABLE}.rowid = {Movie._meta.db_table}.id", f"{TABLE} MATCH %s"],
+            params=[match],
+            select={'search_rank': f"bm25({TABLE}, {self.weights})"},
+        )
+
+
+class PostgresBackend:
+    vector = (
+        "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B') || "
+        "setweight(to_tsvector('simple', %s), 'C') || setweight(to_tsvector('simple', %s), 'D')"
+    )
+
+    def store(self, cursor, docs):
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (movie_id, document) VALUES (%s, {self.vector})",
+            [(movie_id, *doc) for movie_id, doc in docs.items()])
+
+    def delete(self, cursor, movie_ids):
+        cursor.execute(f"DELETE FROM {TABLE} WHERE movie_id = ANY(%s)", [list(movie_ids)])
+
+    def clear(self, cursor):
+        cursor.execute(f"TRUNCATE {TABLE}")
+
+    def join(self, queryset, words):
+        query = ' & '.join(f'{word}:*' for word in words)
+        return queryset.extra(
+            tables=[TABLE],
+            where=[f"{TABLE}.movie_id = {Movie._meta.db_table}.id",
+                   f"{TABLE}.document @@ to_tsquery('simple', %s)"],
+            params=[query],
+            select={'search_rank': f"-ts_rank_cd({TABLE}.document, to_tsquery('simple', %s))"},
+            select_params=[query],
+        )
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend,
+    'postgresql': PostgresBackend,
+}
+
+
+def get_backend():
+    return BACKENDS[connection.vendor]()
+
+
+def reindex(movie_ids):
+    """Re-index the given movies; ids of deleted movies are dropped."""
+    movie_ids = set(movie_ids)
+    if not movie_ids:
+        return
+    backend = get_backend()
+    with connection.cursor() as cursor:
+        backend.delete(cursor, movie_ids)
+        backend.store(cursor, documents(movie_ids))
+
+
+def rebuild():
+    """Index the whole catalog from scratch. Returns the number of movies."""
+    backend = get_backend()
+    docs = documents()
+    with connection.cursor() as cursor:
+        backend.clear(cursor)
+        backend.store(cursor, docs)
+    # ?search= results can change without any catalog write
+    versions.bump(Movie)
+    return len(docs)
+
+
+def matching(queryset, query):
+    """
+    The movies of ``queryset`` matching every term of ``query``, annotated
+    with ``search_rank``; None if ``query`` has no terms.
+    """
+    words = terms(query)
+    if not words:
+        return None
+    return get_backend().join(queryset, words)
+
+
+def search(query, limit=None):
+    """Ids of the movies matching every term of ``query``, best first."""
+    movies = matching(Movie.objects.all(), query)
+    if movies is None:
+        return []
+    ranked = movies.order_by('search_rank', 'id').values_list('id', 'search_rank')
+    return [movie_id for movie_id, _ in ranked[:limit]]
+
+
+class MovieSearchFilter(BaseFilterBackend):
+    """
+    ``?search=`` through the search index. Results are ranked unless the
+    request asks for an explicit ``?ordering=``; list it after
+    OrderingFilter so the rank is not overridden by the default ordering.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+        movies = matching(queryset, query)
+        if movies is None:
+            return queryset.none()
+        if OrderingFilter.ordering_param in request.query_params:
+            return movies
+        return movies.order_by('search_rank', 'id')
@@ -0,0 +1,223 @@
+"""
+Compact per-showtime seat availability maps.
+
+The seat picker polls the seat endpoints of a showtime continuously, so
+instead of querying and serializing every ``Seat`` row on each request the
+seats of a showtime are kept in the cache as one snapshot, and served either
+in the usual list shape or as a packed bitmap. The snapshot is derived from
+``Seat.is_booked`` and dropped whenever a booking changes it; the next read
+rebuilds it with a single query.
+
+Showtimes whose auditorium has a ``SeatLayout`` only store ``Seat`` rows
+for seats that were booked (checkout holds live in ``holds``). Their snapshot merges those rows into
+the layout, and ``materialize`` creates the rows on demand when a seat is
+booked.
+"""
+import base64
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Seat, Showtime
+
+SEAT_NUMBER_RE = re.compile(r'^([A-Za-z]*)(\d+)$')
+
+
+def cache_key(showtime_id):
+    return f"seatmap:{showtime_id}"
+
+
+def split_seat_number(seat_number):
+    """Split a seat number such as ``"B12"`` into ``("B", 12)``."""
+    match = SEAT_NUMBER_RE.match(seat_number.strip())
+    if not match:
+        # unusual labels get a row of their own
+        return seat_number, 1
+    return match.group(1).upper(), int(match.group(2))
+
+
+def row_sort_key(label):
+    # A, B, ..., Z, AA, AB, ...
+    return (len(label), label)
+
+
+def pack_bits(positions, size):
+    """Pack a set of bit positions into a base64 string, MSB first."""
+    bits = bytearray((size + 7) // 8)
+    for pos in positions:
+        bits[pos >> 3] |= 0x80 >> (pos & 7)
+    return base64.b64encode(bytes(bits)).decode('ascii')
+
+
+class SeatMap:
+    """Availability snapshot of every seat of one showtime."""
+
+    def __init__(self, showtime_id, seats, rows=None, columns=None):
+        # seats: list of (id, seat_number, is_booked, price); id is None for
+        # layout seats that have no Seat row yet
+        self.showtime_id = showtime_id
+        self.seats = seats
+        if rows is None:
+            labels = {}
+            columns = 0
+            for _, seat_number, _, _ in seats:
+                row, column = split_seat_number(seat_number)
+                labels[row] = None
+                columns = max(columns, column)
+            rows = sorted(labels, key=row_sort_key)
+        self.rows = rows
+        self.columns = columns
+        self.row_index = {label: i for i, label in enumerate(rows)}
+        # seat numbers under a checkout hold, filled in by the caller
+        self.held = set()
+
+    def position(self, seat_number):
+        """Bit position of a seat, or None if it falls outside the grid."""
+        row, column = split_seat_number(seat_number)
+        if row not in self.row_index or not 1 <= column <= self.columns:
+            return None
+        return self.row_index[row] * self.columns + column - 1
+
+    def is_free(self, seat):
+        return not seat[2] and seat[1] not in self.held
+
+    @property
+    def available(self):
+        return sum(1 for seat in self.seats if self.is_free(seat))
+
+    def as_list(self, available_only=False):
+        """Seat list in the same shape ``SeatSerializer`` produces."""
+        return [
+            {
+                'id': seat_id,
+                'showtime': self.showtime_id,
+                'seat_number': seat_number,
+                'is_booked': is_booked,
+                'price': price,
+            }
+            for seat_id, seat_number, is_booked, price in self.seats
+            if not available_only or self.is_free((seat_id, seat_number, is_booked, price))
+        ]
+
+    def as_compact(self):
+        """
+        Row/column layout plus packed ``seats``, ``booked`` and ``held``
+        bitmaps.
+        """
+        size = len(self.rows) * self.columns
+        present = []
+        booked = []
+        held = []
+        for _, seat_number, is_booked, _ in self.seats:
+            pos = self.position(seat_number)
+            if pos is None:
+                continue
+            present.append(pos)
+            if is_booked:
+                booked.append(pos)
+            elif seat_number in self.held:
+                held.append(pos)
+        return {
+            'showtime': self.showtime_id,
+            'rows': self.rows,
+            'columns': self.columns,
+            'seats': pack_bits(present, size),
+            'booked': pack_bits(booked, size),
+            'held': pack_bits(held, size),
+            'available': self.available,
+        }
+
+
+def load(showtime_id):
+    """
+    Read the seats of a showtime into a cacheable snapshot, or None if the
+    showtime does not exist.
+    """
+    showtime = Showtime.objects.select_related(
+        'auditorium__layout').filter(pk=showtime_id).first()
+    if showtime is None:
+        return None
+    stored = [
+        (seat_id, seat_number, is_booked, f"{price:.2f}")
+        for seat_id, seat_number, is_booked, price in Seat.objects.filter(
+            showtime_id=showtime_id
+        ).order_by('id').values_list('id', 'seat_number', 'is_booked', 'price')
+    ]
+    layout = showtime.seat_layout
+    if layout is None:
+        return {'rows': None, 'columns': None, 'seats': stored}
+
+    by_number = {seat[1]: seat for seat in stored}
+    seats = []
+    for seat_number in layout.seat_numbers():
+        seat = by_number.pop(seat_number, None)
+        if seat is None:
+            price = f"{layout.price_for(seat_number):.2f}"
+            seat = (None, seat_number, False, price)
+        seats.append(seat)
+    # rows created before the layout existed are kept at the end
+    seats.extend(seat for seat in stored if seat[1] in by_number)
+    return {
+        'rows': layout.row_labels(),
+        'columns': layout.columns,
+        'seats': seats,
+    }
+
+
+def get(showtime_id):
+    """
+    Return the cached map of a showtime, building it on a miss.
+    Returns None if the showtime does not exist.
+    """
+    try:
+        showtime_id = int(showtime_id)
+    except (TypeError, ValueError):
+        return None
+    key = cache_key(showtime_id)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = load(showtime_id)
+        if snapshot is None:
+            return None
+        cache.set(key, snapshot, settings.SEAT_MAP_CACHE_TIMEOUT)
+    return SeatMap(showtime_id, **snapshot)
+
+
+def invalidate(*showtime_ids):
+    """
+    Drop the cached maps of the given showtimes. Called by everything that
+    books or releases seats; the drop is repeated after commit so a reader
+    racing the transaction cannot keep a stale map around.
+    """
+    keys = [cache_key(pk) for pk in showtime_ids]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def materialize(showtime, seat_numbers):
+    """
+    Return the ``Seat`` rows for the given seat numbers of a showtime,
+    creating the missing ones from the auditorium layout. Numbers that are
+    not part of the layout (or of the stored rows, for showtimes without a
+    layout) are left out of the result.
+    """
+    seat_numbers = set(seat_numbers)
+    layout = showtime.seat_layout
+    if layout is not None:
+        Seat.objects.bulk_create(
+            [
+                Seat(
+                    showtime=showtime,
+                    seat_number=seat_number,
+                    price=layout.price_for(seat_number))
+                for seat_number in seat_numbers
+                if layout.has_seat(seat_number)
+            ],
+            ignore_conflicts=True,
+        )
+    return list(Seat.objects.filter(
+        showtime=showtime, seat_number__in=seat_numbers))
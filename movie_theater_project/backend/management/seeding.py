@@ -0,0 +1,347 @@
+"""
+Synthetic catalog and booking data at production volumes.
+
+Rows are generated in memory and written with ``bulk_create`` in chunks,
+one transaction per chunk, bypassing ``save()`` and the signals; the
+derived state they would maintain (search index, rating aggregates,
+dashboard rollups, catalog versions) is rebuilt once at the end. The same
+``seed`` always produces the same data. Seat counters are consistent:
+every showtime's ``available_seats`` is its capacity minus the seats of
+its bookings, and each booked seat belongs to exactly one booking.
+
+Popularity follows a Zipf law (``skew``; 0 is uniform): the most popular
+movies get most of the showtimes, and so of the bookings, and most of the
+reviews. ``peak_share`` of the showtimes start in the evening peak.
+Used by the ``seed_theater`` command and the benchmark suite.
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import ratings, rollups, search, versions
+from .models import (
+    Actor, Auditorium, Booking, Director, Genre, Movie, Notification, Payment, Producer, Review,
+    Role, Seat, SeatLayout, Showtime, Theater, User,
+)
+
+GENRES = [
+    'Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Family',
+    'Fantasy', 'History', 'Horror', 'Music', 'Mystery', 'Romance', 'Sci-Fi', 'Thriller', 'War',
+]
+WORDS = [
+    'midnight', 'silent', 'river', 'empire', 'shadow', 'garden', 'storm', 'echo', 'crimson',
+    'harbor', 'frontier', 'glass', 'winter', 'signal', 'orbit', 'paper', 'wolves', 'kingdom',
+    'velvet', 'lantern', 'desert', 'ghost', 'summer', 'machine', 'island', 'broken', 'golden',
+    'city', 'memory', 'horizon', 'last', 'secret', 'wild', 'iron', 'blue', 'distant',
+]
+FIRST_NAMES = [
+    'Ada', 'Bruno', 'Chloe', 'Dev', 'Elena', 'Farid', 'Grace', 'Hiro', 'Ines', 'Jonas', 'Kira',
+    'Luca', 'Maya', 'Nils', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Sami', 'Tara', 'Umar', 'Vera',
+]
+LAST_NAMES = [
+    'Abbott', 'Berg', 'Costa', 'Dumont', 'Ekwueme', 'Fischer', 'Garcia', 'Haddad', 'Ito',
+    'Jensen', 'Kowalski', 'Larsen', 'Moreau', 'Novak', 'Okafor', 'Park', 'Rossi', 'Silva',
+]
+LANGUAGES = ['English'] * 6 + ['French', 'Spanish', 'German', 'Japanese']
+OPENING_HOURS = range(10, 24)
+PEAK_HOURS = range(18, 23)
+PAYMENT_METHODS = ['Credit Card'] * 6 + ['Debit Card'] * 3 + ['PayPal']
+SEATS_PER_ROW = 10
+SEAT_PRICE = Decimal('10.00')
+
+
+def person_name(i):
+    first = FIRST_NAMES[i % len(FIRST_NAMES)]
+    last = LAST_NAMES[i // len(FIRST_NAMES) % len(LAST_NAMES)]
+    lap = i // (len(FIRST_NAMES) * len(LAST_NAMES))
+    return f"{first} {last}" + (f" {lap + 1}" if lap else "")
+
+
+def seat_number(index):
+    return f"{SeatLayout.row_label(index // SEATS_PER_ROW)}{index % SEATS_PER_ROW + 1}"
+
+
+def chunked(count, size):
+    for start in range(0, count, size):
+        yield range(start, min(start + size, count))
+
+
+def zipf_weights(count, skew):
+    """Cumulative weights of ranks ``0 .. count - 1``, for ``Random.choices``."""
+    total, weights = 0.0, []
+    for rank in range(count):
+        total += 1 / (rank + 1) ** skew
+        weights.append(total)
+    return weights
+
+
+@contextmanager
+def historical_timestamps(*models):
+    """Let ``bulk_create`` keep the ``auto_now_add`` values it is given."""
+    fields = [field for model in models for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def bulk_create_named(model, names):
+    """Rows of ``model`` with the unique ``names``, creating the missing ones."""
+    model.objects.bulk_create((model(name=name) for name in names), ignore_conflicts=True)
+    rows = []
+    # stay below the SQLite limit of query parameters
+    for part in chunked(len(names), 900):
+        rows += model.objects.filter(name__in=names[part.start:part.stop])
+    return rows
+
+
+class Seeder:
+    """
+    Generates the data; ``run`` does everything in order. ``log`` receives
+    one line per finished step.
+    """
+
+    def __init__(self, theaters=5, auditoriums_per_theater=4, seats_per_showtime=40,
+                 movies=200, people=None, showtimes=2000, days_back=30, days_ahead=14,
+                 users=500, occupancy=0.3, skew=1.0, peak_share=0.6, reviews=None,
+                 failed_payments=0.05, seed=0, chunk_size=5000, log=None):
+        self.theaters = theaters
+        self.auditoriums_per_theater = auditoriums_per_theater
+        self.seats_per_showtime = seats_per_showtime
+        self.movies = movies
+        self.people = people or max(movies // 2, 30)
+        self.showtimes = showtimes
+        self.days_back = days_back
+        self.days_ahead = days_ahead
+        self.users = users
+        self.occupancy = occupancy
+        self.skew = skew
+        self.peak_share = peak_share
+        self.reviews = movies * 5 if reviews is None else reviews
+        self.failed_payments = failed_payments
+        self.random = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.log = log or (lambda line: None)
+        self.now = timezone.localtime().replace(minute=0, second=0, microsecond=0)
+        self.counts = {}
+
+    def run(self):
+        with historical_timestamps(Booking, Payment, Review, Notification):
+            self.seed_venues()
+            self.seed_catalog()
+            self.seed_users()
+            self.seed_showtimes()
+            self.seed_reviews()
+        self.finish()
+        return self.counts
+
+    def count(self, name, n):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    # -- venues and catalog ------------------------------------------------
+    def seed_venues(self):
+        theaters = Theater.objects.bulk_create(
+            Theater(name=f"Cinema {i + 1}", location=f"District {i % 12 + 1}")
+            for i in range(self.theaters))
+        self.auditoriums = Auditorium.objects.bulk_create(
+            Auditorium(name=f"Hall {j + 1}", theater=theater,
+                       total_seats=self.seats_per_showtime, available_seats=self.seats_per_showtime)
+            for theater in theaters for j in range(self.auditoriums_per_theater))
+        self.count('theaters', len(theaters))
+        self.count('auditoriums', len(self.auditoriums))
+        self.log(f"{len(theaters)} theaters, {len(self.auditoriums)} auditoriums")
+
+    def words(self, n):
+        return ' '.join(self.random.choice(WORDS) for _ in range(n))
+
+    def seed_catalog(self):
+        rnd = self.random
+        genres = bulk_create_named(Genre, GENRES)
+        actors = bulk_create_named(Actor, [person_name(i) for i in range(self.people)])
+        crew = [person_name(i) for i in range(self.people // 4 + 1)]
+        directors = bulk_create_named(Director, crew)
+        producers = bulk_create_named(Producer, crew)
+        # in order of popularity
+        self.movie_ids, self.titles, self.quality = [], {}, {}
+        for chunk in chunked(self.movies, self.chunk_size):
+            with transaction.atomic():
+                movies = Movie.objects.bulk_create(
+                    Movie(
+                        title=self.words(rnd.randint(1, 3)).title(),
+                        description=self.words(12).capitalize() + '.',
+                        release_date=(self.now - timedelta(days=rnd.randint(0, 3650))).date(),
+                        rating=Decimal(rnd.randint(10, 95)) / 10,
+                        duration=timedelta(minutes=rnd.randint(80, 180)),
+                        director=rnd.choice(directors),
+                        producer=rnd.choice(producers),
+                    )
+                    for _ in chunk)
+                genre_links, actor_links, roles = [], [], []
+                for movie in movies:
+                    for genre in rnd.sample(genres, rnd.randint(1, 3)):
+                        genre_links.append(Movie.genre.through(movie_id=movie.id, genre_id=genre.id))
+                    for actor in rnd.sample(actors, min(len(actors), rnd.randint(3, 6))):
+                        actor_links.append(Movie.actors.through(movie_id=movie.id, actor_id=actor.id))
+                        roles.append(Role(movie=movie, actor=actor, character_name=self.words(2).title()))
+                Movie.genre.through.objects.bulk_create(genre_links)
+                Movie.actors.through.objects.bulk_create(actor_links)
+                Role.objects.bulk_create(roles)
+            for movie in movies:
+                self.movie_ids.append(movie.id)
+                self.titles[movie.id] = movie.title
+                self.quality[movie.id] = float(movie.rating) / 2
+            self.count('movies', len(movies))
+            self.count('roles', len(roles))
+        self.popularity = zipf_weights(len(self.movie_ids), self.skew)
+        self.count('people', len(actors) + len(directors) + len(producers))
+        self.log(f"{len(self.movie_ids)} movies, {self.counts['roles']} roles")
+
+    def seed_users(self):
+        self.user_ids = []
+        for chunk in chunked(self.users, self.chunk_size):
+            users = User.objects.bulk_create(
+                User(username=f"seed-{i}", email=f"seed-{i}@example.com", password='!',
+                     date_joined=self.now - timedelta(hours=self.random.randint(0, 24 * self.days_back)))
+                for i in chunk)
+            self.user_ids += [user.id for user in users]
+        self.count('users', len(self.user_ids))
+        self.log(f"{len(self.user_ids)} users")
+
+    # -- showtimes, seats and bookings ---------------------------------------
+    def pick_movie(self):
+        return self.random.choices(self.movie_ids, cum_weights=self.popularity)[0]
+
+    def pick_start(self):
+        day = self.random.randint(-self.days_back, self.days_ahead)
+        hours = PEAK_HOURS if self.random.random() < self.peak_share else OPENING_HOURS
+        minute = self.random.choice([0, 15, 30, 45])
+        return self.now.replace(hour=0) + timedelta(days=day, hours=self.random.choice(hours), minutes=minute)
+
+    def booked_seats(self, capacity):
+        share = min(1.0, max(0.0, self.random.gauss(self.occupancy, self.occupancy / 2)))
+        return int(capacity * share)
+
+    def seed_showtimes(self):
+        for chunk in chunked(self.showtimes, self.chunk_size):
+            with transaction.atomic():
+                self.seed_showtime_chunk(len(chunk))
+        self.log(f"{self.counts.get('showtimes', 0)} showtimes, {self.counts.get('seats', 0)} seats, "
+                 f"{self.counts.get('bookings', 0)} bookings, {self.counts.get('payments', 0)} payments, "
+                 f"{self.counts.get('notifications', 0)} notifications")
+
+    def seed_showtime_chunk(self, size):
+        rnd = self.random
+        plans = []
+        for _ in range(size):
+            auditorium = rnd.choice(self.auditoriums)
+            start = self.pick_start()
+            capacity = auditorium.total_seats
+            booked = self.booked_seats(capacity)
+            plans.append((Showtime(
+                movie_id=self.pick_movie(), auditorium=auditorium, start_time=start,
+                end_time=start + timedelta(hours=2), language=rnd.choice(LANGUAGES),
+                is_VIP=rnd.random() < 0.1, thD_available=rnd.random() < 0.3,
+                available_seats=capacity - booked,
+            ), capacity, booked))
+        showtimes = Showtime.objects.bulk_create(plan[0] for plan in plans)
+        seats = Seat.objects.bulk_create(
+            Seat(showtime=showtime, seat_number=seat_number(i), is_booked=i < booked, price=SEAT_PRICE)
+            for showtime, capacity, booked in plans for i in range(capacity))
+
+        bookings, booking_seats = [], []
+        offset = 0
+        for showtime, capacity, booked in plans:
+            taken = 0
+            while taken < booked:
+                size = min(rnd.randint(1, 4), booked - taken)
+                bookings.append(self.booking(showtime, size))
+                booking_seats.append(seats[offset + taken:offset + taken + size])
+                taken += size
+            offset += capacity
+        bookings = Booking.objects.bulk_create(bookings)
+        Booking.seats.through.objects.bulk_create(
+            Booking.seats.through(booking_id=booking.id, seat_id=seat.id)
+            for booking, held in zip(bookings, booking_seats) for seat in held)
+        self.count('showtimes', len(showtimes))
+        self.count('seats', len(seats))
+        self.count('bookings', len(bookings))
+        self.after_bookings(bookings)
+
+    def booking(self, showtime, size):
+        created = showtime.start_time - timedelta(hours=self.random.randint(1, 24 * 14))
+        past = showtime.start_time < self.now
+        status = 'Confirmed' if past or self.random.random() < 0.8 else 'Pending'
+        return Booking(
+            user_id=self.random.choice(self.user_ids), showtime=showtime, status=status,
+            attended=past and status == 'Confirmed', cost=SEAT_PRICE * size,
+            created_at=min(created, self.now), booking_date=min(created, self.now),
+        )
+
+    def after_bookings(self, bookings):
+        """Payments and the booking notification of a chunk of bookings."""
+        rnd = self.random
+        payments, notifications = [], []
+        for booking in bookings:
+            paid_at = booking.created_at + timedelta(minutes=rnd.randint(1, 30))
+            if rnd.random() < self.failed_payments:
+                payments.append(self.payment(booking, 'Failed', booking.created_at))
+            if booking.status == 'Confirmed':
+                payments.append(self.payment(booking, 'Completed', paid_at))
+            notifications.append(Notification(
+                user_id=booking.user_id, created_at=booking.created_at,
+                message=f"✅ Booking created for {self.titles[booking.showtime.movie_id]}"[:255],
+                is_read=booking.showtime.start_time < self.now and rnd.random() < 0.7,
+            ))
+        Payment.objects.bulk_create(payments)
+        Notification.objects.bulk_create(notifications)
+        self.count('payments', len(payments))
+        self.count('notifications', len(notifications))
+
+    def payment(self, booking, status, created):
+        return Payment(
+            user_id=booking.user_id, booking=booking, amount=booking.cost, status=status,
+            payment_method=self.random.choice(PAYMENT_METHODS), created_at=created, payment_date=created,
+        )
+
+    def seed_reviews(self):
+        rnd = self.random
+        for chunk in chunked(self.reviews, self.chunk_size):
+            reviews = []
+            for _ in chunk:
+                movie_id = self.pick_movie()
+                rating = min(5, max(1, round(rnd.gauss(self.quality[movie_id], 1))))
+                created = self.now - timedelta(hours=rnd.randint(0, 24 * self.days_back))
+                reviews.append(Review(
+                    user_id=rnd.choice(self.user_ids), movie_id=movie_id, rating=rating,
+                    content=self.words(rnd.randint(5, 30)).capitalize() + '.',
+                    anonymous=rnd.random() < 0.1, created_at=created,
+                ))
+            Review.objects.bulk_create(reviews)
+            self.count('reviews', len(reviews))
+        self.log(f"{self.counts.get('reviews', 0)} reviews")
+
+    # -- derived state ------------------------------------------------------
+    def finish(self):
+        search.rebuild()
+        ratings.reconcile()
+        for _ in rollups.backfill():
+            pass
+        versions.bump(*versions_models())
+        self.log("search index, rating aggregates and dashboard rollups rebuilt")
+
+
+def versions_models():
+    return [Movie, Genre, Actor, Director, Producer, Theater, Auditorium, Showtime]
+
+
+def seed(**volumes):
+    """Generate a data set; see ``Seeder`` for the volumes. Returns row counts."""
+    return Seeder(**volumes).run()
@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from rest_framework import serializers
 from .models import (
     User, Movie, Booking, Showtime, Seat,
@@ -6,13 +8,115 @@ from .models import (
 )
 from rest_framework.validators import UniqueValidator, UniqueTogetherValidator
 from django.db import transaction
-from django.db.models import F
 from rest_framework.exceptions import ValidationError
 from rest_framework.fields import CurrentUserDefault
-
-
-class UserSerializer(serializers.ModelSerializer):
+from . import allocation, holds, pricing, ratings, rollups, seatmap
+
+
+def parse_paths(value):
+    """Turn ``"a,b.c,b.d"`` into ``{'a': {}, 'b': {'c': {}, 'd': {}}}``."""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for part in filter(None, path.strip().split('.')):
+            node = node.setdefault(part, {})
+    return tree
+
+
+class ExpandableFieldsMixin:
+    """
+    Sparse fieldsets and on-demand expansion.
+
+    Relations named in ``expandable_fields`` render as ids unless the
+    request expands them: ``?expand=movie,auditorium.theater`` nests the
+    movie, the auditorium and its theater. ``?fields=id,movie.title``
+    keeps only the given fields (dotted paths apply to expanded objects).
+    Both can also be passed to the serializer as ``expand=`` and
+    ``fields=`` trees, see ``parse_paths``.
+
+    ``setup_eager_loading`` loads exactly the relations a request will
+    render: ``select_related_fields`` and ``prefetch_related_fields`` for
+    the serializer's own, plus the expanded ones, so a page costs the same
+    number of queries whatever its size.
+    """
+    expandable_fields = ()
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    def __init__(self, *args, expand=None, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if expand is None and fields is None:
+            expand, fields = self.requested(self._context.get('request'))
+        self._expand = expand or {}
+        self._only = fields or None
+
+    @staticmethod
+    def requested(request):
+        """The ``(expand, fields)`` trees asked for by ``request``."""
+        if request is None:
+            return {}, None
+        params = getattr(request, 'query_params', request.GET)
+        fields = params.get('fields')
+        return parse_paths(params.get('expand', '')), parse_paths(fields) if fields else None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name in self.expandable_fields:
+            if name not in fields:
+                continue
+            field = fields[name]
+            many = isinstance(field, serializers.ListSerializer)
+            options = {'read_only': True, 'many': many}
+            if field.source:
+                options['source'] = field.source
+            if name in self._expand:
+                serializer_class = type(field.child if many else field)
+                if issubclass(serializer_class, ExpandableFieldsMixin):
+                    options.update(expand=self._expand[name], fields=(self._only or {}).get(name))
+                fields[name] = serializer_class(**options)
+            else:
+                fields[name] = serializers.PrimaryKeyRelatedField(**options)
+        if self._only is not None:
+            for name in list(fields):
+                if name not in self._only and not fields[name].write_only:
+                    del fields[name]
+        return fields
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, request=None):
+        """Load what the serializer renders for ``request`` along with ``queryset``."""
+        expand, fields = cls.requested(request)
+        return cls._eager_load(queryset, '', expand, fields, prefetch=False)
+
+    @classmethod
+    def _eager_load(cls, queryset, prefix, expand, fields, prefetch):
+        # below a many-relation everything has to be prefetched
+        load = queryset.prefetch_related if prefetch else queryset.select_related
+        if cls.select_related_fields:
+            queryset = load(*(prefix + f for f in cls.select_related_fields))
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*(prefix + f for f in cls.prefetch_related_fields))
+        for name in cls.expandable_fields:
+            if fields is not None and name not in fields:
+                continue
+            field = cls._declared_fields[name]
+            many = isinstance(field, serializers.ListSerializer)
+            source = prefix + (field.source or name)
+            if many or prefetch:
+                if many or name in expand:
+                    queryset = queryset.prefetch_related(source)
+            elif name in expand:
+                queryset = queryset.select_related(source)
+            nested = type(field.child if many else field)
+            if name in expand and issubclass(nested, ExpandableFieldsMixin):
+                queryset = nested._eager_load(
+                    queryset, source + '__', expand[name], (fields or {}).get(name) or None, prefetch or many)
+        return queryset
+
+
+class UserSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     email_verified = serializers.BooleanField(read_only=True)
+    prefetch_related_fields = ('groups', 'user_permissions')
 
     class Meta:
         model = User
@@ -55,7 +159,9 @@ class ProducerSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'date_of_birth', 'biography']
 
 
-class MovieSerializer(serializers.ModelSerializer):
+class MovieSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ('genres', 'director', 'producer', 'actors')
+
     # ── READ-ONLY NESTED OUTPUT ────────────────────────────
     genres = GenreSerializer(source='genre', many=True, read_only=True)
     director = DirectorSerializer(read_only=True)
@@ -64,6 +170,10 @@ class MovieSerializer(serializers.ModelSerializer):
     poster = serializers.SerializerMethodField()
     duration = serializers.DurationField(required=False)
     rating = serializers.DecimalField(max_digits=3, decimal_places=1, default=0.0)
+    # user reviews, maintained by management.ratings
+    review_count = serializers.IntegerField(read_only=True)
+    review_average = serializers.FloatField(read_only=True)
+    review_histogram = serializers.SerializerMethodField()
     # ── WRITE-ONLY PK INPUT ────────────────────────────────
     director_id = serializers.PrimaryKeyRelatedField(
         queryset=Director.objects.all(),
@@ -97,12 +207,16 @@ class MovieSerializer(serializers.ModelSerializer):
         fields = [
             "id", "title", "description", "release_date", "rating",
             "poster", "trailer", "duration", "created_at",
+            "review_count", "review_average", "review_histogram",
             # read-only expanded
             "genres", "director", "producer", "actors",
             # write-only IDs
             "director_id", "producer_id", "genre_ids", "actor_ids",
         ]
 
+    def get_review_histogram(self, obj):
+        return ratings.histogram(obj)
+
     def get_poster(self, obj):
         """Return poster URL with production safety"""
         try:
@@ -132,15 +246,18 @@ class TheaterSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'location']
 
 
-class AuditoriumSerializer(serializers.ModelSerializer):
+class AuditoriumSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     theater = TheaterSerializer(read_only=True)  # for reading
+    expandable_fields = ('theater',)
 
     class Meta:
         model = Auditorium
         fields = ['id', 'name', 'theater', 'total_seats', 'available_seats']
 
 
-class ShowtimeSerializer(serializers.ModelSerializer):
+class ShowtimeSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ('movie', 'auditorium')
+
     movie = MovieSerializer(read_only=True)
     auditorium = AuditoriumSerializer(read_only=True)
     available_seats = serializers.IntegerField(read_only=True)
@@ -181,8 +298,23 @@ class SeatSerializer(serializers.ModelSerializer):
         model = Seat
         fields = ['id', 'showtime', 'seat_number', 'is_booked', 'price']
 
+    def validate(self, attrs):
+        showtime = attrs.get('showtime', getattr(self.instance, 'showtime', None))
+        layout = showtime.seat_layout if showtime else None
+        if layout is not None:
+            seat_number = attrs.get('seat_number', getattr(self.instance, 'seat_number', ''))
+            if not layout.has_seat(seat_number):
+                raise ValidationError(
+                    {'seat_number': f"{seat_number} is not a seat of this auditorium."})
+            # seats of a layout are priced by the layout unless overridden
+            if 'price' not in self.initial_data:
+                attrs.setdefault('price', layout.price_for(seat_number))
+        return attrs
+
+
+class ReviewSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ('user', 'movie')
 
-class ReviewSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     movie = MovieSerializer(read_only=True)
     content = serializers.CharField(
@@ -215,11 +347,95 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'movie', 'created_at']
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingBatchSerializer(serializers.ListSerializer):
+    """
+    Several bookings (``BookingSerializer(many=True)``) made in one
+    transaction: every group is checked first, then the seats are claimed
+    one showtime at a time in id order, so concurrent batches lock in the
+    same order and cannot deadlock. A conflict in any group rolls back all
+    of them; the errors are reported per group.
+    """
+    max_batch = 20
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('allow_empty', False)
+        kwargs.setdefault('max_length', self.max_batch)
+        super().__init__(*args, **kwargs)
+
+    def create(self, validated_data):
+        errors = [{} for _ in validated_data]
+        # one query for the showtimes and their movies, which the view's
+        # notifications and the response read for every booking
+        showtimes = Showtime.objects.select_related('movie').in_bulk(
+            {attrs['showtime'].id for attrs in validated_data})
+        with transaction.atomic():
+            groups = []
+            for attrs in validated_data:
+                showtime = showtimes[attrs.pop('showtime').id]
+                seat_ids = self.child.resolve_seat_ids(showtime, attrs)
+                groups.append((attrs['user'], showtime, sorted(set(seat_ids or ()))))
+            # seat numbers per group, only for seats of the group's showtime
+            seats = {
+                seat_id: (showtime_id, number) for seat_id, showtime_id, number in Seat.objects.filter(
+                    id__in=[seat_id for _, _, seat_ids in groups for seat_id in seat_ids]
+                ).values_list('id', 'showtime_id', 'seat_number')
+            }
+            numbers = [
+                {seat_id: seats[seat_id][1] for seat_id in seat_ids
+                 if seats.get(seat_id, (None,))[0] == showtime.id}
+                for _, showtime, seat_ids in groups
+            ]
+
+            seen = set()
+            for index, (user, showtime, seat_ids) in enumerate(groups):
+                names = numbers[index]
+                unknown = {str(seat_id): 'unknown' for seat_id in seat_ids if seat_id not in names}
+                repeated = {names.get(seat_id, str(seat_id)): 'repeated' for seat_id in seen.intersection(seat_ids)}
+                seen.update(seat_ids)
+                held = holds.held_by_others(showtime.id, list(names.values()), user)
+                if not seat_ids:
+                    errors[index] = {'non_field_errors': ["Select at least one seat."]}
+                elif unknown or repeated or held:
+                    errors[index] = {'seats': {**unknown, **repeated, **held}}
+            if any(errors):
+                raise ValidationError(errors)
+
+            by_showtime = defaultdict(list)
+            for index, (_, showtime, _) in enumerate(groups):
+                by_showtime[showtime.id].append(index)
+            for showtime_id in sorted(by_showtime):
+                indexes = by_showtime[showtime_id]
+                try:
+                    allocation.claim(showtime_id, [seat_id for i in indexes for seat_id in groups[i][2]])
+                except allocation.SeatConflict as exc:
+                    for i in indexes:
+                        keys = {numbers[i].get(seat_id, str(seat_id)) for seat_id in groups[i][2]}
+                        conflicts = {key: reason for key, reason in exc.conflicts.items() if key in keys}
+                        if conflicts or not exc.conflicts:
+                            errors[i] = {'seats': conflicts or "Not enough seats available."}
+            if any(errors):
+                # rolls back the showtimes claimed so far
+                raise ValidationError(errors)
+
+            bookings = Booking.objects.bulk_create([
+                Booking(user=user, showtime=showtime, cost=pricing.cost(showtime.id, seat_ids))
+                for user, showtime, seat_ids in groups
+            ])
+            Booking.seats.through.objects.bulk_create([
+                Booking.seats.through(booking_id=booking.id, seat_id=seat_id)
+                for booking, (_, _, seat_ids) in zip(bookings, groups) for seat_id in seat_ids
+            ])
+            rollups.mark_dirty(*(booking.created_at for booking in bookings))
+        return bookings
+
+
+class BookingSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ('showtime', 'seats')
+
     # output fields
     showtime = ShowtimeSerializer(read_only=True)
     seats = SeatSerializer(many=True, read_only=True)
-    attended = serializers.BooleanField(read_only=True)
+    attended = serializers.SerializerMethodField()
     # input‐only fields
     showtime_id = serializers.PrimaryKeyRelatedField(
         queryset=Showtime.objects.all(),
@@ -231,6 +447,13 @@ class BookingSerializer(serializers.ModelSerializer):
         write_only=True,
         required=False,
     )
+    # seats can also be picked by number, which works for layout seats
+    # that have no Seat row yet
+    seat_numbers = serializers.ListField(
+        child=serializers.CharField(max_length=10),
+        write_only=True,
+        required=False,
+    )
 
     class Meta:
         model = Booking
@@ -240,75 +463,94 @@ class BookingSerializer(serializers.ModelSerializer):
             'showtime_id',  # write‐only
             'seats',        # read‐only
             'seat_ids',     # write‐only
+            'seat_numbers',  # write‐only
             'cost',
             'created_at',
             'status',
             'attended',
         ]
         read_only_fields = ['cost', 'status', 'attended', 'user']
+        list_serializer_class = BookingBatchSerializer
+
+    def resolve_seat_ids(self, showtime, validated_data):
+        """
+        Collect the requested seat ids, creating the Seat rows of layout
+        seats picked by number. Returns None if no seats were given.
+        """
+        seat_ids = validated_data.pop('seat_ids', None)
+        seat_numbers = validated_data.pop('seat_numbers', None)
+        if seat_ids is None and seat_numbers is None:
+            return None
+        seat_ids = list(seat_ids or [])
+        if seat_numbers:
+            seats = seatmap.materialize(showtime, seat_numbers)
+            if len(seats) != len(set(seat_numbers)):
+                raise ValidationError("One or more seats do not exist.")
+            seat_ids.extend(s.id for s in seats if s.id not in seat_ids)
+        return seat_ids
+
+    def get_attended(self, booking):
+        # annotated by the booking views, derived here for other bookings
+        attended = getattr(booking, 'attended_now', None)
+        return booking.has_attended() if attended is None else attended
 
     def create(self, validated_data):
         user = validated_data.pop('user')
         showtime = validated_data.pop('showtime')
-        seat_ids = validated_data.pop('seat_ids')
-        seats_qs = Seat.objects.filter(id__in=seat_ids, is_booked=False)
-        seats = list(seats_qs)
-        if len(seats) != len(seat_ids):
-            raise ValidationError("One or more seats are already booked.")
-
-        total = sum(s.price for s in seats)
+        seat_ids = self.resolve_seat_ids(showtime, validated_data)
+        if not seat_ids:
+            raise ValidationError("Select at least one seat.")
+        numbers = Seat.objects.filter(
+            showtime=showtime, id__in=seat_ids).values_list('seat_number', flat=True)
+        held = holds.held_by_others(showtime.id, list(numbers), user)
+        if held:
+            raise ValidationError({'seats': held})
 
         with transaction.atomic():
-            updated = Showtime.objects.filter(
-                id=showtime.id,
-                available_seats__gte=len(seats)
-            ).update(
-                available_seats=F('available_seats') - len(seats)
-            )
-            if not updated:
-                raise ValidationError("Not enough seats available.")
-
+            self.claim_seats(showtime.id, seat_ids)
             booking = Booking.objects.create(
                 user=user,
                 showtime=showtime,
-                cost=total
+                cost=pricing.cost(showtime.id, seat_ids)
             )
-            booking.seats.set(seats)
-            seats_qs.update(is_booked=True)
+            booking.seats.set(seat_ids)
 
         return booking
 
+    def claim_seats(self, showtime_id, seat_ids):
+        try:
+            allocation.claim(showtime_id, seat_ids)
+        except allocation.SeatConflict as exc:
+            if not exc.conflicts:
+                raise ValidationError("Not enough seats available.")
+            raise ValidationError({'seats': exc.conflicts})
+
     def update(self, instance, validated_data):
-        seat_ids = validated_data.pop('seat_ids', None)
+        seat_ids = self.resolve_seat_ids(instance.showtime, validated_data)
         if seat_ids is not None:
             with transaction.atomic():
                 current_seat_ids = set(instance.seats.values_list('id', flat=True))
                 new_seat_ids = set(seat_ids)
+                # book the seats the user checked first, so a conflict
+                # leaves the booking untouched
+                self.claim_seats(instance.showtime_id, new_seat_ids - current_seat_ids)
                 # release seats the user unchecked
-                to_release = instance.seats.exclude(id__in=seat_ids)
-                released_count = to_release.count()
-                to_release.update(is_booked=False)
-                Showtime.objects.filter(pk=instance.showtime_id).update(
-                    available_seats=F('available_seats') + released_count
-                )
-                # book new seats the user checked
-                to_book_ids = new_seat_ids - current_seat_ids
-                if to_book_ids:
-                    to_book = Seat.objects.filter(id__in=to_book_ids, is_booked=False)
-                    if to_book.count() != len(to_book_ids):
-                        raise ValidationError("One or more new seats are already booked.")
-                    booked_count = to_book.count()
-                    to_book.update(is_booked=True)
-                    Showtime.objects.filter(pk=instance.showtime_id).update(
-                        available_seats=F('available_seats') - booked_count
-                    )
+                allocation.release(instance.showtime_id, current_seat_ids - new_seat_ids)
                 # finally update the M2M and recalc cost
-                instance.seats.set(seat_ids)
-                instance.cost = sum(s.price for s in instance.seats.all())
+                instance.seats.set(new_seat_ids)
+                instance.cost = pricing.cost(instance.showtime_id, new_seat_ids)
                 instance.save()
         return instance
 
 
+class SeatHoldSerializer(serializers.Serializer):
+    """Input of POST /api/showtimes/{pk}/holds/."""
+    seat_numbers = serializers.ListField(
+        child=serializers.CharField(max_length=10),
+        allow_empty=False,
+    )
+
+
 class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
@@ -343,7 +585,9 @@ class PaymentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'status', 'created_at']
 
 
-class WatchlistSerializer(serializers.ModelSerializer):
+class WatchlistSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ('user_info', 'movie')
+
     user = serializers.HiddenField(default=CurrentUserDefault())
     user_info = UserSerializer(source='user', read_only=True)
     movie = MovieSerializer(read_only=True)
@@ -365,7 +609,9 @@ class WatchlistSerializer(serializers.ModelSerializer):
         ]
 
 
-class RoleSerializer(serializers.ModelSerializer):
+class RoleSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ('actor', 'movie')
+
     # IDs for input
     actor_id = serializers.PrimaryKeyRelatedField(
         queryset=Actor.objects.all(), source="actor", write_only=True
@@ -413,8 +659,9 @@ class RateServiceSerializer(serializers.ModelSerializer):
         ]
 
 
-class FavouriteSerializer(serializers.ModelSerializer):
+class FavouriteSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
+    expandable_fields = ('user',)
 
     class Meta:
         model = Favourite
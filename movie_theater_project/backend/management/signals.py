@@ -1,47 +1,226 @@
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 
-from .models import Showtime, Movie, Notification, watchlist, Favourite
+from .models import (
+    Showtime, Movie, Seat, User, Booking, Payment, Review, Favourite, watchlist, RateService,
+    Actor, Director, Producer, Genre, Role, Theater, Auditorium, SeatLayout, News, PriceRule,
+)
+from . import pricing, ratings, rollups, search, seatmap, tasks, versions
+
+
+# Fan-outs can reach thousands of users, so they run in Celery once the
+# showtime / movie is committed instead of inside the admin's save request.
+# Like the outbox drain, they run inline when the outbox is eager (tests),
+# so no broker is needed there.
+def fan_out(task, *args):
+    if settings.NOTIFICATION_OUTBOX_EAGER:
+        task(*args)
+    else:
+        task.delay(*args)
 
 
 @receiver(post_save, sender=Showtime)
 def notify_watchlist_on_new_showtime(sender, instance, created, **kwargs):
     if not created:
         return
-    movie = instance.movie
-    # all users who have this movie in their watchlist
-    watcher_ids = watchlist.objects.filter(
-        movie=movie).values_list(
-        'user_id', flat=True).distinct()
-    for uid in watcher_ids:
-        Notification.objects.create(
-            user_id=uid, message=f"📅 New showtime for {movie.title} at "
-            f"{instance.start_time:%Y-%m-%d %H:%M}")
+    transaction.on_commit(
+        lambda: fan_out(tasks.notify_watchlist_on_new_showtime, instance.pk))
 
 
 @receiver(post_save, sender=Movie)
 def notify_favourites_on_related_movie(sender, instance, created, **kwargs):
     if not created:
         return
-    # users who favourited any movie by the same director
-    director_ids = Favourite.objects.filter(
-        movie__director=instance.director).values_list(
-        'user_id', flat=True)
-    # users who favourited any movie by the same producer
-    producer_ids = Favourite.objects.filter(
-        movie__producer=instance.producer).values_list(
-        'user_id', flat=True)
-    # users who favourited any movie by either the same director or producer
-    user_ids = set(director_ids) | set(producer_ids)
-
-    for uid in user_ids:
-        role = []
-        if uid in director_ids:
-            role.append('director')
-        if uid in producer_ids:
-            role.append('producer')
-        rel = ' & '.join(role)
-        Notification.objects.create(
-            user_id=uid,
-            message=f"🎬 New movie “{instance.title}” from your favorite {rel}"
-        )
+    transaction.on_commit(
+        lambda: fan_out(tasks.notify_favourites_on_related_movie, instance.pk))
+
+
+@receiver(post_save, sender=Seat)
+@receiver(post_delete, sender=Seat)
+def invalidate_seat_map(sender, instance, **kwargs):
+    # seats edited one by one (admin, /api/seats/) bypass the booking code
+    seatmap.invalidate(instance.showtime_id)
+
+
+# compiled price rules depend on the rules and on the showtime's flags,
+# start time and theater
+def invalidate_prices(sender, **kwargs):
+    pricing.invalidate()
+
+
+for model in (PriceRule, Showtime, Auditorium, Theater):
+    post_save.connect(invalidate_prices, sender=model, dispatch_uid=f'pricing-{model.__name__}-save')
+    post_delete.connect(invalidate_prices, sender=model, dispatch_uid=f'pricing-{model.__name__}-delete')
+
+
+# Dashboard rollups: queue the day each change lands on. Bulk updates
+# call rollups.mark_*_dirty themselves.
+ROLLUP_DAY_FIELDS = {
+    Booking: 'created_at',
+    Payment: 'created_at',
+    Review: 'created_at',
+    Favourite: 'added_at',
+    watchlist: 'added_at',
+    Showtime: 'start_time',
+}
+
+
+def mark_rollup_day(sender, instance, **kwargs):
+    rollups.mark_dirty(getattr(instance, ROLLUP_DAY_FIELDS[sender]))
+
+
+for model in ROLLUP_DAY_FIELDS:
+    post_save.connect(mark_rollup_day, sender=model, dispatch_uid=f'rollup-{model.__name__}-save')
+    post_delete.connect(mark_rollup_day, sender=model, dispatch_uid=f'rollup-{model.__name__}-delete')
+
+
+# a deleted booking or a payment changing status can move a user's first
+# booking or payment to another day
+@receiver(post_delete, sender=Booking)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def mark_user_firsts_dirty(sender, instance, **kwargs):
+    rollups.mark_user_firsts_dirty(instance.user_id)
+
+
+# user fields the rollups read; the last_login write of every login and
+# points updates touch none of them
+ROLLUP_USER_FIELDS = {'date_joined', 'is_active', 'email_verified'}
+
+
+@receiver(post_save, sender=User)
+def mark_signup_day(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or ROLLUP_USER_FIELDS.intersection(update_fields):
+        rollups.mark_dirty(instance.date_joined)
+
+
+@receiver(post_delete, sender=User)
+def mark_deleted_signup_day(sender, instance, **kwargs):
+    rollups.mark_dirty(instance.date_joined)
+
+
+@receiver(post_save, sender=RateService)
+@receiver(post_delete, sender=RateService)
+def mark_service_rating_day(sender, instance, **kwargs):
+    # service ratings count on the day of the rated showtime
+    rollups.mark_showtimes_dirty(
+        Booking.objects.filter(pk=instance.booking_id).values('showtime_id'))
+
+
+# Search index: movies are re-indexed in the same transaction as the change,
+# so a rollback leaves the index consistent with the catalog.
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def reindex_movie(sender, instance, **kwargs):
+    search.reindex([instance.pk])
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def reindex_role_movie(sender, instance, **kwargs):
+    search.reindex([instance.movie_id])
+
+
+@receiver(m2m_changed, sender=Movie.genre.through)
+@receiver(m2m_changed, sender=Movie.actors.through)
+def reindex_movie_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            search.reindex([instance.pk])
+    elif action == 'pre_clear':
+        # genre.movie_set.clear() does not report the movies it detaches
+        instance._search_movie_ids = list(instance.movie_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        search.reindex(instance.__dict__.pop('_search_movie_ids', ()))
+    elif action in ('post_add', 'post_remove'):
+        search.reindex(pk_set)
+
+
+PEOPLE = (Actor, Director, Producer, Genre)
+
+
+def people_movie_ids(instance):
+    movie_ids = set(instance.movie_set.values_list('pk', flat=True))
+    if isinstance(instance, Actor):
+        movie_ids.update(instance.roles.values_list('movie_id', flat=True))
+    return movie_ids
+
+
+def reindex_people_movies(sender, instance, created=False, **kwargs):
+    if not created:
+        search.reindex(people_movie_ids(instance))
+
+
+def collect_people_movies(sender, instance, **kwargs):
+    # the movies are detached (SET_NULL / cascade) before post_delete runs
+    instance._search_movie_ids = people_movie_ids(instance)
+
+
+def reindex_deleted_people_movies(sender, instance, **kwargs):
+    search.reindex(instance.__dict__.pop('_search_movie_ids', ()))
+
+
+for model in PEOPLE:
+    post_save.connect(reindex_people_movies, sender=model, dispatch_uid=f'search-{model.__name__}-save')
+    pre_delete.connect(collect_people_movies, sender=model, dispatch_uid=f'search-{model.__name__}-pre-delete')
+    post_delete.connect(reindex_deleted_people_movies, sender=model,
+                        dispatch_uid=f'search-{model.__name__}-delete')
+
+
+# Movie rating aggregates. Signals rather than the review views so that
+# admin edits and cascading deletes (a user closing their account) count too.
+@receiver(pre_save, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    if instance.pk:
+        instance._rated = Review.objects.filter(pk=instance.pk).values_list('movie_id', 'rating').first()
+
+
+@receiver(post_save, sender=Review)
+def count_review_rating(sender, instance, created, **kwargs):
+    before = instance.__dict__.pop('_rated', None)
+    if before == (instance.movie_id, instance.rating):
+        return
+    if before:
+        ratings.apply(*before, -1)
+    ratings.add(instance)
+
+
+@receiver(post_delete, sender=Review)
+def uncount_review_rating(sender, instance, **kwargs):
+    ratings.remove(instance)
+
+
+# Catalog versions for conditional GETs: the models whose rendering a
+# write changes. Roles only show up in movie search results; a layout
+# resizes its auditorium.
+VERSIONED = {
+    Movie: (Movie,),
+    Genre: (Genre,),
+    Actor: (Actor,),
+    Director: (Director,),
+    Producer: (Producer,),
+    Role: (Movie,),
+    Theater: (Theater,),
+    Auditorium: (Auditorium,),
+    SeatLayout: (Auditorium,),
+    Showtime: (Showtime,),
+    News: (News,),
+}
+
+
+def bump_version(sender, **kwargs):
+    versions.bump(*VERSIONED[sender])
+
+
+for model in VERSIONED:
+    post_save.connect(bump_version, sender=model, dispatch_uid=f'version-{model.__name__}-save')
+    post_delete.connect(bump_version, sender=model, dispatch_uid=f'version-{model.__name__}-delete')
+
+
+@receiver(m2m_changed, sender=Movie.genre.through)
+@receiver(m2m_changed, sender=Movie.actors.through)
+def bump_movie_version(sender, action, **kwargs):
+    if action.startswith('post_'):
+        versions.bump(Movie)
@@ -0,0 +1,200 @@
+"""
+Booking stress harness.
+
+Runs many workers that book (and re-book) overlapping seats of one
+showtime at the same time, each on its own database connection, then
+checks that no seat was sold twice and that ``available_seats`` still
+matches the seats. Used by the ``stress_bookings`` command and the
+concurrency tests.
+"""
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.db import connections
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import Auditorium, Booking, Movie, Seat, SeatLayout, Showtime, Theater, User
+from .serializers import BookingSerializer
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    rank = max(0, min(len(values) - 1, round(pct / 100 * len(values)) - 1))
+    return values[rank]
+
+
+def create_fixture(seat_count, user_count, seats_per_row=20):
+    """
+    Create a throw-away showtime with ``seat_count`` seats and
+    ``user_count`` users to book it. Returns ``(showtime, users)``.
+    """
+    label = f"stress-{uuid.uuid4().hex[:8]}"
+    theater = Theater.objects.create(name=label, location="stress test")
+    auditorium = Auditorium.objects.create(name=label, theater=theater, total_seats=seat_count)
+    movie = Movie.objects.create(title=label, description="stress test", release_date=timezone.now().date())
+    start = timezone.now() + timedelta(days=1)
+    showtime = Showtime.objects.create(
+        movie=movie, auditorium=auditorium, start_time=start, end_time=start + timedelta(hours=2))
+    Seat.objects.bulk_create(
+        Seat(
+            showtime=showtime,
+            seat_number=f"{SeatLayout.row_label(i // seats_per_row)}{i % seats_per_row + 1}",
+            price=10)
+        for i in range(seat_count)
+    )
+    users = []
+    for i in range(user_count):
+        user = User(username=f"{label}-{i}", email_verified=True)
+        user.set_unusable_password()
+        users.append(user)
+    User.objects.bulk_create(users)
+    users = list(User.objects.filter(username__startswith=f"{label}-"))
+    return showtime, users
+
+
+def drop_fixture(showtime):
+    """Delete everything ``create_fixture`` made."""
+    theater = showtime.auditorium.theater
+    User.objects.filter(username__startswith=f"{theater.name}-").delete()
+    showtime.movie.delete()  # cascades to the showtime, seats and bookings
+    theater.delete()
+
+
+class Worker(threading.Thread):
+
+    def __init__(self, user, showtime_id, seat_ids, attempts, seats_per_booking,
+                 update_ratio, seed, start_gate):
+        super().__init__(daemon=True)
+        self.user = user
+        self.showtime_id = showtime_id
+        self.seat_ids = seat_ids
+        self.attempts = attempts
+        self.seats_per_booking = seats_per_booking
+        self.update_ratio = update_ratio
+        self.random = random.Random(seed)
+        self.start_gate = start_gate
+        self.latencies = []
+        self.outcomes = Counter()
+        self.errors = []
+
+    def pick_seats(self):
+        # neighbouring seats, so workers keep colliding on the same ones
+        start = self.random.randrange(len(self.seat_ids))
+        return self.seat_ids[start:start + self.seats_per_booking]
+
+    def timed(self, kind, func):
+        started = time.perf_counter()
+        try:
+            result = func()
+            self.outcomes[f'{kind}_ok'] += 1
+            return result
+        except ValidationError:
+            self.outcomes[f'{kind}_conflict'] += 1
+        except Exception as exc:  # database errors are reported, not raised
+            self.outcomes[f'{kind}_error'] += 1
+            self.errors.append(repr(exc))
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+    def book(self):
+        serializer = BookingSerializer(data={
+            'showtime_id': self.showtime_id,
+            'seat_ids': self.pick_seats(),
+        })
+        serializer.is_valid(raise_exception=True)
+        return serializer.save(user=self.user)
+
+    def rebook(self, booking):
+        serializer = BookingSerializer(booking, data={'seat_ids': self.pick_seats()}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def run(self):
+        self.start_gate.wait()
+        try:
+            for _ in range(self.attempts):
+                booking = self.timed('book', self.book)
+                if booking is not None and self.random.random() < self.update_ratio:
+                    self.timed('update', lambda: self.rebook(booking))
+        finally:
+            connections.close_all()
+
+
+def check_invariants(showtime_id, capacity):
+    """
+    Return a list of violations: seats held by more than one active
+    booking, seat flags that disagree with the bookings, and an
+    ``available_seats`` counter that drifted from ``capacity``.
+    """
+    violations = []
+    active = Booking.objects.filter(showtime_id=showtime_id).exclude(status='Cancelled')
+    double = (
+        Seat.objects.filter(showtime_id=showtime_id, bookings__in=active)
+        .values('seat_number')
+        .annotate(active_bookings=Count('bookings'))
+        .filter(active_bookings__gt=1)
+    )
+    for row in double:
+        violations.append(f"seat {row['seat_number']} is in {row['active_bookings']} bookings")
+
+    in_bookings = set(
+        Seat.objects.filter(showtime_id=showtime_id, bookings__in=active).values_list('id', flat=True))
+    flagged = set(
+        Seat.objects.filter(showtime_id=showtime_id, is_booked=True).values_list('id', flat=True))
+    if in_bookings - flagged:
+        violations.append(f"{len(in_bookings - flagged)} booked seats are not marked booked")
+    if flagged - in_bookings:
+        violations.append(f"{len(flagged - in_bookings)} seats are marked booked without a booking")
+
+    available = Showtime.objects.values_list('available_seats', flat=True).get(pk=showtime_id)
+    if available != capacity - len(flagged):
+        violations.append(
+            f"available_seats is {available}, expected {capacity - len(flagged)}")
+    return violations
+
+
+def run(showtime, users, attempts=20, seats_per_booking=2, update_ratio=0.2, seed=0):
+    """
+    Hammer ``showtime`` with one worker per user and return a report with
+    throughput, latency percentiles (ms), outcome counts and invariant
+    violations. ``showtime.available_seats`` must equal its seat count.
+    """
+    seat_ids = list(Seat.objects.filter(showtime=showtime).order_by('seat_number').values_list('id', flat=True))
+    capacity = showtime.available_seats
+    gate = threading.Event()
+    workers = [
+        Worker(user, showtime.id, seat_ids, attempts, seats_per_booking,
+               update_ratio, seed + i, gate)
+        for i, user in enumerate(users)
+    ]
+    for worker in workers:
+        worker.start()
+    started = time.perf_counter()
+    gate.set()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(lat for worker in workers for lat in worker.latencies)
+    outcomes = sum((worker.outcomes for worker in workers), Counter())
+    return {
+        'workers': len(workers),
+        'operations': len(latencies),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_ops': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'latency_ms': {
+            f'p{pct}': round(percentile(latencies, pct) * 1000, 2) if latencies else None
+            for pct in (50, 95, 99)
+        },
+        'outcomes': dict(outcomes),
+        'errors': sorted({error for worker in workers for error in worker.errors})[:10],
+        'violations': check_invariants(showtime.id, capacity),
+    }
@@ -1,40 +1,157 @@
+import time
+
 from celery import shared_task
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.db.models import Count, Q
 from django.utils.timezone import now, timedelta
-from .models import Booking, Notification
+from .models import Booking, BookingReminder, Favourite, Movie, Notification, Showtime, watchlist
+from . import allocation, notifications, rollups
+from django.core.cache import cache
 from redis.exceptions import ConnectionError
 
 User = get_user_model()
 
+# rows per INSERT when notifying many users at once
+NOTIFICATION_BATCH_SIZE = 1000
+
+
+def bulk_notify(user_ids, message, batch_size=None):
+    """Create the same notification for every user id, in chunked INSERTs."""
+    batch_size = batch_size or NOTIFICATION_BATCH_SIZE
+    count = 0
+    batch = []
+    for uid in user_ids:
+        batch.append(Notification(user_id=uid, message=message))
+        if len(batch) >= batch_size:
+            Notification.objects.bulk_create(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        Notification.objects.bulk_create(batch)
+        count += len(batch)
+    return count
+
 
 @shared_task
-def send_upcoming_showtime_reminders():
+def notify_watchlist_on_new_showtime(showtime_id):
+    """Tell everyone watching the movie about a new showtime."""
+    showtime = Showtime.objects.select_related('movie').filter(pk=showtime_id).first()
+    if not showtime:
+        return 0
+    watcher_ids = watchlist.objects.filter(
+        movie_id=showtime.movie_id).values_list('user_id', flat=True).distinct()
+    return bulk_notify(
+        watcher_ids.iterator(),
+        f"📅 New showtime for {showtime.movie.title} at {showtime.start_time:%Y-%m-%d %H:%M}")
+
+
+@shared_task
+def notify_favourites_on_related_movie(movie_id):
     """
-    Send reminders for all showtimes starting within the next 24 hours.
+    Tell users who favourited a movie by the same director or producer
+    about a new movie. One grouped query finds the recipients and why.
     """
-    try:
-        window_start = now()
-        window_end = window_start + timedelta(hours=24)
-
-        bookings = Booking.objects.filter(
-            status__in=["Confirmed", "Pending"],
-            showtime__start_time__range=(window_start, window_end),
+    movie = Movie.objects.filter(pk=movie_id).first()
+    if not movie:
+        return 0
+    by_director = Q(movie__director_id=movie.director_id) if movie.director_id else Q(pk__in=[])
+    by_producer = Q(movie__producer_id=movie.producer_id) if movie.producer_id else Q(pk__in=[])
+    recipients = (
+        Favourite.objects.filter(by_director | by_producer)
+        .values('user_id')
+        .annotate(
+            director=Count('id', filter=by_director),
+            producer=Count('id', filter=by_producer),
         )
+        .values_list('user_id', 'director', 'producer')
+    )
+    groups = {}
+    for uid, director, producer in recipients.iterator():
+        role = []
+        if director:
+            role.append('director')
+        if producer:
+            role.append('producer')
+        groups.setdefault(' & '.join(role), []).append(uid)
+    return sum(
+        bulk_notify(user_ids, f"🎬 New movie “{movie.title}” from your favorite {rel}")
+        for rel, user_ids in groups.items()
+    )
+
+
+# bookings reminded per transaction
+REMINDER_CHUNK_SIZE = 1000
+
+
+def _upcoming_message(title, start_time):
+    return (
+        f"⏰ Reminder: your showtime for “{title}” "
+        f"is at {start_time.strftime('%Y-%m-%d %H:%M')}."
+    )
+
+
+def _pending_message(title, start_time):
+    return (
+        f"⏳ You still have a pending booking #{title}. "
+        "Please complete payment within 24 hours."
+    )
+
+
+def _send_reminders(bookings, kind, run_at, message):
+    """
+    Notify the owners of ``bookings`` not yet reminded of ``kind``, in
+    chunks. Returns the number of reminders sent.
+    """
+    due = (
+        bookings.exclude(reminders__kind=kind)
+        .order_by('id')
+        .values_list('id', 'user_id', 'showtime__movie__title', 'showtime__start_time')
+    )
+    count = 0
+    while True:
+        rows = list(due[:REMINDER_CHUNK_SIZE])
+        if not rows:
+            break
+        with transaction.atomic():
+            # the unique (booking, kind) constraint drops bookings another
+            # run reminded meanwhile; rows stamped with this run's time
+            # are the ones this run owns
+            BookingReminder.objects.bulk_create(
+                [BookingReminder(booking_id=row[0], kind=kind, sent_at=run_at) for row in rows],
+                ignore_conflicts=True,
+            )
+            owned = set(BookingReminder.objects.filter(
+                booking_id__in=[row[0] for row in rows], kind=kind, sent_at=run_at
+            ).values_list('booking_id', flat=True))
+            Notification.objects.bulk_create([
+                Notification(user_id=user_id, message=message(title, start_time))
+                for booking_id, user_id, title, start_time in rows
+                if booking_id in owned
+            ])
+        count += len(owned)
+    return count
+
 
-        print(f"Debug: Bookings queryset - {bookings}")
-        count = 0
-        for booking in bookings:
-            try:
-                obj, created = Notification.objects.get_or_create(
-                    user=booking.user, message=f"⏰ Reminder: your showtime for “{booking.showtime.movie.title}” "
-                    f"is at {booking.showtime.start_time.strftime('%Y-%m-%d %H:%M')}."
-                )
-                if created:
-                    count += 1
-            except Exception as e:
-                print(f"Error: Exception occurred during get_or_create - {e}")
+def upcoming_bookings(run_at, window_hours=24):
+    """Active bookings whose showtime starts within the next ``window_hours``."""
+    return Booking.objects.filter(
+        status__in=["Confirmed", "Pending"],
+        showtime__start_time__range=(run_at, run_at + timedelta(hours=window_hours)),
+    )
 
+
+@shared_task
+def send_upcoming_showtime_reminders(window_hours=24):
+    """
+    Send reminders for all showtimes starting within the next ``window_hours``.
+    A ``BookingReminder`` row per booking makes it idempotent, so each
+    booking is reminded once however often it runs.
+    """
+    try:
+        run_at = now()
+        count = _send_reminders(
+            upcoming_bookings(run_at, window_hours), 'upcoming_24h', run_at, _upcoming_message)
         return f"Reminders sent for {count} bookings."
     except ConnectionError as e:
         print(f"Error: Redis connection issue - {e}")
@@ -46,6 +163,11 @@ def send_pending_booking_reminder(self, booking_id):
     booking = Booking.objects.filter(pk=booking_id, status='Pending').first()
     if not booking:
         return
+    # superseded by sweep_bookings; only messages queued before it remain
+    _, created = BookingReminder.objects.get_or_create(
+        booking=booking, kind='pending_payment', defaults={'sent_at': now()})
+    if not created:
+        return
     Notification.objects.get_or_create(
         user=booking.user,
         message=(
@@ -57,6 +179,7 @@ def send_pending_booking_reminder(self, booking_id):
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def delete_unpaid_booking(self, booking_id):
+    # superseded by sweep_bookings; only messages queued before it remain
     with transaction.atomic():
         booking = Booking.objects.filter(
             pk=booking_id,
@@ -70,19 +193,11 @@ def delete_unpaid_booking(self, booking_id):
         booking.save(update_fields=['status'])
         Notification.objects.create(
             user=booking.user,
-            message=(
-                f"❌ Your booking for “{booking.showtime.movie.title}” was not paid in time "
-                "and has been automatically cancelled."
-            )
+            message=_unpaid_message(booking.showtime.movie.title)
         )
 
         # Mark seats as available and increase available seats
-        for seat in booking.seats.all():
-            seat.is_booked = False
-            seat.save(update_fields=['is_booked'])
-
-        booking.showtime.available_seats += len(booking.seats.all())
-        booking.showtime.save(update_fields=['available_seats'])
+        allocation.release(booking.showtime_id, booking.seats.values_list('id', flat=True))
 
         return f"Booking {booking_id} cancelled"
 
@@ -92,6 +207,11 @@ def send_showtime_reminder(self, booking_id):
     booking = Booking.objects.filter(pk=booking_id, status='Confirmed').first()
     if not booking:
         return
+    # superseded by sweep_bookings; only messages queued before it remain
+    _, created = BookingReminder.objects.get_or_create(
+        booking=booking, kind='upcoming_24h', defaults={'sent_at': now()})
+    if not created:
+        return
     showtime = booking.showtime
     Notification.objects.get_or_create(
         user=booking.user,
@@ -102,63 +222,193 @@ def send_showtime_reminder(self, booking_id):
     )
 
 
-@shared_task
-def update_booking_status_after_showtime():
+# bookings handled per transaction by settle_finished_bookings
+BOOKING_STATUS_CHUNK_SIZE = 1000
+
+
+def _chunks(queryset, size):
+    """Yield lists of at most ``size`` ids from ``queryset``, in id order."""
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def _attended_message(title, start_time):
+    return (
+        f"✅ Thank you for attending the showtime for “{title}” on "
+        f"{start_time.strftime('%Y-%m-%d %H:%M')}!"
+        f"You can leave a review for our service which helps us improve."
+        f"By visiting the booking details page."
+    )
+
+
+def _cancelled_message(title):
+    return (
+        f"❌ Your booking for “{title}” was not confirmed in time "
+        f"and has been automatically cancelled."
+    )
+
+
+def _unpaid_message(title):
+    return (
+        f"❌ Your booking for “{title}” was not paid in time "
+        "and has been automatically cancelled."
+    )
+
+
+def cancel_bookings(bookings, message, chunk_size=None):
     """
-    Update booking statuses after the showtime ends:
-    - Mark confirmed bookings as attended.
-    - Cancel pending bookings.
+    Cancel ``bookings`` in chunks, notify their owners with
+    ``message(title)`` and release their seats per showtime. Returns
+    ``(cancelled, seats_released, showtime_ids)``.
     """
-    try:
-        current_time = now()
+    chunk_size = chunk_size or BOOKING_STATUS_CHUNK_SIZE
+    seat_links = Booking.seats.through.objects
+    cancelled = released = 0
+    showtime_ids = set()
+    for ids in _chunks(bookings, chunk_size):
+        with transaction.atomic():
+            # lock and re-check, a booking may have been paid meanwhile
+            rows = list(
+                bookings.select_for_update(of=('self',)).filter(id__in=ids)
+                .values_list('id', 'user_id', 'showtime__movie__title'))
+            booking_ids = [row[0] for row in rows]
+            Booking.objects.filter(id__in=booking_ids).update(status='Cancelled')
+            Notification.objects.bulk_create([
+                Notification(user_id=user_id, message=message(title))
+                for _, user_id, title in rows
+            ])
+            seats_by_showtime = {}
+            for seat_id, showtime_id in seat_links.filter(
+                    booking_id__in=booking_ids).values_list('seat_id', 'seat__showtime_id'):
+                seats_by_showtime.setdefault(showtime_id, []).append(seat_id)
+            for showtime_id, seat_ids in seats_by_showtime.items():
+                released += allocation.release(showtime_id, seat_ids)
+            showtime_ids.update(seats_by_showtime)
+            rollups.mark_bookings_dirty(booking_ids)
+            rollups.mark_showtimes_dirty(list(seats_by_showtime))
+        cancelled += len(rows)
+    return cancelled, released, showtime_ids
 
-        # Mark confirmed bookings as attended
-        confirmed_bookings = Booking.objects.filter(
-            status='Confirmed',
-            attended=False,
-            showtime__end_time__lte=current_time
-        )
-        for booking in confirmed_bookings:
-            booking.attended = True
-            booking.save(update_fields=['attended'])
-            Notification.objects.create(
-                user=booking.user,
-                message=(
-                    f"✅ Thank you for attending the showtime for “{booking.showtime.movie.title}” on "
-                    f"{booking.showtime.start_time.strftime('%Y-%m-%d %H:%M')}!"
-                    f"You can leave a review for our service which helps us improve."
-                    f"By visiting the booking details page."
-                )
-            )
 
-        # Cancel pending bookings
-        pending_bookings = Booking.objects.filter(
-            status='Pending',
-            showtime__end_time__lte=current_time
+def settle_finished_bookings(current_time=None, chunk_size=None, dry_run=False):
+    """
+    After showtimes end, mark confirmed bookings as attended and cancel the
+    pending ones, releasing their seats. Works in chunks of ``chunk_size``
+    bookings, each one transaction of set-based updates with seats released
+    per showtime. Returns a summary dict; ``dry_run`` only counts.
+    """
+    current_time = current_time or now()
+    chunk_size = chunk_size or BOOKING_STATUS_CHUNK_SIZE
+    started = time.perf_counter()
+    confirmed = Booking.objects.filter(
+        status='Confirmed', attended=False, showtime__end_time__lte=current_time)
+    pending = Booking.objects.filter(
+        status='Pending', showtime__end_time__lte=current_time)
+    seat_links = Booking.seats.through.objects
+
+    if dry_run:
+        by_showtime = dict(
+            seat_links.filter(booking__in=pending, seat__is_booked=True)
+            .values_list('seat__showtime_id')
+            .annotate(seats=Count('seat_id'))
         )
-        for booking in pending_bookings:
-            booking.status = 'Cancelled'
-            booking.save(update_fields=['status'])
-            Notification.objects.create(
-                user=booking.user,
-                message=(
-                    f"❌ Your booking for “{booking.showtime.movie.title}” was not confirmed in time "
-                    f"and has been automatically cancelled."
-                )
-            )
+        summary = {
+            'attended': confirmed.count(),
+            'cancelled': pending.count(),
+            'seats_released': sum(by_showtime.values()),
+            'showtimes': len(by_showtime),
+        }
+    else:
+        summary = {'attended': 0, 'cancelled': 0, 'seats_released': 0, 'showtimes': 0}
+        for ids in _chunks(confirmed, chunk_size):
+            with transaction.atomic():
+                # lock and re-check, a booking may have changed meanwhile
+                rows = list(
+                    confirmed.select_for_update(of=('self',)).filter(id__in=ids)
+                    .values_list('id', 'user_id', 'showtime__movie__title', 'showtime__start_time'))
+                Booking.objects.filter(id__in=[row[0] for row in rows]).update(attended=True)
+                rollups.mark_bookings_dirty([row[0] for row in rows])
+                Notification.objects.bulk_create([
+                    Notification(user_id=user_id, message=_attended_message(title, start_time))
+                    for _, user_id, title, start_time in rows
+                ])
+            summary['attended'] += len(rows)
 
-            # Mark seats as available and increase available seats
-            for seat in booking.seats.all():
-                seat.is_booked = False
-                seat.save(update_fields=['is_booked'])
+        cancelled, released, showtime_ids = cancel_bookings(pending, _cancelled_message, chunk_size)
+        summary['cancelled'] = cancelled
+        summary['seats_released'] = released
+        summary['showtimes'] = len(showtime_ids)
 
-            booking.showtime.available_seats += len(booking.seats.all())
-            booking.showtime.save(update_fields=['available_seats'])
+    elapsed = time.perf_counter() - started
+    rows = summary['attended'] + summary['cancelled']
+    summary['elapsed_s'] = round(elapsed, 3)
+    summary['rows_per_second'] = round(rows / elapsed, 1) if elapsed else None
+    return summary
 
+
+@shared_task
+def update_booking_status_after_showtime():
+    """
+    Update booking statuses after the showtime ends:
+    - Mark confirmed bookings as attended.
+    - Cancel pending bookings.
+    """
+    try:
+        summary = settle_finished_bookings()
         return (
-            f"Updated statuses: {confirmed_bookings.count()} bookings marked as attended, "
-            f"{pending_bookings.count()} bookings cancelled."
+            f"Updated statuses: {summary['attended']} bookings marked as attended, "
+            f"{summary['cancelled']} bookings cancelled "
+            f"({summary['rows_per_second']} rows/s)."
         )
     except Exception as e:
         print(f"Error: Exception occurred while updating booking statuses - {e}")
         return "Failed to update booking statuses due to an error."
+
+
+# when pending bookings are nagged about payment, and when they expire
+PENDING_REMINDER_AFTER = timedelta(hours=24)
+UNPAID_BOOKING_TTL = timedelta(hours=48)
+
+
+@shared_task
+def sweep_bookings():
+    """
+    Periodic sweeper for every time-based booking action. Instead of
+    queueing three delayed messages per booking, each tick runs one pass
+    over the indexed time columns and handles whatever fell due since the
+    last tick:
+    - cancel pending bookings older than ``UNPAID_BOOKING_TTL``,
+    - remind pending bookings older than ``PENDING_REMINDER_AFTER``,
+    - remind bookings whose showtime starts within 24 hours.
+    Missed ticks are caught up by the next one.
+    """
+    run_at = now()
+    expired, _, _ = cancel_bookings(
+        Booking.objects.filter(status='Pending', created_at__lte=run_at - UNPAID_BOOKING_TTL),
+        _unpaid_message)
+    nagged = _send_reminders(
+        Booking.objects.filter(status='Pending', created_at__lte=run_at - PENDING_REMINDER_AFTER),
+        'pending_payment', run_at, _pending_message)
+    reminded = _send_reminders(upcoming_bookings(run_at), 'upcoming_24h', run_at, _upcoming_message)
+    return (
+        f"Swept bookings: {expired} unpaid cancelled, {nagged} payment reminders, "
+        f"{reminded} showtime reminders."
+    )
+
+
+@shared_task
+def drain_notification_outbox():
+    """Deliver queued notifications; see ``management.notifications``."""
+    cache.delete(notifications.DRAIN_SCHEDULED_KEY)
+    return notifications.drain()
+
+
+@shared_task
+def refresh_dashboard_rollups():
+    """Recompute the dashboard rollups of the days touched since the last run."""
+    return f"Refreshed rollups for {rollups.refresh_dirty()} days."
@@ -0,0 +1,33 @@
+from django.db import connection
+from django.test import TransactionTestCase
+
+from . import stress
+from .models import Booking, Seat
+
+
+class ConcurrentBookingTest(TransactionTestCase):
+    """Many threads booking overlapping seats of one showtime at once."""
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("needs a file-backed test database")
+        self.showtime, self.users = stress.create_fixture(seat_count=30, user_count=8)
+
+    def test_no_double_booking_under_contention(self):
+        report = stress.run(self.showtime, self.users, attempts=10, seats_per_booking=3, update_ratio=0.3)
+
+        self.assertEqual(report['violations'], [])
+        self.assertEqual(report['errors'], [])
+        # the seats are scarce, so some requests must have lost a race
+        self.assertGreater(report['outcomes'].get('book_ok', 0), 0)
+        self.assertGreater(report['outcomes'].get('book_conflict', 0), 0)
+        self.assertEqual(report['operations'], sum(report['outcomes'].values()))
+
+    def test_every_seat_sold_once_when_oversubscribed(self):
+        report = stress.run(self.showtime, self.users, attempts=20, seats_per_booking=1, update_ratio=0)
+
+        self.assertEqual(report['violations'], [])
+        booked = Seat.objects.filter(showtime=self.showtime, is_booked=True).count()
+        self.assertEqual(booked, Booking.objects.filter(showtime=self.showtime).count())
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.available_seats, 30 - booked)
@@ -17,7 +17,8 @@ from .models import (
     Role,
     Theater,
     RateService,
-    Favourite)
+    Favourite,
+    SeatLayout)
 from django.utils import timezone
 from datetime import timedelta
 from django.utils.timezone import make_aware, datetime
@@ -423,6 +424,47 @@ class AuditoriumModelTest(TestCase):
                          "Main Auditorium - Downtown (200 seats)")
 
 
+class SeatLayoutModelTest(TestCase):
+    """Test case for SeatLayout model."""
+
+    def setUp(self):
+        self.auditorium = Auditorium.objects.create(
+            name="Hall 2", total_seats=0)
+        self.layout = SeatLayout.objects.create(
+            auditorium=self.auditorium,
+            rows=3,
+            columns=4,
+            price_tiers=[{"name": "Premium", "rows": ["C"], "price": "14.50"}],
+            blocked_seats=["A1", "B4"])
+
+    def test_row_labels(self):
+        """Rows are labelled like spreadsheet columns."""
+        self.assertEqual(self.layout.row_labels(), ["A", "B", "C"])
+        self.assertEqual(SeatLayout.row_label(25), "Z")
+        self.assertEqual(SeatLayout.row_label(26), "AA")
+
+    def test_seat_numbers_skip_blocked(self):
+        """Blocked seats are not part of the layout."""
+        numbers = list(self.layout.seat_numbers())
+        self.assertEqual(len(numbers), 10)
+        self.assertNotIn("A1", numbers)
+        self.assertTrue(self.layout.has_seat("C4"))
+        self.assertFalse(self.layout.has_seat("B4"))
+        self.assertFalse(self.layout.has_seat("D1"))
+        self.assertFalse(self.layout.has_seat("A5"))
+
+    def test_price_tiers(self):
+        """Rows in a tier use the tier price, others the default."""
+        self.assertEqual(str(self.layout.price_for("C2")), "14.50")
+        self.assertEqual(float(self.layout.price_for("A2")), 10.00)
+
+    def test_capacity_syncs_auditorium(self):
+        """Saving a layout updates the auditorium size."""
+        self.auditorium.refresh_from_db()
+        self.assertEqual(self.layout.capacity, 10)
+        self.assertEqual(self.auditorium.total_seats, 10)
+
+
 class PaymentModelTest(TestCase):
     """Test case for Payment model."""
 
@@ -5,17 +5,40 @@ from unittest.mock import patch
 from management.admin import BookingAdmin
 from management.permissions import IsNotificationOwnerOrStaff, IsWatchlistOwnerOrStaff
 from management.tasks import (send_upcoming_showtime_reminders, send_pending_booking_reminder,
-                              delete_unpaid_booking, send_showtime_reminder)
+                              delete_unpaid_booking, send_showtime_reminder,
+                              notify_watchlist_on_new_showtime, notify_favourites_on_related_movie,
+                              drain_notification_outbox, settle_finished_bookings,
+                              update_booking_status_after_showtime, sweep_bookings)
 from management.serializers import BookingSerializer, MovieSerializer
 from management.models import (
     Booking, Seat, Movie, Genre, Actor, Director, Producer, Role, Showtime, Theater, Auditorium,
-    Review, Notification, User, watchlist as Watchlist, Payment, RateService, Favourite
+    Review, Notification, User, watchlist as Watchlist, Payment, RateService, Favourite,
+    SeatLayout, NotificationOutbox, BookingReminder, DailyRollup, MovieDailyRollup,
+    AuditoriumDailyRollup, RollupDirtyDay, ModelVersion, PriceRule
 )
 from management.permissions import IsReviewOwnerOrReadOnly
+from management import (
+    benchmark, holds, indexadvisor, notifications, pricing, ratings, responsecache, rollups, search,
+    seeding, timing,
+)
 from rest_framework import status
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from django.utils import timezone
 from rest_framework.test import APIClient
+from django.core.cache import cache
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, transaction
+from django.db.models import Count, Q
+import base64
+from decimal import Decimal
+import json
+import os
+import time
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
 
 
 class BaseAPITestCase(TestCase):
@@ -97,6 +120,8 @@ class BaseAPITestCase(TestCase):
 
     def setUp(self):
         self.client = APIClient()
+        # seat maps and other cached state must not leak between tests
+        cache.clear()
 
     def login_as_admin(self):
         """Utility method to log in as an admin user."""
@@ -579,6 +604,7 @@ class MovieAPITests(APITestCase):
         expected_fields = [
             "id", "title", "description", "release_date", "rating",
             "poster", "trailer", "duration", "created_at",
+            "review_count", "review_average", "review_histogram",
             # read-only expanded
             "genres", "director", "producer", "actors"
         ]
@@ -615,7 +641,7 @@ class MovieAPITests(APITestCase):
             movie=self.movie1,
             actor=self.actor,
             character_name='Cobb')
-        response = self.client.get(f'/api/movies/{self.movie1.id}/roles/')
+        response = self.client.get(f'/api/movies/{self.movie1.id}/roles/?expand=actor')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(
             response.data[0]['actor']['name'],
@@ -739,7 +765,7 @@ class TheaterAPITests(BaseAPITestCase):
         })
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         response = self.client.get(
-            f'/api/theaters/{self.theater.id}/showtimes/')
+            f'/api/theaters/{self.theater.id}/showtimes/?expand=movie,auditorium')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]['movie']['title'], 'Inception')
@@ -965,6 +991,226 @@ class ShowtimeAPITests(BaseAPITestCase):
         self.assertEqual(response.data[0]['seat_number'], 'B1')
 
 
+class SeatMapAPITests(BaseAPITestCase):
+    """Tests for the cached seat map of a showtime."""
+
+    def setUp(self):
+        super().setUp()
+        Seat.objects.create(showtime=self.showtime, seat_number="A1")
+        Seat.objects.create(
+            showtime=self.showtime,
+            seat_number="A3",
+            is_booked=True)
+
+    def decode(self, bits):
+        raw = base64.b64decode(bits)
+        return [i for i in range(len(raw) * 8) if raw[i >> 3] & (0x80 >> (i & 7))]
+
+    def test_compact_seat_map(self):
+        """The compact map packs layout and availability into bitmaps."""
+        response = self.client.get(f'/api/showtimes/{self.showtime.id}/seat-map/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['rows'], ['A', 'B'])
+        self.assertEqual(response.data['columns'], 3)
+        # A1, A3, B1 -> positions 0, 2, 3
+        self.assertEqual(self.decode(response.data['seats']), [0, 2, 3])
+        self.assertEqual(self.decode(response.data['booked']), [2])
+        self.assertEqual(response.data['available'], 2)
+
+    def test_seat_map_missing_showtime(self):
+        """Unknown showtimes return 404."""
+        response = self.client.get('/api/showtimes/0/seat-map/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_seat_list_served_from_cache(self):
+        """Repeated polls answer without touching the database."""
+        url = f'/api/showtimes/{self.showtime.id}/available_seats/'
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(
+            sorted(s['seat_number'] for s in second.data), ['A1', 'B1'])
+        self.assertEqual(second.data[0]['price'], '10.00')
+
+    def test_booking_invalidates_seat_map(self):
+        """Booking and cancelling seats is reflected in the next poll."""
+        url = f'/api/showtimes/{self.showtime.id}/seat-map/'
+        self.assertEqual(self.client.get(url).data['available'], 2)
+        self.login_as_user()
+        response = self.client.post('/api/bookings/', {
+            'showtime_id': self.showtime.id,
+            'seat_ids': [self.seat.id],
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.get(url).data['available'], 1)
+        self.client.delete(f"/api/bookings/{response.data['id']}/")
+        self.assertEqual(self.client.get(url).data['available'], 2)
+
+
+class SeatLayoutAPITests(BaseAPITestCase):
+    """Tests for showtimes whose seats come from an auditorium layout."""
+
+    def setUp(self):
+        super().setUp()
+        self.hall = Auditorium.objects.create(
+            name="Hall 3", theater=self.theater, total_seats=0)
+        SeatLayout.objects.create(
+            auditorium=self.hall, rows=2, columns=3,
+            price_tiers=[{"name": "Back", "rows": ["B"], "price": "12.00"}],
+            blocked_seats=["A2"])
+        self.hall.refresh_from_db()
+        self.layout_showtime = Showtime.objects.create(
+            movie=self.movie,
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+            auditorium=self.hall)
+
+    def test_seats_listed_without_rows(self):
+        """Layout seats are listed although no Seat rows exist."""
+        response = self.client.get(f'/api/showtimes/{self.layout_showtime.id}/seats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [s['seat_number'] for s in response.data],
+            ['A1', 'A3', 'B1', 'B2', 'B3'])
+        self.assertIsNone(response.data[0]['id'])
+        self.assertEqual(response.data[-1]['price'], '12.00')
+        self.assertEqual(self.layout_showtime.available_seats, 5)
+        self.assertEqual(Seat.objects.filter(showtime=self.layout_showtime).count(), 0)
+
+    def test_book_by_seat_number_materializes_only_booked_seats(self):
+        """Booking by number creates rows for the booked seats only."""
+        self.login_as_user()
+        response = self.client.post('/api/bookings/', {
+            'showtime_id': self.layout_showtime.id,
+            'seat_numbers': ['B1', 'B2'],
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(float(response.data['cost']), 24.00)
+        stored = Seat.objects.filter(showtime=self.layout_showtime)
+        self.assertEqual(
+            sorted(stored.values_list('seat_number', flat=True)), ['B1', 'B2'])
+        self.assertTrue(all(seat.is_booked for seat in stored))
+        compact = self.client.get(
+            f'/api/showtimes/{self.layout_showtime.id}/seat-map/').data
+        self.assertEqual(compact['rows'], ['A', 'B'])
+        self.assertEqual(compact['available'], 3)
+
+    def test_book_unknown_seat_number(self):
+        """Seat numbers outside the layout are rejected."""
+        self.login_as_user()
+        response = self.client.post('/api/bookings/', {
+            'showtime_id': self.layout_showtime.id,
+            'seat_numbers': ['A2'],
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Seat.objects.filter(showtime=self.layout_showtime).exists())
+
+    def test_seat_serializer_checks_layout(self):
+        """Seats created by hand must exist in the layout."""
+        self.login_as_admin()
+        response = self.client.post('/api/seats/', {
+            'showtime': self.layout_showtime.id,
+            'seat_number': 'C1',
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post('/api/seats/', {
+            'showtime': self.layout_showtime.id,
+            'seat_number': 'B3',
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['price'], '12.00')
+
+
+class SeatHoldAPITests(BaseAPITestCase):
+    """Tests for checkout seat holds."""
+
+    def setUp(self):
+        super().setUp()
+        self.other_user = User.objects.create_user(
+            username="other", password="otherpass")
+        self.other_client = APIClient()
+        self.other_client.login(username="other", password="otherpass")
+        self.url = f'/api/showtimes/{self.showtime.id}/holds/'
+
+    def test_hold_seats(self):
+        """Held seats disappear from the available list until released."""
+        self.login_as_user()
+        response = self.client.post(self.url, {'seat_numbers': ['B1']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['seats'], ['B1'])
+        available = self.client.get(f'/api/showtimes/{self.showtime.id}/available_seats/')
+        self.assertEqual(available.data, [])
+        compact = self.client.get(f'/api/showtimes/{self.showtime.id}/seat-map/')
+        self.assertEqual(compact.data['available'], 0)
+        # nothing was written to the database
+        self.assertFalse(Seat.objects.get(pk=self.seat.pk).is_booked)
+
+        response = self.client.delete(f"{self.url}{response.data['id']}/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        available = self.client.get(f'/api/showtimes/{self.showtime.id}/available_seats/')
+        self.assertEqual(len(available.data), 1)
+
+    def test_hold_released_only_through_its_showtime(self):
+        self.login_as_user()
+        hold_id = self.client.post(self.url, {'seat_numbers': ['B1']}, format='json').data['id']
+        other = Showtime.objects.create(
+            movie=self.movie, start_time=self.showtime.start_time, end_time=self.showtime.end_time)
+        response = self.client.delete(f'/api/showtimes/{other.id}/holds/{hold_id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIsNotNone(holds.get_store().get(hold_id))
+
+    def test_holds_of_others_looked_up_in_one_round_trip(self):
+        self.login_as_user()
+        self.client.post(self.url, {'seat_numbers': ['B1']}, format='json')
+        with patch.object(holds.CacheHoldStore, 'get') as get:
+            held = holds.held_by_others(self.showtime.id, ['B1', 'B2'], self.other_user)
+        self.assertEqual(held, {'B1': 'held'})
+        get.assert_not_called()
+        self.assertEqual(holds.held_by_others(self.showtime.id, ['B1'], self.regular_user), {})
+
+    def test_conflicting_hold(self):
+        """A seat held by someone else is reported per seat."""
+        self.login_as_user()
+        self.client.post(self.url, {'seat_numbers': ['B1']}, format='json')
+        response = self.other_client.post(self.url, {'seat_numbers': ['B1', 'Z9']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['conflicts'], {'Z9': 'unknown'})
+        response = self.other_client.post(self.url, {'seat_numbers': ['B1']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['conflicts'], {'B1': 'held'})
+
+    def test_held_seat_cannot_be_booked_by_others(self):
+        """Direct bookings respect other users' holds."""
+        self.login_as_user()
+        self.client.post(self.url, {'seat_numbers': ['B1']}, format='json')
+        response = self.other_client.post('/api/bookings/', {
+            'showtime_id': self.showtime.id,
+            'seat_ids': [self.seat.id],
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_hold_promoted_on_payment(self):
+        """Paying for a hold creates a confirmed booking and frees the hold."""
+        self.login_as_user()
+        hold = self.client.post(self.url, {'seat_numbers': ['B1']}, format='json').data
+        response = self.client.post('/api/payments/process/', {'hold_id': hold['id']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        booking = Booking.objects.get(pk=response.data['booking_id'])
+        self.assertEqual(booking.status, 'Confirmed')
+        self.assertEqual(list(booking.seats.values_list('seat_number', flat=True)), ['B1'])
+        self.assertTrue(Payment.objects.filter(booking=booking, status='Completed').exists())
+        self.assertIsNone(holds.get_store().get(hold['id']))
+
+    def test_expired_hold_cannot_be_paid(self):
+        """Once the hold is gone, payment is refused."""
+        self.login_as_user()
+        hold = self.client.post(self.url, {'seat_numbers': ['B1']}, format='json').data
+        holds.get_store().release(hold['id'])
+        response = self.client.post('/api/payments/process/', {'hold_id': hold['id']})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class SeatAPITests(BaseAPITestCase):
     """Tests for the Seat API endpoints.
     """
@@ -1219,7 +1465,7 @@ class BookingAPITests(BaseAPITestCase):
             'seat_ids': [self.seat.id],
         })
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data['seats'][0]['id'], self.seat.id)
+        self.assertEqual(response.data['seats'], [self.seat.id])
         self.assertEqual(float(response.data['cost']), 10.00)
 
     def test_update_booking_as_anonymous(self):
@@ -1261,6 +1507,68 @@ class BookingAPITests(BaseAPITestCase):
         response = self.client.delete(f'/api/bookings/{booking_id}/')
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_create_booking_reports_conflicting_seats(self):
+        """Seats that are taken or belong to another showtime are named."""
+        self.login_as_user()
+        taken = Seat.objects.create(showtime=self.showtime, seat_number="B2", is_booked=True)
+        free = Seat.objects.create(showtime=self.showtime, seat_number="B3")
+        response = self.client.post('/api/bookings/', {
+            'showtime_id': self.showtime.id,
+            'seat_ids': [taken.id, free.id, 9999],
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['seats'], {'B2': 'booked', '9999': 'unknown'})
+        # nothing was claimed
+        free.refresh_from_db()
+        self.assertFalse(free.is_booked)
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.available_seats, 200)
+
+    def test_update_booking_moves_seats_and_counter(self):
+        """Re-booking releases and claims seats without drifting the counter."""
+        self.login_as_user()
+        other = Seat.objects.create(showtime=self.showtime, seat_number="B2")
+        response = self.client.post('/api/bookings/', {
+            'showtime_id': self.showtime.id,
+            'seat_ids': [self.seat.id],
+        })
+        booking_id = response.data['id']
+        response = self.client.put(f'/api/bookings/{booking_id}/', {
+            'showtime_id': self.showtime.id,
+            'seat_ids': [other.id],
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.seat.refresh_from_db()
+        other.refresh_from_db()
+        self.assertFalse(self.seat.is_booked)
+        self.assertTrue(other.is_booked)
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.available_seats, 199)
+
+    def test_reads_derive_attendance_without_writing(self):
+        """Confirmed bookings of started showtimes read as attended; GETs never write."""
+        self.login_as_user()
+        start = timezone.now() - timedelta(hours=1)
+        past = Showtime.objects.create(
+            movie=self.movie, auditorium=self.auditorium, start_time=start,
+            end_time=start + timedelta(hours=2))
+        attended = Booking.objects.create(user=self.regular_user, showtime=past, status='Confirmed')
+        Booking.objects.create(user=self.regular_user, showtime=past, status='Pending')
+        self.booking.status = 'Confirmed'
+        self.booking.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            listed = self.client.get('/api/bookings/', {'ordering': '-attended'})
+            retrieved = self.client.get(f'/api/bookings/{attended.id}/')
+            filtered = self.client.get('/api/bookings/', {'attended': 'true'})
+        self.assertFalse([q for q in queries if not q['sql'].lstrip().upper().startswith('SELECT')])
+        self.assertFalse(Booking.objects.filter(attended=True).exists())
+
+        self.assertEqual([b['attended'] for b in listed.data['results']], [True, False, False])
+        self.assertEqual(listed.data['results'][0]['id'], attended.id)
+        self.assertTrue(retrieved.data['attended'])
+        self.assertEqual([b['id'] for b in filtered.data['results']], [attended.id])
+
 
 class NotificationAPITests(BaseAPITestCase):
     """Tests for the Notification API endpoints.
@@ -1290,11 +1598,11 @@ class NotificationAPITests(BaseAPITestCase):
         self.login_as_user()
         response = self.client.get('/api/notifications/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
         self.assertEqual(
-            response.data[0]['message'],
+            response.data['results'][0]['message'],
             'New movie added: Inception')
-        self.assertEqual(response.data[0]['is_read'], False)
+        self.assertEqual(response.data['results'][0]['is_read'], False)
 
     def test_retrieve_notification(self):
         """Test retrieving a specific notification."""
@@ -1885,13 +2193,34 @@ class TaskTests(TestCase):
             cost=20.00,
             status="Pending")
 
-    @patch("management.tasks.Notification.objects.get_or_create")
-    def test_send_upcoming_showtime_reminders(self, mock_get_or_create):
+    def test_send_upcoming_showtime_reminders(self):
         """Test that reminders are sent for upcoming showtimes."""
-        send_upcoming_showtime_reminders()
-        mock_get_or_create.assert_called_once_with(
+        self.assertEqual(send_upcoming_showtime_reminders(), "Reminders sent for 1 bookings.")
+        self.assertTrue(Notification.objects.filter(
             user=self.user, message=f"⏰ Reminder: your showtime for “{self.showtime.movie.title}”"
-            f" is at {self.showtime.start_time.strftime('%Y-%m-%d %H:%M')}.")
+            f" is at {self.showtime.start_time.strftime('%Y-%m-%d %H:%M')}.").exists())
+        self.assertTrue(BookingReminder.objects.filter(booking=self.booking, kind='upcoming_24h').exists())
+
+    def test_upcoming_showtime_reminders_are_idempotent(self):
+        """Running the job again, as the 5-minute schedule does, sends nothing new."""
+        send_upcoming_showtime_reminders()
+        self.assertEqual(send_upcoming_showtime_reminders(), "Reminders sent for 0 bookings.")
+        self.assertEqual(Notification.objects.filter(message__startswith="⏰").count(), 1)
+
+    def test_upcoming_showtime_reminders_query_count(self):
+        """Bookings are reminded with one joined query, not one per booking."""
+        for _ in range(5):
+            Booking.objects.create(user=self.user, showtime=self.showtime, cost=10, status="Confirmed")
+        # bookings, reminders insert, owned reminders, notifications insert,
+        # empty next chunk (plus the savepoint pair of the atomic block)
+        with self.assertNumQueries(7):
+            self.assertEqual(send_upcoming_showtime_reminders(), "Reminders sent for 6 bookings.")
+
+    def test_upcoming_showtime_reminder_owned_by_one_run(self):
+        """A booking another run already reminded is not notified again."""
+        BookingReminder.objects.create(
+            booking=self.booking, kind='upcoming_24h', sent_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(send_upcoming_showtime_reminders(), "Reminders sent for 0 bookings.")
 
     @patch("management.tasks.Notification.objects.get_or_create")
     def test_send_pending_booking_reminder(self, mock_get_or_create):
@@ -1912,3 +2241,1207 @@ class TaskTests(TestCase):
         self.booking.save()
         send_showtime_reminder(self.booking.id)
         mock_get_or_create.assert_called()
+
+
+class BookingSettlementTests(TestCase):
+    """Tests for settling bookings of finished showtimes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="viewer", password="pw")
+        theater = Theater.objects.create(name="Old Cinema", location="Uptown")
+        auditorium = Auditorium.objects.create(name="Hall", theater=theater, total_seats=10)
+        movie = Movie.objects.create(title="Heat", description="Heist", release_date="1995-12-15")
+        cls.showtimes = [
+            Showtime.objects.create(
+                movie=movie, auditorium=auditorium,
+                start_time=timezone.now() - timedelta(hours=3 + i),
+                end_time=timezone.now() - timedelta(hours=1 + i))
+            for i in range(2)
+        ]
+        cls.upcoming = Showtime.objects.create(
+            movie=movie, auditorium=auditorium,
+            start_time=timezone.now() + timedelta(hours=1),
+            end_time=timezone.now() + timedelta(hours=3))
+        cls.pending = []
+        cls.confirmed = []
+        for showtime in cls.showtimes + [cls.upcoming]:
+            for number, status_ in (("A1", "Pending"), ("A2", "Pending"), ("A3", "Confirmed")):
+                seat = Seat.objects.create(showtime=showtime, seat_number=number, is_booked=True)
+                booking = Booking.objects.create(
+                    user=cls.user, showtime=showtime, cost=10, status=status_)
+                booking.seats.set([seat])
+                if showtime != cls.upcoming:
+                    (cls.pending if status_ == "Pending" else cls.confirmed).append(booking)
+            Showtime.objects.filter(pk=showtime.pk).update(available_seats=7)
+
+    def test_settles_finished_showtimes_in_chunks(self):
+        summary = settle_finished_bookings(chunk_size=3)
+
+        self.assertEqual(summary['attended'], 2)
+        self.assertEqual(summary['cancelled'], 4)
+        self.assertEqual(summary['seats_released'], 4)
+        self.assertEqual(summary['showtimes'], 2)
+        self.assertIsNotNone(summary['rows_per_second'])
+        for booking in self.confirmed:
+            booking.refresh_from_db()
+            self.assertTrue(booking.attended)
+        for booking in self.pending:
+            booking.refresh_from_db()
+            self.assertEqual(booking.status, 'Cancelled')
+            self.assertFalse(booking.seats.get().is_booked)
+        for showtime in self.showtimes:
+            showtime.refresh_from_db()
+            self.assertEqual(showtime.available_seats, 9)
+        # the upcoming showtime is left alone
+        self.upcoming.refresh_from_db()
+        self.assertEqual(self.upcoming.available_seats, 7)
+        self.assertEqual(Notification.objects.filter(message__startswith="❌").count(), 4)
+        self.assertEqual(Notification.objects.filter(message__startswith="✅").count(), 2)
+        # a second run finds nothing left to do
+        self.assertEqual(settle_finished_bookings()['cancelled'], 0)
+
+    def test_dry_run_changes_nothing(self):
+        summary = settle_finished_bookings(dry_run=True)
+        self.assertEqual(
+            (summary['attended'], summary['cancelled'], summary['seats_released'], summary['showtimes']),
+            (2, 4, 4, 2))
+        self.assertEqual(Booking.objects.filter(status='Cancelled').count(), 0)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_command_and_task(self):
+        out = StringIO()
+        call_command('settle_bookings', '--dry-run', stdout=out)
+        self.assertIn("Would update: 2 bookings marked as attended, 4 bookings cancelled", out.getvalue())
+        self.assertIn("rows/s", out.getvalue())
+        result = update_booking_status_after_showtime()
+        self.assertTrue(result.startswith(
+            "Updated statuses: 2 bookings marked as attended, 4 bookings cancelled"))
+
+
+class BookingSweeperTests(TestCase):
+    """Tests for the periodic sweeper that replaced per-booking ETA tasks."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="sweeper", password="pw")
+        theater = Theater.objects.create(name="Sweep Cinema", location="Midtown")
+        auditorium = Auditorium.objects.create(name="Hall", theater=theater, total_seats=10)
+        movie = Movie.objects.create(title="Memento", description="Backwards", release_date="2000-10-11")
+        cls.later = Showtime.objects.create(
+            movie=movie, auditorium=auditorium,
+            start_time=timezone.now() + timedelta(days=5),
+            end_time=timezone.now() + timedelta(days=5, hours=2))
+        cls.soon = Showtime.objects.create(
+            movie=movie, auditorium=auditorium,
+            start_time=timezone.now() + timedelta(hours=12),
+            end_time=timezone.now() + timedelta(hours=14))
+
+        def booking(showtime, status_, age_hours, seat_number=None):
+            booking = Booking.objects.create(user=cls.user, showtime=showtime, cost=10, status=status_)
+            Booking.objects.filter(pk=booking.pk).update(
+                created_at=timezone.now() - timedelta(hours=age_hours))
+            if seat_number:
+                seat = Seat.objects.create(showtime=showtime, seat_number=seat_number, is_booked=True)
+                booking.seats.set([seat])
+                Showtime.objects.filter(pk=showtime.pk).update(available_seats=9)
+            return booking
+
+        cls.fresh = booking(cls.later, "Pending", 1)
+        cls.unpaid_day = booking(cls.later, "Pending", 30)
+        cls.expired = booking(cls.later, "Pending", 50, seat_number="A1")
+        cls.confirmed_soon = booking(cls.soon, "Confirmed", 2)
+
+    def test_sweep_handles_everything_due_in_one_pass(self):
+        result = sweep_bookings()
+        self.assertEqual(
+            result, "Swept bookings: 1 unpaid cancelled, 1 payment reminders, 1 showtime reminders.")
+
+        self.expired.refresh_from_db()
+        self.assertEqual(self.expired.status, 'Cancelled')
+        self.assertFalse(self.expired.seats.get().is_booked)
+        self.later.refresh_from_db()
+        self.assertEqual(self.later.available_seats, 10)
+        self.assertTrue(BookingReminder.objects.filter(booking=self.unpaid_day, kind='pending_payment').exists())
+        self.assertTrue(BookingReminder.objects.filter(booking=self.confirmed_soon, kind='upcoming_24h').exists())
+        self.assertFalse(BookingReminder.objects.filter(booking=self.fresh).exists())
+
+    def test_sweep_is_idempotent(self):
+        sweep_bookings()
+        notifications_after_first = Notification.objects.count()
+        self.assertEqual(
+            sweep_bookings(), "Swept bookings: 0 unpaid cancelled, 0 payment reminders, 0 showtime reminders.")
+        self.assertEqual(Notification.objects.count(), notifications_after_first)
+
+    def test_queued_legacy_task_does_not_repeat_sweeper_reminder(self):
+        sweep_bookings()
+        with patch("management.tasks.Notification.objects.get_or_create") as get_or_create:
+            send_pending_booking_reminder(self.unpaid_day.id)
+        get_or_create.assert_not_called()
+
+    def test_booking_creation_queues_no_delayed_tasks(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(
+            username="buyer", password="pw", email_verified=True))
+        seat = Seat.objects.create(showtime=self.later, seat_number="A2")
+        with patch("celery.app.task.Task.apply_async") as apply_async:
+            response = client.post('/api/bookings/', {'showtime_id': self.later.id, 'seat_ids': [seat.id]})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        apply_async.assert_not_called()
+
+
+class NotificationFanOutTests(TestCase):
+    """Watchlist and favourite notifications sent from Celery."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.director = Director.objects.create(name="Denis Villeneuve")
+        cls.producer = Producer.objects.create(name="Mary Parent")
+        cls.movie = Movie.objects.create(
+            title="Arrival", description="Aliens", release_date="2016-11-11",
+            director=cls.director, producer=cls.producer)
+        cls.users = [User.objects.create_user(username=f"fan{i}", password="pw") for i in range(4)]
+        for user in cls.users:
+            Watchlist.objects.create(user=user, movie=cls.movie)
+        # fan0 likes the director's movie, fan1 the producer's, fan2 both
+        directed = Movie.objects.create(
+            title="Prisoners", description="Missing", release_date="2013-09-20", director=cls.director)
+        produced = Movie.objects.create(
+            title="Dune", description="Sand", release_date="2021-10-22", producer=cls.producer)
+        Favourite.objects.create(user=cls.users[0], movie=directed)
+        Favourite.objects.create(user=cls.users[1], movie=produced)
+        Favourite.objects.create(user=cls.users[2], movie=directed)
+        Favourite.objects.create(user=cls.users[2], movie=produced)
+
+    @override_settings(NOTIFICATION_OUTBOX_EAGER=False)
+    def test_signals_defer_fan_out_to_celery(self):
+        """Saving a showtime or movie only queues the task after commit."""
+        with patch("management.tasks.notify_watchlist_on_new_showtime.delay") as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            showtime = Showtime.objects.create(
+                movie=self.movie,
+                start_time=timezone.now() + timedelta(days=1),
+                end_time=timezone.now() + timedelta(days=1, hours=2))
+            self.assertFalse(delay.called)
+        delay.assert_called_once_with(showtime.pk)
+        self.assertFalse(Notification.objects.exists())
+
+        with patch("management.tasks.notify_favourites_on_related_movie.delay") as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            movie = Movie.objects.create(
+                title="Sicario", description="Border", release_date="2015-09-18", director=self.director)
+        delay.assert_called_once_with(movie.pk)
+
+    def test_eager_fan_out_runs_inline(self):
+        """Under test the fan-out runs on commit without a broker."""
+        with patch("management.tasks.notify_watchlist_on_new_showtime.delay") as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            Showtime.objects.create(
+                movie=self.movie,
+                start_time=timezone.now() + timedelta(days=1),
+                end_time=timezone.now() + timedelta(days=1, hours=2))
+        delay.assert_not_called()
+        self.assertTrue(Notification.objects.filter(message__startswith="📅 New showtime").exists())
+
+    def test_watchlist_fan_out(self):
+        showtime = Showtime.objects.create(
+            movie=self.movie,
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2))
+        with self.assertNumQueries(3):
+            sent = notify_watchlist_on_new_showtime(showtime.pk)
+        self.assertEqual(sent, 4)
+        self.assertEqual(Notification.objects.filter(message__startswith="📅 New showtime for Arrival").count(), 4)
+
+    def test_watchlist_fan_out_in_chunks(self):
+        showtime = Showtime.objects.create(
+            movie=self.movie,
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2))
+        bulk_create = Notification.objects.bulk_create
+        with patch("management.tasks.NOTIFICATION_BATCH_SIZE", 3), \
+                patch.object(Notification.objects, "bulk_create", wraps=bulk_create) as spy:
+            self.assertEqual(notify_watchlist_on_new_showtime(showtime.pk), 4)
+        self.assertEqual([len(call.args[0]) for call in spy.call_args_list], [3, 1])
+
+    def test_favourites_fan_out(self):
+        movie = Movie.objects.create(
+            title="Blade Runner 2049", description="Replicants", release_date="2017-10-06",
+            director=self.director, producer=self.producer)
+        # movie, recipients, then one INSERT per director/producer/both group
+        with self.assertNumQueries(5):
+            sent = notify_favourites_on_related_movie(movie.pk)
+        self.assertEqual(sent, 3)
+        messages = dict(Notification.objects.values_list('user__username', 'message'))
+        self.assertTrue(messages['fan0'].endswith("favorite director"))
+        self.assertTrue(messages['fan1'].endswith("favorite producer"))
+        self.assertTrue(messages['fan2'].endswith("favorite director & producer"))
+        self.assertNotIn('fan3', messages)
+
+    def test_favourites_fan_out_without_director(self):
+        """Movies without a director do not match every director-less favourite."""
+        movie = Movie.objects.create(title="Untitled", description="-", release_date="2020-01-01")
+        self.assertEqual(notify_favourites_on_related_movie(movie.pk), 0)
+
+
+class NotificationOutboxTests(BaseAPITestCase):
+    """Notifications queued in the outbox and delivered after commit."""
+
+    def test_write_delivers_notification_after_commit(self):
+        self.login_as_user()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.post('/api/watchlist/', {'movie_id': self.movie2.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(NotificationOutbox.objects.exists())
+        self.assertFalse(Notification.objects.filter(message__startswith="⭐").exists())
+
+        for callback in callbacks:
+            callback()
+        self.assertFalse(NotificationOutbox.objects.exists())
+        self.assertTrue(Notification.objects.filter(
+            user=self.regular_user, message="⭐ Added Interstellar to your watchlist").exists())
+
+    def test_drain_dedupes_in_batches(self):
+        for _ in range(3):
+            NotificationOutbox.objects.create(user=self.regular_user, message="retried", event_key="booking:1")
+        for i in range(4):
+            NotificationOutbox.objects.create(user=self.admin_user, message=f"msg {i}")
+        before = Notification.objects.count()
+        self.assertEqual(notifications.drain(batch_size=3), 7)
+        self.assertFalse(NotificationOutbox.objects.exists())
+        self.assertEqual(Notification.objects.filter(message="retried").count(), 1)
+        self.assertEqual(Notification.objects.count(), before + 5)
+
+    def test_same_message_events_are_all_delivered(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            notifications.notify(self.regular_user, "✅ Booking confirmed")
+            notifications.notify(self.regular_user, "✅ Booking confirmed")
+            notifications.notify(self.regular_user, "✅ Booking confirmed", key="retry")
+            notifications.notify(self.regular_user, "✅ Booking confirmed", key="retry")
+        self.assertEqual(Notification.objects.filter(message="✅ Booking confirmed").count(), 3)
+
+    def test_delivery_keeps_the_event_time(self):
+        event = NotificationOutbox.objects.create(user=self.regular_user, message="earlier")
+        happened = timezone.now() - timedelta(minutes=5)
+        NotificationOutbox.objects.filter(pk=event.pk).update(created_at=happened)
+        notifications.drain()
+        self.assertEqual(Notification.objects.get(message="earlier").created_at, happened)
+
+    def test_drain_task(self):
+        NotificationOutbox.objects.create(user=self.regular_user, message="hello")
+        self.assertEqual(drain_notification_outbox(), 1)
+        self.assertEqual(drain_notification_outbox(), 0)
+
+    @override_settings(NOTIFICATION_OUTBOX_EAGER=False)
+    def test_one_drain_scheduled_for_many_events(self):
+        with patch("management.tasks.drain_notification_outbox.apply_async") as apply_async, \
+                self.captureOnCommitCallbacks(execute=True):
+            notifications.notify(self.regular_user, "one")
+            notifications.notify(self.regular_user, "two")
+        apply_async.assert_called_once()
+        self.assertEqual(NotificationOutbox.objects.count(), 2)
+
+
+class DashboardRollupTests(BaseAPITestCase):
+    """The admin dashboard served from the rollup tables."""
+
+    def setUp(self):
+        super().setUp()
+        Payment.objects.create(user=self.regular_user, booking=self.booking, amount=20, status='Completed')
+        Favourite.objects.create(user=self.regular_user, movie=self.movie)
+        RateService.objects.create(user=self.regular_user, booking=self.booking, all_rating=4)
+        Showtime.objects.filter(pk=self.showtime.pk).update(available_seats=150)
+
+    def dashboard(self):
+        self.login_as_admin()
+        response = self.client.get('/api/admin/dashboard/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_writes_mark_days_dirty(self):
+        today = timezone.localdate()
+        self.assertTrue(RollupDirtyDay.objects.filter(day=today).exists())
+        self.assertTrue(RollupDirtyDay.objects.filter(day=timezone.localtime(self.showtime.start_time).date()).exists())
+
+    def test_logins_do_not_mark_days_dirty(self):
+        RollupDirtyDay.objects.all().delete()
+        self.assertTrue(self.client.login(username="user", password="userpass"))
+        self.assertFalse(RollupDirtyDay.objects.exists())
+        self.regular_user.email_verified = False
+        self.regular_user.save(update_fields=['email_verified'])
+        self.assertTrue(RollupDirtyDay.objects.exists())
+
+    def test_dashboard_reads_refreshed_rollups(self):
+        rollups.refresh_dirty()
+        self.assertFalse(RollupDirtyDay.objects.exists())
+        data = self.dashboard()
+
+        self.assertEqual(data['users']['total'], 2)
+        self.assertEqual(data['users']['funnel']['paid'], 1)
+        self.assertEqual(data['bookings']['total'], 1)
+        self.assertEqual(data['bookings']['pending'], 1)
+        self.assertEqual(data['revenue']['total'], 20)
+        self.assertEqual(data['revenue']['by_movie'],
+                         [{'booking__showtime__movie__title': 'Inception', 'revenue': 20}])
+        self.assertEqual(data['movies']['top_booked'], [{'title': 'Inception', 'bookings': 1}])
+        self.assertEqual(data['movies']['top_favorited'], [{'title': 'Inception', 'favorited': 1}])
+        self.assertEqual(data['bookings']['occupancy_rate'], 0.25)
+        self.assertEqual(data['bookings']['auditorium_utilization'][0]['occupancy_rate'], 0.25)
+        self.assertEqual(data['service_reviews']['by_theater'][0]['average_rating'], 4)
+        self.assertEqual(len(data['bookings']['hourly_24h']), 1)
+
+    def test_dashboard_query_count_does_not_grow(self):
+        rollups.refresh_dirty()
+        self.dashboard()
+        with CaptureQueriesContext(connection) as before:
+            self.dashboard()
+        for i in range(5):
+            movie = Movie.objects.create(title=f"Movie {i}", description="-", release_date="2020-01-01")
+            Review.objects.create(movie=movie, user=self.regular_user, rating=3, content="ok")
+            Favourite.objects.create(user=self.admin_user, movie=movie)
+        rollups.refresh_dirty()
+        with CaptureQueriesContext(connection) as after:
+            self.dashboard()
+        self.assertEqual(len(before), len(after))
+
+    def test_user_figures_add_up_from_daily_rows(self):
+        joined = timezone.now() - timedelta(days=60)
+        User.objects.filter(pk=self.regular_user.pk).update(date_joined=joined)
+        rollups.mark_dirty(joined)
+        second = Booking.objects.create(user=self.regular_user, showtime=self.showtime,
+                                        booking_date=self.showtime.start_time, cost=10)
+        rollups.refresh_dirty()
+        data = self.dashboard()
+        self.assertEqual(data['users']['total'], 2)
+        self.assertEqual(data['users']['funnel'], {'registered': 2, 'verified': 2, 'booked': 1, 'paid': 1})
+        self.assertEqual(data['users']['retention_rate'], 1)
+        self.assertEqual(data['bookings']['repeat_customers'], 1)
+        self.assertEqual(data['bookings']['one_time_customers'], 0)
+
+        Booking.objects.create(user=self.admin_user, showtime=self.showtime,
+                               booking_date=self.showtime.start_time, cost=10)
+        second.delete()
+        rollups.refresh_dirty()
+        data = self.dashboard()
+        self.assertEqual(data['users']['funnel']['booked'], 2)
+        self.assertEqual(data['bookings']['repeat_customers'], 0)
+        self.assertEqual(data['bookings']['one_time_customers'], 2)
+
+    def test_deleted_first_booking_moves_the_first_day(self):
+        earlier = timezone.now() - timedelta(days=3)
+        Booking.objects.filter(pk=self.booking.pk).update(created_at=earlier)
+        rollups.mark_dirty(earlier)
+        Booking.objects.create(user=self.regular_user, showtime=self.showtime,
+                               booking_date=self.showtime.start_time, cost=10)
+        rollups.refresh_dirty()
+        self.assertEqual(DailyRollup.objects.get(day=timezone.localtime(earlier).date()).first_bookings, 1)
+        self.booking.refresh_from_db()
+        self.booking.delete()
+        rollups.refresh_dirty()
+        self.assertEqual(DailyRollup.objects.get(day=timezone.localdate()).first_bookings, 1)
+        self.assertEqual(self.dashboard()['users']['funnel']['booked'], 1)
+
+    def test_movie_rankings_are_cut_in_sql(self):
+        rollups.refresh_dirty()
+        today = timezone.localdate()
+        for i in range(12):
+            movie = Movie.objects.create(title=f"Movie {i:02}", description="-", release_date="2020-01-01")
+            MovieDailyRollup.objects.create(
+                day=today, movie=movie, revenue=i, reviews=5, review_rating_sum=5 + i)
+        data = self.dashboard()
+        self.assertEqual([r['booking__showtime__movie__title'] for r in data['revenue']['by_movie']],
+                         ['Inception'] + [f"Movie {i:02}" for i in range(11, 2, -1)])
+        self.assertEqual([r['movie__title'] for r in data['movies']['top_rated']],
+                         [f"Movie {i:02}" for i in range(11, 6, -1)])
+        self.assertEqual(data['movies']['top_rated'][0]['avg'], 16 / 5)
+
+    def test_settlement_marks_bulk_updates_dirty(self):
+        rollups.refresh_dirty()
+        Showtime.objects.filter(pk=self.showtime.pk).update(
+            start_time=timezone.now() - timedelta(hours=3), end_time=timezone.now() - timedelta(hours=1))
+        settle_finished_bookings()
+        self.assertTrue(RollupDirtyDay.objects.exists())
+        rollups.refresh_dirty()
+        self.assertEqual(self.dashboard()['bookings']['cancelled'], 1)
+
+    def test_backfill_command_rebuilds_history(self):
+        rollups.refresh_dirty()
+        expected = list(DailyRollup.objects.order_by('day').values())
+        DailyRollup.objects.all().delete()
+        MovieDailyRollup.objects.all().delete()
+        AuditoriumDailyRollup.objects.all().delete()
+        out = StringIO()
+        call_command('backfill_rollups', stdout=out)
+        self.assertIn("Rebuilt rollups", out.getvalue())
+        self.assertEqual(
+            [{k: v for k, v in row.items() if k != 'id'} for row in DailyRollup.objects.order_by('day').values()],
+            [{k: v for k, v in row.items() if k != 'id'} for row in expected])
+        self.assertTrue(MovieDailyRollup.objects.exists())
+        self.assertTrue(AuditoriumDailyRollup.objects.exists())
+
+
+class UtilizationAnalyticsTests(BaseAPITestCase):
+    """Grouped utilization analytics per auditorium and theater."""
+    url = '/api/admin/analytics/utilization/'
+
+    def setUp(self):
+        super().setUp()
+        self.login_as_admin()
+        self.second = Auditorium.objects.create(name="Auditorium 2", theater=self.theater, total_seats=100)
+        self.other_theater = Theater.objects.create(name="Uptown", location="North")
+        self.third = Auditorium.objects.create(name="Hall A", theater=self.other_theater, total_seats=50)
+        # 2026-03-02 is a Monday (weekday 2)
+        self.day = datetime(2026, 3, 2, 18, tzinfo=dt_timezone.utc)
+        Showtime.objects.filter(pk=self.showtime.pk).update(
+            start_time=self.day, end_time=self.day + timedelta(hours=2), available_seats=50)
+        self.add_showtime(self.auditorium, self.day + timedelta(days=1, hours=2), free=200)
+        self.add_showtime(self.second, self.day, free=10)
+        self.add_showtime(self.third, self.day + timedelta(days=10), free=25)
+
+    def add_showtime(self, auditorium, start, free):
+        showtime = Showtime.objects.create(
+            movie=self.movie, auditorium=auditorium, start_time=start, end_time=start + timedelta(hours=2))
+        Showtime.objects.filter(pk=showtime.pk).update(available_seats=free)
+
+    def test_per_auditorium_rows_with_peak_hours_and_heatmap(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        rows = response.data['results']
+        self.assertEqual([r['name'] for r in rows], ["Auditorium 2", "Hall A", "Auditorium 1"])
+        first = rows[2]
+        self.assertEqual((first['showtimes'], first['seats'], first['booked']), (2, 400, 150))
+        self.assertEqual(first['occupancy_rate'], 0.375)
+        self.assertEqual(first['peak_hours'], [
+            {'hour': 18, 'occupancy_rate': 0.75}, {'hour': 20, 'occupancy_rate': 0}])
+        self.assertEqual(first['heatmap'], [
+            {'weekday': 2, 'hour': 18, 'showtimes': 1, 'occupancy_rate': 0.75},
+            {'weekday': 3, 'hour': 20, 'showtimes': 1, 'occupancy_rate': 0},
+        ])
+
+    def test_per_theater_with_filters(self):
+        response = self.client.get(self.url, {'group': 'theater', 'end': '2026-03-03', 'ordering': 'name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = response.data['results']
+        self.assertEqual([(r['name'], r['seats'], r['booked']) for r in rows], [("Main Theater", 500, 240)])
+
+        response = self.client.get(self.url, {'theater': self.other_theater.id, 'start': '2026-03-12'})
+        self.assertEqual([r['name'] for r in response.data['results']], ["Hall A"])
+
+    def test_query_count_does_not_grow_with_halls(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.url)
+        for i in range(5):
+            hall = Auditorium.objects.create(name=f"Extra {i}", theater=self.theater, total_seats=10)
+            self.add_showtime(hall, self.day, free=5)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 8)
+        self.assertEqual(len(few), len(many))
+
+    def test_pagination_and_validation(self):
+        response = self.client.get(self.url, {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+        for params in ({'group': 'seat'}, {'start': 'yesterday'}, {'ordering': 'x'}, {'theater': 'a'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admin_only(self):
+        self.login_as_user()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+def nest(prefix, paths):
+    """``nest('movie', 'a,b')`` -> ``'movie.a,movie.b'``"""
+    return ','.join(f'{prefix}.{path}' for path in paths.split(','))
+
+
+class QueryBudgetTests(BaseAPITestCase):
+    """
+    Every list endpoint runs a fixed number of queries, however many rows
+    it returns. A failure here usually means a serializer renders a
+    relation its ``setup_eager_loading`` does not load.
+    """
+    movie = 'genres,director,producer,actors'
+    showtime = nest('movie', movie) + ',auditorium.theater'
+    # endpoint -> (expand, queries with ids only, queries fully expanded);
+    # the counts include the session and user lookups and the catalog
+    # version lookup of conditional GETs
+    budgets = {
+        '/api/movies/': (movie, 7, 7),
+        '/api/showtimes/': (showtime, 4, 6),
+        '/api/bookings/': ('seats,' + nest('showtime', showtime), 4, 6),
+        '/api/bookings/user/': ('showtime.movie.actors', 4, 6),
+        '/api/reviews/': ('user,' + nest('movie', movie), 3, 7),
+        '/api/watchlist/': ('user_info,' + nest('movie', movie), 4, 8),
+        '/api/favorites/': ('user', 3, 5),
+        '/api/roles/': ('actor,movie.genres', 3, 5),
+        '/api/auditoriums/': ('theater', 3, 3),
+    }
+
+    def populate(self, count):
+        start = timezone.now() + timedelta(days=2)
+        for _ in range(count):
+            n = Movie.objects.count()
+            director = Director.objects.create(name=f"Director {n}")
+            producer = Producer.objects.create(name=f"Producer {n}")
+            actor = Actor.objects.create(name=f"Actor {n}")
+            movie = Movie.objects.create(
+                title=f"Movie {n}", description="-", release_date="2020-01-01",
+                director=director, producer=producer)
+            movie.genre.add(Genre.objects.create(name=f"Genre {n}"))
+            movie.actors.add(actor)
+            Role.objects.create(actor=actor, movie=movie, character_name="Lead")
+            theater = Theater.objects.create(name=f"Theater {n}", location="-")
+            auditorium = Auditorium.objects.create(name=f"Hall {n}", theater=theater, total_seats=10)
+            showtime = Showtime.objects.create(
+                movie=movie, auditorium=auditorium, start_time=start, end_time=start + timedelta(hours=2))
+            seat = Seat.objects.create(showtime=showtime, seat_number="A1", price=10)
+            booking = Booking.objects.create(user=self.regular_user, showtime=showtime, cost=10)
+            booking.seats.set([seat])
+            Review.objects.create(movie=movie, user=self.regular_user, rating=4, content="ok")
+            Watchlist.objects.create(user=self.regular_user, movie=movie)
+            Favourite.objects.create(user=self.regular_user, movie=movie)
+
+    def query_counts(self):
+        counts = {}
+        for url, (expand, _, _) in self.budgets.items():
+            for params in ({}, {'expand': expand}):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, {'page_size': 100, **params})
+                self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+                counts.setdefault(url, [expand]).append(len(queries))
+        return {url: tuple(c) for url, c in counts.items()}
+
+    def test_list_endpoints_stay_within_budget(self):
+        self.login_as_user()
+        self.populate(2)
+        few = self.query_counts()
+        self.populate(10)
+        many = self.query_counts()
+        self.assertEqual(few, many)
+        self.assertEqual(many, self.budgets)
+
+    def test_fields_and_expand(self):
+        self.login_as_user()
+        response = self.client.get('/api/showtimes/', {'fields': 'id,movie', 'page_size': 100})
+        self.assertEqual(response.data['results'][0], {'id': self.showtime.id, 'movie': self.movie.id})
+
+        response = self.client.get(f'/api/showtimes/{self.showtime.id}/', {
+            'expand': 'movie.genres,auditorium.theater',
+            'fields': 'id,movie.title,movie.genres,auditorium',
+        })
+        self.assertEqual(response.data, {
+            'id': self.showtime.id,
+            'movie': {'title': 'Inception', 'genres': [{'id': self.genre.id, 'name': 'Sci-Fi'}]},
+            'auditorium': {
+                'id': self.auditorium.id, 'name': 'Auditorium 1', 'total_seats': 200, 'available_seats': 0,
+                'theater': {'id': self.theater.id, 'name': 'Main Theater', 'location': 'Downtown'},
+            },
+        })
+
+    def test_ids_by_default(self):
+        self.login_as_user()
+        response = self.client.get(f'/api/bookings/{self.booking.id}/')
+        self.assertEqual(response.data['showtime'], self.showtime.id)
+        self.assertEqual(response.data['seats'], [self.seat.id])
+        response = self.client.get(f'/api/movies/{self.movie.id}/')
+        self.assertEqual(response.data['genres'], [self.genre.id])
+        self.assertEqual(response.data['director'], self.director.id)
+
+
+class KeysetPaginationTests(BaseAPITestCase):
+    """Cursor pagination by default, page numbers on request."""
+
+    def setUp(self):
+        super().setUp()
+        self.login_as_user()
+        created = timezone.now()
+        for i in range(25):
+            Notification.objects.create(user=self.regular_user, message=f"note {i}")
+        # equal timestamps must not make rows repeat or vanish across pages
+        Notification.objects.filter(user=self.regular_user).update(created_at=created)
+
+    def test_cursor_walks_every_row_once_without_counting(self):
+        seen = []
+        url = '/api/notifications/'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            self.assertFalse([q for q in queries if 'COUNT(' in q['sql'] or 'OFFSET' in q['sql']])
+            seen += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        ids = list(Notification.objects.filter(user=self.regular_user)
+                   .order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, ids)
+
+    def test_previous_links_walk_back(self):
+        pages = [self.client.get('/api/notifications/', {'page_size': 7}).data]
+        while pages[-1]['next']:
+            pages.append(self.client.get(pages[-1]['next']).data)
+        back = pages[-1]
+        for page in reversed(pages[:-1]):
+            back = self.client.get(back['previous']).data
+            self.assertEqual(back['results'], page['results'])
+        self.assertIsNone(back['previous'])
+
+    def test_bad_cursor_is_not_found(self):
+        response = self.client.get('/api/notifications/', {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_numbers_are_opt_in(self):
+        response = self.client.get('/api/notifications/', {'page': 2, 'page_size': 10})
+        self.assertEqual(response.data['count'], 26)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_ordering_across_relations_falls_back_to_pages(self):
+        response = self.client.get('/api/bookings/', {'ordering': 'showtime__start_time'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_showtimes_follow_the_start_time(self):
+        start = self.showtime.start_time
+        for hours in (3, 1, 2):
+            Showtime.objects.create(movie=self.movie, auditorium=self.auditorium,
+                                    start_time=start + timedelta(hours=hours),
+                                    end_time=start + timedelta(hours=hours + 2))
+        response = self.client.get('/api/showtimes/', {'page_size': 2})
+        first = [row['id'] for row in response.data['results']]
+        second = [row['id'] for row in self.client.get(response.data['next']).data['results']]
+        ids = list(Showtime.objects.order_by('start_time').values_list('id', flat=True))
+        self.assertEqual(first + second, ids)
+
+
+class MovieSearchTests(BaseAPITestCase):
+    """Ranked full-text search over the catalog."""
+
+    def titles(self, query, **params):
+        response = self.client.get('/api/movies/', {'search': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [movie['title'] for movie in response.data['results']]
+
+    def test_title_match_ranks_above_description(self):
+        Movie.objects.create(title='Dream Heist', description='Thieves in a dream.',
+                             release_date='2020-01-01')
+        Movie.objects.create(title='Paprika', description='A dream machine is stolen.',
+                             release_date='2006-11-25')
+        self.assertEqual(self.titles('dream'), ['Dream Heist', 'Paprika'])
+
+    def test_terms_match_as_prefixes_across_fields(self):
+        self.assertEqual(self.titles('leo incep'), ['Inception'])
+        self.assertEqual(self.titles('nolan sci'), ['Inception'])
+        self.assertEqual(self.titles('Lead Actor'), ['Inception'])
+        self.assertEqual(self.titles('nolan space'), [])
+
+    def test_explicit_ordering_wins_over_rank(self):
+        self.movie2.description = 'Nolan in space'
+        self.movie2.save()
+        self.assertEqual(self.titles('nolan', ordering='-title'), ['Interstellar', 'Inception'])
+
+    def test_index_follows_catalog_changes(self):
+        self.actor.name = 'Leo D.'
+        self.actor.save()
+        self.assertEqual(self.titles('leonardo'), [])
+        self.assertEqual(self.titles('leo'), ['Inception'])
+
+        self.movie2.genre.add(self.genre)
+        self.assertEqual(self.titles('sci', ordering='title'), ['Inception', 'Interstellar'])
+        self.genre.movie_set.clear()
+        self.assertEqual(self.titles('sci'), [])
+
+        self.director.delete()
+        self.assertEqual(self.titles('nolan'), [])
+        self.movie.delete()
+        self.assertEqual(search.search('inception'), [])
+
+    def test_every_match_is_ranked_and_paginated(self):
+        Movie.objects.bulk_create(
+            Movie(title=f"Dream {i:03}", description="-", release_date='2020-01-01') for i in range(520))
+        Movie.objects.create(title='Paprika', description='A dream machine.', release_date='2006-11-25')
+        search.rebuild()
+        response = self.client.get('/api/movies/', {'search': 'dream', 'page_size': 20, 'page': 27})
+        self.assertEqual(response.data['count'], 521)
+        self.assertEqual([m['title'] for m in response.data['results']], ['Paprika'])
+        self.assertEqual(len(search.search('dream')), 521)
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            search.get_backend().clear(cursor)
+        self.assertEqual(self.titles('inception'), [])
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 2 movies', out.getvalue())
+        self.assertEqual(self.titles('inception'), ['Inception'])
+
+
+class MovieRatingAggregateTests(BaseAPITestCase):
+    """Review count, average and histogram kept on the movie."""
+
+    def stats(self, movie):
+        movie.refresh_from_db()
+        return movie.review_count, movie.review_average, ratings.histogram(movie)
+
+    def test_review_writes_update_the_movie(self):
+        self.assertEqual(self.stats(self.movie), (1, 5.0, {1: 0, 2: 0, 3: 0, 4: 0, 5: 1}))
+        self.login_as_admin()
+        response = self.client.post(f'/api/movies/{self.movie.id}/reviews/',
+                                    {'content': 'Meh', 'rating': 2, 'movie_id': self.movie.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.stats(self.movie), (2, 3.5, {1: 0, 2: 1, 3: 0, 4: 0, 5: 1}))
+
+        self.login_as_user()
+        response = self.client.patch(f'/api/reviews/{self.review.id}/', {'rating': 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.stats(self.movie), (2, 2.5, {1: 0, 2: 1, 3: 1, 4: 0, 5: 0}))
+
+        # moving a review to another movie moves its rating too
+        response = self.client.patch(f'/api/reviews/{self.review.id}/',
+                                     {'movie_id': self.movie2.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.stats(self.movie)[:2], (1, 2.0))
+        self.assertEqual(self.stats(self.movie2)[:2], (1, 3.0))
+
+        response = self.client.delete(f'/api/reviews/{self.review.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.stats(self.movie2), (0, 0.0, {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}))
+
+    def test_movies_order_by_user_rating(self):
+        Review.objects.create(movie=self.movie2, user=self.admin_user, content='Wow', rating=4)
+        response = self.client.get('/api/movies/', {'ordering': '-review_average'})
+        self.assertEqual([m['title'] for m in response.data['results']], ['Inception', 'Interstellar'])
+        self.assertEqual(response.data['results'][1]['review_histogram'], {1: 0, 2: 0, 3: 0, 4: 1, 5: 0})
+
+    def test_reconcile_repairs_drift(self):
+        Movie.objects.filter(pk=self.movie.pk).update(review_count=7, review_average=1.0)
+        Review.objects.bulk_create([
+            Review(movie=self.movie2, user=self.admin_user, content='x', rating=rating)
+            for rating in (1, 4.6)])
+        out = StringIO()
+        call_command('reconcile_ratings', stdout=out)
+        self.assertIn('of 2 movies', out.getvalue())
+        self.assertEqual(self.stats(self.movie), (1, 5.0, {1: 0, 2: 0, 3: 0, 4: 0, 5: 1}))
+        self.assertEqual(self.stats(self.movie2), (2, 2.8, {1: 1, 2: 0, 3: 0, 4: 0, 5: 1}))
+        self.assertEqual(ratings.reconcile(), 0)
+
+
+class ConditionalGetTests(BaseAPITestCase):
+    """ETag / Last-Modified validation of the catalog endpoints."""
+
+    def get(self, url, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, headers=headers)
+        return response, [q['sql'] for q in queries]
+
+    def test_unchanged_list_is_not_modified_without_querying_rows(self):
+        response, _ = self.get('/api/movies/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        response, queries = self.get('/api/movies/', if_none_match=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        self.assertFalse([sql for sql in queries if 'management_movie"' in sql])
+        # validators are per URL
+        response, _ = self.get('/api/movies/?ordering=-title', if_none_match=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_committed_writes_change_the_validators(self):
+        etag = self.get(f'/api/movies/{self.movie.id}/')[0]['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.genre.name = 'Science Fiction'
+            self.genre.save()
+        response, _ = self.get(f'/api/movies/{self.movie.id}/', if_none_match=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(ModelVersion.objects.get(model='management.genre').version, 1)
+
+        last_modified = response['Last-Modified']
+        response, _ = self.get(f'/api/movies/{self.movie.id}/', if_modified_since=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_bookings_leave_the_catalog_version_alone(self):
+        self.login_as_user()
+        etag = self.get('/api/showtimes/')[0]['ETag']
+        version = ModelVersion.objects.filter(model='management.showtime').values_list('version', flat=True)
+        before = list(version)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/bookings/', {
+                'showtime_id': self.showtime.id, 'seat_ids': [self.seat.id]})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(list(version), before)
+        self.assertEqual(self.get('/api/showtimes/', if_none_match=etag)[0].status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+        # the list still expires with its window
+        with patch('management.views.time.time', return_value=time.time() + 60):
+            response, _ = self.get('/api/showtimes/', if_none_match=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Last-Modified', response)
+
+
+class ResponseCacheTests(BaseAPITestCase):
+    """Anonymous catalog reads served from the shared response cache."""
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # the version lookup is all a cached response costs
+        return response, [q['sql'] for q in queries if 'management_modelversion' not in q['sql']]
+
+    def rename_movie(self, title):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.movie.title = title
+            self.movie.save()
+
+    def test_repeated_reads_skip_the_database(self):
+        for url in ('/api/movies/', f'/api/movies/{self.movie.id}/', f'/api/movies/{self.movie.id}/showtimes/'):
+            first, queries = self.get(url)
+            self.assertTrue(queries)
+            second, queries = self.get(url)
+            self.assertFalse(queries)
+            self.assertEqual(second.json(), first.json())
+            self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_writes_invalidate_and_users_bypass(self):
+        self.get('/api/movies/')
+        self.rename_movie('Inception (2010)')
+        response, queries = self.get('/api/movies/')
+        self.assertTrue(queries)
+        self.assertIn('Inception (2010)', [m['title'] for m in response.json()['results']])
+
+        self.login_as_user()
+        for _ in range(2):
+            queries = self.get('/api/movies/')[1]
+            self.assertTrue([sql for sql in queries if 'management_movie"' in sql])
+
+    def test_concurrent_rebuild_serves_the_previous_entry(self):
+        stale, _ = self.get('/api/movies/')
+        self.rename_movie('Inception (2010)')
+        lock = responsecache.cache_key(stale.wsgi_request) + ':lock'
+        cache.add(lock, 1)
+        response, queries = self.get('/api/movies/')
+        self.assertFalse(queries)
+        self.assertEqual(response['ETag'], stale['ETag'])
+        self.assertEqual(response.json(), stale.json())
+        cache.delete(lock)
+        self.assertNotEqual(self.get('/api/movies/')[0]['ETag'], stale['ETag'])
+
+
+class IndexAdvisorTests(BaseAPITestCase):
+    """Index proposals from captured queries."""
+
+    def record(self, *querysets):
+        recorder = indexadvisor.Recorder()
+        with connection.execute_wrapper(recorder):
+            for queryset in querysets:
+                list(queryset)
+        return recorder
+
+    def test_proposal_orders_equality_sort_range(self):
+        recorder = self.record(
+            Notification.objects.filter(message='x', created_at__gte=timezone.now()).order_by('is_read')[:5])
+        sql = next(iter(recorder.queries.values()))['sql']
+        self.assertEqual(indexadvisor.proposal(sql, 'management_notification'),
+                         ('message', 'is_read', 'created_at'))
+        # aggregate FILTER clauses are not the query's predicates
+        self.assertEqual(indexadvisor.proposal(
+            'SELECT COUNT(*) FILTER (WHERE ("t"."a" IN (%s...))) FROM "t" WHERE "t"."b" > %s', 't'), ('b',))
+
+    def test_scans_of_filtered_tables_are_flagged_once_per_shape(self):
+        recorder = self.record(
+            Notification.objects.filter(message='a'),
+            Notification.objects.filter(message='b'),
+            Notification.objects.filter(user=self.regular_user),  # served by an index
+            Theater.objects.order_by('name'),  # nothing to filter
+        )
+        items = indexadvisor.analyze(recorder.queries)
+        self.assertEqual([(item['table'], item['columns'], item['count']) for item in items],
+                         [('management_notification', ('message',), 2)])
+        self.assertEqual(indexadvisor.index_for(items[0]).fields, ['message'])
+
+    def test_command_replays_a_recorded_workload(self):
+        recorder = self.record(Payment.objects.filter(status='Failed'))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'workload.jsonl')
+            recorder.dump(path)
+            out = StringIO()
+            call_command('advise_indexes', workload=path, stdout=out)
+        self.assertIn("models.Index(fields=['status'], name='payment_status_idx')", out.getvalue())
+
+
+class ServerTimingTests(BaseAPITestCase):
+    """Per-request query and timing instrumentation."""
+
+    def timings(self, response):
+        return {
+            metric.split(';')[0]: metric for metric in response['Server-Timing'].split(', ')
+        }
+
+    def test_header_counts_the_request_queries(self):
+        self.login_as_admin()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/bookings/')
+        metrics = self.timings(response)
+        self.assertEqual(set(metrics), {'db', 'serialize', 'render', 'total'})
+        self.assertIn(f'desc="{len(queries)} queries"', metrics['db'])
+
+    def test_header_is_sent_to_staff_only(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/genres/'))
+        self.login_as_user()
+        self.assertNotIn('Server-Timing', self.client.get('/api/bookings/'))
+        with self.settings(SERVER_TIMING_HEADER=True):
+            self.assertIn('total', self.timings(self.client.get('/api/bookings/')))
+
+    @override_settings(REQUEST_LOG_SAMPLE_RATE=1.0)
+    def test_sampled_requests_are_logged_as_json(self):
+        with self.assertLogs('management.timing', 'INFO') as logs:
+            self.client.get('/api/genres/')
+        record = json.loads(logs.records[0].args[0])
+        self.assertEqual((record['method'], record['path'], record['status']), ('GET', '/api/genres/', 200))
+        self.assertIn('render_ms', record)
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_requests_report_repeated_queries(self):
+        with self.assertLogs('management.timing', 'WARNING') as logs:
+            self.client.get('/api/genres/')
+        self.assertIn('repeated_queries', json.loads(logs.records[0].args[0]))
+
+        profile = timing.Profile()
+        with connection.execute_wrapper(profile):
+            for movie in Movie.objects.all():
+                list(movie.genre.all())
+        [repeated] = profile.repeated()
+        self.assertEqual(repeated['count'], 2)
+        self.assertIn('management_genre', repeated['sql'])
+
+
+class BenchmarkTests(TestCase):
+    """Synthetic data and the endpoint benchmark, at a tiny scale."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.counts = seeding.seed(
+            theaters=2, auditoriums_per_theater=2, seats_per_showtime=20, movies=30,
+            showtimes=60, users=20, occupancy=0.4, chunk_size=25)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seeded_seat_counters_match_the_bookings(self):
+        self.assertEqual(self.counts['seats'], 60 * 20)
+        self.assertEqual(Booking.objects.count(), self.counts['bookings'])
+        for showtime in Showtime.objects.annotate(
+                free=Count('seats', filter=Q(seats__is_booked=False))):
+            self.assertEqual(showtime.available_seats, showtime.free)
+        booked = Seat.objects.filter(is_booked=True)
+        self.assertEqual(booked.count(), Booking.seats.through.objects.count())
+        self.assertFalse(booked.annotate(n=Count('bookings')).exclude(n=1).exists())
+        # the search index was rebuilt after the bulk inserts
+        self.assertTrue(search.search('midnight'))
+
+    def test_every_endpoint_is_measured(self):
+        report = benchmark.run(requests=2, warmup=1)
+        self.assertEqual(report['volumes']['showtimes'], 60)
+        self.assertEqual(set(report['endpoints']), {endpoint.name for endpoint in benchmark.ENDPOINTS})
+        for name, result in report['endpoints'].items():
+            self.assertTrue(all(200 <= code < 300 for code in result['status']), name)
+            self.assertGreater(result['queries'], 0, name)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+    def test_compare_flags_slower_or_chattier_endpoints(self):
+        baseline = {'endpoints': {'seat_map': {'p95_ms': 10.0, 'queries': 4}}}
+        report = {'endpoints': {'seat_map': {'p95_ms': 11.0, 'queries': 4},
+                                'dashboard': {'p95_ms': 50.0, 'queries': 9}}}
+        self.assertEqual(benchmark.compare(baseline, report), [])
+        report['endpoints']['seat_map'] = {'p95_ms': 13.0, 'queries': 5}
+        self.assertEqual(benchmark.compare(baseline, report), [
+            'seat_map: p95 10.0 ms -> 13.0 ms', 'seat_map: 4 -> 5 queries'])
+
+
+class SeedTheaterTests(TestCase):
+    """The seed_theater data generator."""
+
+    volumes = dict(theaters=1, auditoriums_per_theater=2, seats_per_showtime=10, movies=20,
+                   showtimes=80, users=10, reviews=100, skew=1.5, peak_share=1.0, chunk_size=30)
+
+    def snapshot(self):
+        return (
+            list(Movie.objects.order_by('id').values_list('title', 'rating')),
+            list(Showtime.objects.order_by('id').values_list('start_time', 'available_seats')),
+            list(Review.objects.order_by('id').values_list('rating', flat=True)),
+        )
+
+    def test_same_seed_same_data(self):
+        with transaction.atomic():
+            seeding.seed(**self.volumes)
+            first = self.snapshot()
+            transaction.set_rollback(True)
+        seeding.seed(**self.volumes)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_command_generates_every_kind_of_row(self):
+        out = StringIO()
+        call_command('seed_theater', *[
+            f"--{name.replace('_', '-')}={value}" for name, value in self.volumes.items()], stdout=out)
+        self.assertIn('rows in', out.getvalue())
+        confirmed = Booking.objects.filter(status='Confirmed')
+        self.assertEqual(Payment.objects.filter(status='Completed').count(), confirmed.count())
+        self.assertEqual(Notification.objects.count(), Booking.objects.count())
+        self.assertEqual(Review.objects.count(), 100)
+        self.assertTrue(Role.objects.exists())
+        # rating aggregates and rollups are rebuilt after the bulk inserts
+        movie = Movie.objects.annotate(n=Count('reviews')).order_by('-n').first()
+        self.assertEqual(movie.review_count, movie.n)
+        self.assertTrue(DailyRollup.objects.filter(bookings__gt=0).exists())
+        # every showtime starts in the evening peak
+        self.assertFalse(Showtime.objects.exclude(start_time__hour__in=seeding.PEAK_HOURS).exists())
+        # the most popular movie has the most showtimes
+        counts = list(Movie.objects.order_by('id').annotate(n=Count('showtimes')).values_list('n', flat=True))
+        self.assertEqual(counts[0], max(counts))
+
+        with self.assertRaises(CommandError):
+            call_command('seed_theater', stdout=StringIO())
+
+
+class PricingTests(BaseAPITestCase):
+    """Price rules and seat quotes."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.premium = Seat.objects.create(showtime=self.showtime, seat_number="C1", price='14.00')
+        self.hour = timezone.localtime(self.showtime.start_time).hour
+
+    def get_quote(self, *seats):
+        return self.client.get(
+            f'/api/showtimes/{self.showtime.id}/quote/', {'seat_ids': ','.join(str(s.id) for s in seats)})
+
+    def test_quote_without_rules_is_the_seat_prices(self):
+        response = self.get_quote(self.seat, self.premium)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total'], '24.00')
+        self.assertEqual([(line['price'], line['seats']) for line in response.data['lines']],
+                         [('10.00', 1), ('14.00', 1)])
+        # the compiled rules are cached: one aggregate query over the seats
+        with CaptureQueriesContext(connection) as queries:
+            self.get_quote(self.seat, self.premium)
+        self.assertEqual(len(queries), 1)
+
+    def test_rules_matching_the_showtime_apply(self):
+        self.showtime.is_VIP = True
+        self.showtime.save()
+        PriceRule.objects.create(name="VIP", applies_to='vip', amount='3.00')
+        PriceRule.objects.create(name="3D", applies_to='3d', amount='2.00')
+        PriceRule.objects.create(name="Peak", start_hour=self.hour, end_hour=(self.hour + 1) % 24, percent='10')
+        PriceRule.objects.create(name="Matinee", start_hour=(self.hour + 1) % 24,
+                                 end_hour=(self.hour + 2) % 24, amount='-4.00')
+        PriceRule.objects.create(name="Elsewhere", theater=Theater.objects.create(name="B", location="B"),
+                                 amount='5.00')
+        response = self.get_quote(self.seat, self.premium)
+        self.assertEqual(response.data['rules'], ["VIP", "Peak"])
+        # 10 + 1 + 3 and 14 + 1.40 + 3
+        self.assertEqual([line['unit_price'] for line in response.data['lines']], ['14.00', '18.40'])
+        self.assertEqual(response.data['total'], '32.40')
+        # a discount never takes a seat below zero
+        self.assertEqual(pricing.RuleSet(amount=Decimal('-20')).unit_price(Decimal('10.00')), Decimal('0.00'))
+
+    def test_rule_changes_reach_cached_quotes(self):
+        self.assertEqual(self.get_quote(self.seat).data['total'], '10.00')
+        rule = PriceRule.objects.create(name="Surcharge", amount='1.50')
+        self.assertEqual(self.get_quote(self.seat).data['total'], '11.50')
+        rule.is_active = False
+        rule.save()
+        self.assertEqual(self.get_quote(self.seat).data['total'], '10.00')
+
+    def test_invalid_quotes(self):
+        other = Showtime.objects.create(
+            movie=self.movie, auditorium=self.auditorium,
+            start_time=self.showtime.start_time, end_time=self.showtime.end_time)
+        foreign = Seat.objects.create(showtime=other, seat_number="A1")
+        self.assertEqual(self.get_quote(self.seat, foreign).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get_quote().status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(f'/api/showtimes/{self.showtime.id}/quote/', {'seat_ids': 'B1'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/showtimes/9999/quote/', {'seat_ids': self.seat.id})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bookings_cost_the_quote(self):
+        PriceRule.objects.create(name="Surcharge", amount='2.00')
+        self.login_as_user()
+        response = self.client.post('/api/bookings/', {
+            'showtime_id': self.showtime.id,
+            'seat_ids': [self.seat.id, self.premium.id],
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Booking.objects.get(id=response.data['id']).cost, Decimal('28.00'))
+
+
+class BookingBatchTests(BaseAPITestCase):
+    """Several bookings in one request, all or nothing."""
+
+    def setUp(self):
+        super().setUp()
+        self.login_as_user()
+        self.later = Showtime.objects.create(
+            movie=self.movie2, auditorium=self.auditorium,
+            start_time=self.showtime.start_time + timedelta(hours=3),
+            end_time=self.showtime.end_time + timedelta(hours=3))
+        self.later_seats = [
+            Seat.objects.create(showtime=self.later, seat_number=f"A{i}", price='12.00') for i in (1, 2)]
+
+    def post(self, *groups):
+        return self.client.post('/api/bookings/batch/', {'bookings': [
+            {'showtime_id': showtime.id, 'seat_ids': [seat.id for seat in seats]}
+            for showtime, seats in groups
+        ]}, format='json')
+
+    def test_books_every_group_claiming_showtimes_in_id_order(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post((self.later, self.later_seats), (self.showtime, [self.seat]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([b['cost'] for b in response.data], ['24.00', '10.00'])
+        self.assertEqual(Booking.objects.filter(user=self.regular_user).count(), 3)
+        self.assertFalse(Seat.objects.filter(id__in=[self.seat.id, *[s.id for s in self.later_seats]],
+                                             is_booked=False).exists())
+        self.later.refresh_from_db()
+        self.assertEqual(self.later.available_seats, 198)
+        self.assertEqual(NotificationOutbox.objects.filter(message__startswith="✅").count(), 2)
+        claims = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "management_showtime"')]
+        self.assertEqual(len(claims), 2)
+        self.assertIn(f'"id" = {self.showtime.id}', claims[0])
+        self.assertIn(f'"id" = {self.later.id}', claims[1])
+
+    def test_movie_titles_come_with_the_showtimes(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post((self.later, self.later_seats), (self.showtime, [self.seat]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        movies = [q['sql'] for q in queries if 'FROM "management_movie" WHERE' in q['sql']]
+        self.assertEqual(movies, [])
+
+    def test_a_conflict_rolls_back_every_group(self):
+        self.later_seats[1].is_booked = True
+        self.later_seats[1].save()
+        response = self.post((self.showtime, [self.seat]), (self.later, self.later_seats))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, [{}, {'seats': {'A2': 'booked'}}])
+        self.seat.refresh_from_db()
+        self.assertFalse(self.seat.is_booked)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_groups_are_validated_together(self):
+        response = self.post((self.showtime, [self.seat]), (self.showtime, [self.seat]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[1], {'seats': {'B1': 'repeated'}})
+        response = self.client.post('/api/bookings/batch/', {'bookings': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_seat_of_another_showtime_is_unknown(self):
+        stray = self.later_seats[0]
+        response = self.post((self.showtime, [self.seat, stray]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, [{'seats': {str(stray.id): 'unknown'}}])
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertFalse(Seat.objects.filter(id__in=[self.seat.id, stray.id], is_booked=True).exists())
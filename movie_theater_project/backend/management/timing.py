@@ -0,0 +1,139 @@
+"""
+Per-request SQL and timing instrumentation.
+
+``ServerTimingMiddleware`` counts the queries of every request and the
+time spent in them, and reports it as a ``Server-Timing`` header to staff
+users, or to everyone with ``SERVER_TIMING_HEADER`` on. Views
+using ``TimingMixin`` add the time spent in the handler outside the
+database (mostly serialization) and in rendering. A sample of requests
+(``REQUEST_LOG_SAMPLE_RATE``) is logged as one JSON line on the
+``management.timing`` logger; requests slower than ``SLOW_REQUEST_MS``
+always are, with their most repeated query shapes, so N+1 queries show up.
+"""
+import json
+import logging
+import random
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+
+from .indexadvisor import shape
+
+logger = logging.getLogger(__name__)
+
+current = ContextVar('request_profile', default=None)
+
+TOP_QUERIES = 5
+
+
+class Profile:
+    """Queries and phase timings of one request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.shapes = defaultdict(lambda: [0, 0.0])
+        self.phases = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db += elapsed
+            entry = self.shapes[shape(sql)]
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def repeated(self, limit=TOP_QUERIES):
+        """The query shapes run more than once, most frequent first."""
+        shapes = sorted(self.shapes.items(), key=lambda item: (-item[1][0], -item[1][1]))
+        return [
+            {'sql': sql[:300], 'count': count, 'ms': round(seconds * 1000, 2)}
+            for sql, (count, seconds) in shapes[:limit] if count > 1
+        ]
+
+    def header(self, total):
+        metrics = [f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"']
+        metrics += [f'{phase};dur={seconds * 1000:.1f}' for phase, seconds in self.phases.items()]
+        metrics.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(metrics)
+
+
+class ServerTimingMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = Profile()
+        token = current.set(profile)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(profile):
+                response = self.get_response(request)
+        finally:
+            current.reset(token)
+        total = time.perf_counter() - started
+        if self.show_header(request):
+            response['Server-Timing'] = profile.header(total)
+
+        slow = settings.SLOW_REQUEST_MS is not None and total * 1000 >= settings.SLOW_REQUEST_MS
+        if slow or random.random() < settings.REQUEST_LOG_SAMPLE_RATE:
+            record = {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'ms': round(total * 1000, 1),
+                'db_ms': round(profile.db * 1000, 1),
+                'queries': profile.queries,
+                **{f'{phase}_ms': round(seconds * 1000, 1) for phase, seconds in profile.phases.items()},
+            }
+            if slow:
+                record['repeated_queries'] = profile.repeated()
+                logger.warning("slow request %s", json.dumps(record))
+            else:
+                logger.info("request %s", json.dumps(record))
+        return response
+
+    def show_header(self, request):
+        # the query counts and database time are internals, not for visitors
+        if settings.SERVER_TIMING_HEADER:
+            return True
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+
+class TimingMixin:
+    """
+    Split the time of a DRF view into ``serialize`` (the handler outside
+    the database, mostly serialization) and ``render``.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        profile = current.get()
+        if profile is not None:
+            self._timing_start = (time.perf_counter(), profile.db)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        profile = current.get()
+        start = getattr(self, '_timing_start', None)
+        if profile is None or start is None:
+            return response
+        started, db = start
+        profile.add('serialize', time.perf_counter() - started - (profile.db - db))
+        if hasattr(response, 'render'):
+            started = time.perf_counter()
+            response.render()
+            profile.add('render', time.perf_counter() - started)
+        return response
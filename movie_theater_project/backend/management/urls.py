@@ -32,6 +32,8 @@ urlpatterns = [
     path('register/', views.register, name='register'),
     path('api/admin/dashboard/', views.AdminDashboardView.as_view(),
          name='admin-dashboard'),
+    path('api/admin/analytics/utilization/', views.UtilizationAnalyticsView.as_view(),
+         name='admin-utilization'),
     path('api/confirm/<int:uid>/<str:token>/', views.confirm_email,
          name='confirm-email'),
     path('api/auth/generate_token/', views.generate_token,
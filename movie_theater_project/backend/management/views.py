@@ -1,28 +1,32 @@
+import json
+import time
+
 from rest_framework.response import Response
-from django.core.exceptions import PermissionDenied
+from django.core.exceptions import PermissionDenied, ValidationError as DjangoValidationError
 from django.db import IntegrityError
 from django.shortcuts import render
 from rest_framework import viewsets, filters
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.settings import api_settings
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.dateparse import parse_date
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view, action, permission_classes
-from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAdminUser
 from django.views.decorators.csrf import csrf_exempt
-from .tasks import (
-    send_pending_booking_reminder,
-    delete_unpaid_booking,
-    send_showtime_reminder
-)
 from .permissions import (
     IsAdminOrReadOnly, IsReviewOwnerOrReadOnly, IsAuthenticated,
     IsBookingOwnerOrStaff, IsNotificationOwnerOrStaff
 )
 from .permissions import IsUserEmailVerified
-from django.http import HttpResponseRedirect
+from .timing import TimingMixin
+from . import allocation, analytics, holds, notifications, pricing, responsecache, search, seatmap, versions
+from django.http import Http404, HttpResponseRedirect
 from django.urls import reverse
 from django.contrib.auth import authenticate, login, logout
 from .serializers import (
@@ -44,13 +48,14 @@ from .serializers import (
     AuditoriumSerializer,
     RateServiceSerializer,
     FavouriteSerializer,
-    NewsSerializer)
+    NewsSerializer,
+    SeatHoldSerializer)
 from rest_framework import serializers
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from django.db import transaction
-from django.db.models import F, Count, Sum, Avg
-from django.db.models.functions import TruncDate, ExtractWeekDay
+from django.db.models import ExpressionWrapper, FloatField, Q, Sum
+from django.db.models.functions import ExtractWeekDay
 from .models import (
     Movie,
     Genre,
@@ -69,7 +74,11 @@ from .models import (
     Theater,
     RateService,
     Favourite,
-    News)
+    News,
+    DailyRollup,
+    HourlyRollup,
+    MovieDailyRollup,
+    AuditoriumDailyRollup)
 from django.contrib.auth.tokens import default_token_generator
 from django.core.mail import send_mail
 from django.conf import settings
@@ -216,7 +225,7 @@ def confirm_email(request, uid, token):
     return Response({"error": "Invalid or expired token"}, status=400)
 
 
-class LoginView(APIView):
+class LoginView(TimingMixin, APIView):
     parser_classes = [JSONParser]  # Ensure JSON parsing
 
     def post(self, request):
@@ -276,7 +285,7 @@ def api_user_profile(request):
     serializer = UserSerializer(request.user, data=request.data, partial=True)
     serializer.is_valid(raise_exception=True)
     serializer.save()
-    Notification.objects.create(
+    notifications.notify(
         user=request.user,
         message="🔧 Your profile was updated"
     )
@@ -295,33 +304,210 @@ class StandardPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 1000  # Allow large page_size to fetch all
 
+
+def reverse_ordering(ordering):
+    """The opposite of an ``order_by`` tuple of field names."""
+    return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset pagination on the view's ordering (``cursor_ordering`` unless an
+    OrderingFilter picks one) plus the id. The cursor holds every key of
+    the last row and the next page is fetched with a row comparison
+    against it, so there is no COUNT and, unlike DRF's cursor, no OFFSET
+    when the first key has ties.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        self.ordering = view.cursor_ordering
+        ordering = super().get_ordering(request, queryset, view)
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+        return ordering
+
+    def _get_position_from_instance(self, instance, ordering):
+        return json.dumps([str(getattr(instance, field.lstrip('-'))) for field in ordering])
+
+    def after(self, position, reverse):
+        """Rows past ``position`` in the (reversed) ordering."""
+        values = json.loads(position)
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # CursorPagination.paginate_queryset, filtering on all the keys
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse, position = (self.cursor.reverse, self.cursor.position) if self.cursor else (False, None)
+
+        queryset = queryset.order_by(*(reverse_ordering(self.ordering) if reverse else self.ordering))
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.after(position, reverse))
+            except (ValueError, TypeError, DjangoValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = (
+            self._get_position_from_instance(results[-1], self.ordering)
+            if len(results) > len(self.page) else None)
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, following is not None
+            self.next_position, self.previous_position = position, following
+        else:
+            self.has_next, self.has_previous = following is not None, position is not None
+            self.next_position, self.previous_position = following, position
+        return self.page
+
+
+class AliasOrderingFilter(OrderingFilter):
+    """
+    ``OrderingFilter`` that sorts the public names in the view's
+    ``ordering_aliases`` by the annotation they stand for.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        aliases = getattr(view, 'ordering_aliases', {})
+        if not ordering or not aliases:
+            return ordering
+        return [
+            ('-' if field.startswith('-') else '') + aliases.get(field.lstrip('-'), field.lstrip('-'))
+            for field in ordering
+        ]
+
+
+class HybridPagination(BasePagination):
+    """
+    Keyset pagination by default. Clients that need page numbers and a
+    total count opt in with ``?page=``, as do orderings across relations,
+    which a cursor cannot key on.
+    """
+    cursor_class = KeysetPagination
+    page_number_class = StandardPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = request.query_params.get(api_settings.ORDERING_PARAM, '')
+        if 'page' in request.query_params or '__' in ordering:
+            self.paginator = self.page_number_class()
+        else:
+            self.paginator = self.cursor_class()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+
+class EagerLoadingMixin:
+    """
+    Load the relations the serializer renders for this request together
+    with the queryset (see ``serializers.ExpandableFieldsMixin``) on read
+    requests.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        if self.request.method in SAFE_METHODS and hasattr(serializer_class, 'setup_eager_loading'):
+            queryset = serializer_class.setup_eager_loading(queryset, self.request)
+        return queryset
+
+
+class ConditionalGetMixin:
+    """
+    Validate list and retrieve responses with an ETag and Last-Modified
+    derived from the change counters of ``conditional_models`` (see
+    ``versions``), answering 304 before any row is queried or serialized.
+    Views whose result also moves with the clock set ``conditional_window``
+    (seconds) to expire their ETag; they send no Last-Modified. With
+    ``cache_responses`` anonymous responses are shared through
+    ``responsecache``.
+    """
+    conditional_models = ()
+    conditional_window = None
+    cache_responses = False
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(request, super().retrieve, *args, **kwargs)
+
+    def conditional(self, request, render, *args, models=None, window=None, **kwargs):
+        models = models or self.conditional_models
+        window = window or self.conditional_window
+        extra = [request.get_full_path(), request.user.pk, request.META.get('HTTP_ACCEPT', '')]
+        if window:
+            extra.append(int(time.time() // window))
+        etag, last_modified = versions.validators(models, *extra)
+        if window or last_modified is None:
+            last_modified = None
+        else:
+            last_modified = int(last_modified.timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None and self.cache_responses and request.user.is_anonymous:
+            served, response = responsecache.fetch(
+                request, etag, lambda: render(request, *args, **kwargs))
+            if served != etag:
+                etag, last_modified = served, None
+        elif response is None:
+            response = render(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
 # API views (generic class-based or viewsets).
 
 
-class GenreViewSet(viewsets.ModelViewSet):
+class GenreViewSet(TimingMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet for managing genres."""
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = [IsAdminOrReadOnly]
+    conditional_models = (Genre,)
+    cache_responses = True
 
 
-class ActorViewSet(viewsets.ModelViewSet):
+class ActorViewSet(TimingMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet for managing actors."""
     queryset = Actor.objects.all()
     serializer_class = ActorSerializer
     permission_classes = [IsAdminOrReadOnly]
+    conditional_models = (Actor,)
 
     @action(detail=True, methods=['get'], url_path='movies')
     def movies(self, request, pk=None):
         """Custom action to get movies featuring a specific actor."""
         actor = get_object_or_404(Actor, pk=pk)
         roles = Role.objects.filter(actor=actor)
-        movies = Movie.objects.filter(roles__in=roles)
-        serializer = MovieSerializer(movies, many=True)
+        movies = MovieSerializer.setup_eager_loading(Movie.objects.filter(roles__in=roles), request)
+        serializer = MovieSerializer(movies, many=True, context={'request': request})
         return Response(serializer.data)
 
 
-class DirectorViewSet(viewsets.ModelViewSet):
+class DirectorViewSet(TimingMixin, viewsets.ModelViewSet):
     """ViewSet for managing directors."""
     queryset = Director.objects.all()
     serializer_class = DirectorSerializer
@@ -331,12 +517,12 @@ class DirectorViewSet(viewsets.ModelViewSet):
     def movies(self, request, pk=None):
         """Custom action to get movies directed by a specific director."""
         director = get_object_or_404(Director, pk=pk)
-        movies = Movie.objects.filter(director=director)
-        serializer = MovieSerializer(movies, many=True)
+        movies = MovieSerializer.setup_eager_loading(Movie.objects.filter(director=director), request)
+        serializer = MovieSerializer(movies, many=True, context={'request': request})
         return Response(serializer.data)
 
 
-class ProducerViewSet(viewsets.ModelViewSet):
+class ProducerViewSet(TimingMixin, viewsets.ModelViewSet):
     """ViewSet for managing producers."""
     queryset = Producer.objects.all()
     serializer_class = ProducerSerializer
@@ -346,38 +532,33 @@ class ProducerViewSet(viewsets.ModelViewSet):
     def movies(self, request, pk=None):
         """Custom action to get movies produced by a specific producer."""
         producer = get_object_or_404(Producer, pk=pk)
-        movies = Movie.objects.filter(producer=producer)
-        serializer = MovieSerializer(movies, many=True)
+        movies = MovieSerializer.setup_eager_loading(Movie.objects.filter(producer=producer), request)
+        serializer = MovieSerializer(movies, many=True, context={'request': request})
         return Response(serializer.data)
 
 
-class RoleViewSet(viewsets.ModelViewSet):
+class RoleViewSet(TimingMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """ViewSet for managing roles."""
     queryset = Role.objects.all()
     serializer_class = RoleSerializer
     permission_classes = [IsAdminOrReadOnly]
 
 
-class MovieViewSet(viewsets.ModelViewSet):
+class MovieViewSet(TimingMixin, ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """ViewSet for managing movies."""
     queryset = Movie.objects.all()
     serializer_class = MovieSerializer
+    conditional_models = (Movie, Genre, Actor, Director, Producer)
+    cache_responses = True
 
-    filter_backends = [SearchFilter, DjangoFilterBackend, OrderingFilter]
-    search_fields = [
-        'title',
-        'description',
-        'genre__name',
-        'actors__name',
-        'producer__name',
-        'director__name'
-    ]
+    # ranked ?search= over title, cast and crew, genres and description
+    filter_backends = [DjangoFilterBackend, OrderingFilter, search.MovieSearchFilter]
     filterset_fields = {
         'rating': ['exact', 'gte', 'lte'],  # filter by exact rating or ranges
         'release_date': ['exact', 'year__gte', 'year__lte'],
         'genre__name': ['exact'],
     }
-    ordering_fields = ['rating', 'release_date', 'title']
+    ordering_fields = ['rating', 'release_date', 'title', 'review_average', 'review_count']
     ordering = ['title']
     pagination_class = MoviePagination
 
@@ -390,25 +571,31 @@ class MovieViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'], url_path='showtimes')
     def showtimes(self, request, pk=None):
+        return self.conditional(
+            request, self.render_showtimes, pk=pk,
+            models=ShowtimeViewSet.conditional_models, window=ShowtimeViewSet.conditional_window)
+
+    def render_showtimes(self, request, pk=None):
         shows = Showtime.objects.filter(
             movie_id=pk,
             start_time__gte=timezone.now(),
             auditorium__available_seats__gt=0)
-        serializer = ShowtimeSerializer(shows, many=True)
+        shows = ShowtimeSerializer.setup_eager_loading(shows, request)
+        serializer = ShowtimeSerializer(shows, many=True, context={'request': request})
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'], url_path='roles')
     def roles(self, request, pk=None):
         """Custom action to get roles for a specific movie."""
         movie = get_object_or_404(Movie, pk=pk)
-        roles = Role.objects.filter(movie=movie)
-        serializer = RoleSerializer(roles, many=True)
+        roles = RoleSerializer.setup_eager_loading(Role.objects.filter(movie=movie), request)
+        serializer = RoleSerializer(roles, many=True, context={'request': request})
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'], url_path='reviews',
             permission_classes=[AllowAny])
     def reviews(self, request, pk=None):
-        qs = Review.objects.filter(movie_id=pk)
+        qs = ReviewSerializer.setup_eager_loading(Review.objects.filter(movie_id=pk), request)
         serializer = ReviewSerializer(
             qs, many=True, context={
                 'request': request})
@@ -427,7 +614,7 @@ class MovieViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         serializer.save(user=request.user, movie_id=pk)
         # Create a notification for the user
-        Notification.objects.create(
+        notifications.notify(
             user=request.user,
             message=f"🌟 New review for {serializer.instance.movie.title}"
 
@@ -441,18 +628,19 @@ class MovieViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class SeatViewSet(viewsets.ModelViewSet):
+class SeatViewSet(TimingMixin, viewsets.ModelViewSet):
     """ViewSet for managing seats."""
     queryset = Seat.objects.all()
     serializer_class = SeatSerializer
     permission_classes = [IsAdminOrReadOnly]
 
 
-class TheaterViewSet(viewsets.ModelViewSet):
+class TheaterViewSet(TimingMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet for managing theaters."""
     queryset = Theater.objects.all()
     serializer_class = TheaterSerializer
     permission_classes = [IsAdminOrReadOnly]
+    conditional_models = (Theater,)
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     search_fields = ['name', 'location']
     ordering_fields = ['name', 'location']
@@ -460,8 +648,8 @@ class TheaterViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'], url_path='auditoriums')
     def auditoriums(self, request, pk=None):
-        qs = Auditorium.objects.filter(theater_id=pk)
-        serializer = AuditoriumSerializer(qs, many=True)
+        qs = AuditoriumSerializer.setup_eager_loading(Auditorium.objects.filter(theater_id=pk), request)
+        serializer = AuditoriumSerializer(qs, many=True, context={'request': request})
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'], url_path='showtimes')
@@ -472,11 +660,12 @@ class TheaterViewSet(viewsets.ModelViewSet):
             auditorium__theater=theater,
             start_time__gte=timezone.now(),
             auditorium__available_seats__gt=0)
-        serializer = ShowtimeSerializer(showtimes, many=True)
+        showtimes = ShowtimeSerializer.setup_eager_loading(showtimes, request)
+        serializer = ShowtimeSerializer(showtimes, many=True, context={'request': request})
         return Response(serializer.data)
 
 
-class AuditoriumViewSet(viewsets.ModelViewSet):
+class AuditoriumViewSet(TimingMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """ViewSet for managing auditoriums."""
     queryset = Auditorium.objects.all()
     serializer_class = AuditoriumSerializer
@@ -491,9 +680,12 @@ class AuditoriumViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class ShowtimeViewSet(viewsets.ModelViewSet):
+class ShowtimeViewSet(TimingMixin, ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Showtime.objects.all()
     serializer_class = ShowtimeSerializer
+    conditional_models = (Showtime, Movie, Genre, Actor, Director, Producer, Auditorium, Theater)
+    # past showtimes drop out of the list without any write
+    conditional_window = 60
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     permission_classes = [IsAdminOrReadOnly]
     # keep searching by movie title / theater name
@@ -514,44 +706,115 @@ class ShowtimeViewSet(viewsets.ModelViewSet):
     # allow ?ordering=start_time or ?ordering=-available_seats
     ordering_fields = ['start_time', 'available_seats', 'movie__rating']
     ordering = ['start_time']
+    pagination_class = HybridPagination
+    cursor_ordering = ('start_time', 'id')
 
     def get_queryset(self):
-        user = self.request.user
-        base_qs = Showtime.objects.filter(
+        queryset = super().get_queryset()
+        if self.request.user.is_staff:
+            # staff still see everything
+            return queryset
+        # everyone else only sees future, non‐sold‐out showtimes
+        return queryset.filter(
             start_time__gte=timezone.now(),
             available_seats__gt=0
         )
-        if user.is_staff:
-            # staff still see everything
-            return Showtime.objects.all()
-        # everyone else only sees future, non‐sold‐out showtimes
-        return base_qs
+
+    def get_seat_map(self, pk):
+        seat_map = seatmap.get(pk)
+        if seat_map is None:
+            raise Http404("No Showtime matches the given query.")
+        seat_map.held = holds.held_seats(seat_map)
+        return seat_map
 
     @action(detail=True, methods=['get'], url_path='seats')
     def get_seats(self, request, pk=None):
         """Custom action to get seats for a specific showtime."""
-        showtime = get_object_or_404(Showtime, pk=pk)
-        seats = Seat.objects.filter(showtime=showtime)
-        serializer = SeatSerializer(seats, many=True)
-        return Response(serializer.data)
+        return Response(self.get_seat_map(pk).as_list())
 
     @action(detail=True, methods=['get'], url_path='available_seats')
     def get_available_seats(self, request, pk=None):
         """Custom action to get available seats for a specific showtime."""
-        showtime = get_object_or_404(Showtime, pk=pk)
-        available_seats = Seat.objects.filter(showtime=showtime, is_booked=False)
-        serializer = SeatSerializer(available_seats, many=True)
-        return Response(serializer.data)
+        return Response(self.get_seat_map(pk).as_list(available_only=True))
 
+    @action(detail=True, methods=['get'], url_path='seat-map')
+    def seat_map(self, request, pk=None):
+        """
+        GET /api/showtimes/{pk}/seat-map/
+        Compact availability: row labels, column count and base64 bitmaps
+        of the existing and the booked seats (row-major, MSB first).
+        """
+        return Response(self.get_seat_map(pk).as_compact())
 
-class ReviewViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'], url_path='quote')
+    def quote(self, request, pk=None):
+        """
+        GET /api/showtimes/{pk}/quote/?seat_ids=1,2,3
+        Price of the seats after the showtime's price rules, per zone price
+        and in total.
+        """
+        try:
+            seat_ids = [
+                int(seat_id) for value in request.query_params.getlist('seat_ids')
+                for seat_id in value.split(',') if seat_id.strip()
+            ]
+        except ValueError:
+            return Response({'seat_ids': 'Expected a list of seat ids.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not seat_ids:
+            return Response({'seat_ids': 'Select at least one seat.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            quote = pricing.quote(pk, seat_ids)
+        except (Showtime.DoesNotExist, ValueError):
+            raise Http404("No Showtime matches the given query.")
+        except pricing.UnknownSeats as e:
+            return Response({'seat_ids': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        for line in quote['lines']:
+            for field in ('price', 'unit_price', 'subtotal'):
+                line[field] = f"{line[field]:.2f}"
+        quote['total'] = f"{quote['total']:.2f}"
+        return Response(quote)
+
+    @action(detail=True, methods=['post'], url_path='holds',
+            permission_classes=[IsAuthenticated, IsUserEmailVerified])
+    def hold_seats(self, request, pk=None):
+        """
+        POST /api/showtimes/{pk}/holds/  {"seat_numbers": ["A1", "A2"]}
+        Hold seats for checkout for SEAT_HOLD_TTL_MINUTES. Answers 409 with
+        the conflicting seats if any of them is booked or held already.
+        """
+        serializer = SeatHoldSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            hold = holds.place_hold(
+                pk, serializer.validated_data['seat_numbers'], request.user)
+        except holds.HoldConflict as e:
+            return Response({'detail': str(e), 'conflicts': e.conflicts},
+                            status=status.HTTP_409_CONFLICT)
+        if hold is None:
+            raise Http404("No Showtime matches the given query.")
+        return Response(hold, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['delete'], url_path=r'holds/(?P<hold_id>[0-9a-f]+)',
+            permission_classes=[IsAuthenticated])
+    def release_hold(self, request, pk=None, hold_id=None):
+        """DELETE /api/showtimes/{pk}/holds/{hold_id}/ → give the seats back."""
+        store = holds.get_store()
+        hold = store.get(hold_id)
+        if hold is None or hold['user'] != request.user.pk or str(hold['showtime']) != pk:
+            raise Http404("No hold matches the given query.")
+        store.release(hold_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ReviewViewSet(TimingMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Review.objects.all().order_by('-created_at')
     serializer_class = ReviewSerializer
     permission_classes = [IsReviewOwnerOrReadOnly, IsUserEmailVerified]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['user', 'movie']
     search_fields = ['content']
-    pagination_class = StandardPagination
+    pagination_class = HybridPagination
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -560,36 +823,41 @@ class ReviewViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(user_id=user_id)
         return queryset
 
+    @transaction.atomic
     def perform_create(self, serializer):
         review = serializer.save(user=self.request.user)
-        Notification.objects.create(
+        notifications.notify(
             user=self.request.user,
             message=f"Your review for {review.movie.title} has been created."
         )
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @transaction.atomic
     def perform_update(self, serializer):
         # only save the provided fields; user already set on create
         review = serializer.save()
-        Notification.objects.create(
+        notifications.notify(
             user=self.request.user,
             message=f"✏️ Review updated for {review.movie.title}"
         )
 
+    @transaction.atomic
     def perform_destroy(self, instance):
         # Create a notification for the user
-        Notification.objects.create(
+        notifications.notify(
             user=self.request.user,
             message=f"Your review for {instance.movie.title} has been deleted."
         )
         return super().perform_destroy(instance)
 
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(TimingMixin, viewsets.ModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated, IsNotificationOwnerOrStaff]
+    pagination_class = HybridPagination
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         # only this user’s notifications
@@ -604,7 +872,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
         return super().partial_update(request, *args, **kwargs)
 
 
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(TimingMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """ViewSet for managing bookings."""
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
@@ -612,45 +880,54 @@ class BookingViewSet(viewsets.ModelViewSet):
         IsBookingOwnerOrStaff,
         IsAuthenticated,
         IsUserEmailVerified]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, SearchFilter, AliasOrderingFilter]
     filterset_fields = ['user', 'showtime', 'status']
     search_fields = ['showtime__movie__title', 'showtime__auditorium__theater__name']
-    ordering_fields = ['created_at', 'showtime__start_time']
+    ordering_fields = ['created_at', 'showtime__start_time', 'attended']
+    # ?ordering=attended sorts by the attendance derived at query time
+    ordering_aliases = {'attended': 'attended_now'}
     ordering = ['-created_at']
-    pagination_class = StandardPagination
+    pagination_class = HybridPagination
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        # reads never write: attendance is derived here, the stored flag
+        # is refreshed by tasks.settle_finished_bookings
+        queryset = super().get_queryset().annotate(attended_now=Booking.attendance())
         user_id = self.request.query_params.get('user')
         if user_id:
             queryset = queryset.filter(user_id=user_id)
+        attended = {'true': True, '1': True, 'false': False, '0': False}.get(
+            self.request.query_params.get('attended', '').lower())
+        if attended is not None:
+            queryset = queryset.filter(attended_now=attended)
         return queryset
 
+    @transaction.atomic
     def perform_create(self, serializer):
         booking = serializer.save(user=self.request.user)
-        Notification.objects.create(
+        notifications.notify(
             user=self.request.user,
             message=f"✅ Booking created for {booking.showtime.movie.title}"
         )
-        # 1) remind in 24 h if still pending
-        send_pending_booking_reminder.apply_async(
-            args=[booking.id],
-            countdown=86400,  # 24*60*60 seconds
-        )
-
-        # 2) delete in 48 h if still pending
-        delete_unpaid_booking.apply_async(
-            args=[booking.id],
-            countdown=86400 * 2,
-        )
+        # payment reminders, expiry of unpaid bookings and showtime
+        # reminders are handled by the periodic tasks.sweep_bookings
 
-        # 3) 24 h before showtime (only if that time is in the future)
-        eta = booking.showtime.start_time - timedelta(hours=24)
-        if eta > timezone.now():
-            send_showtime_reminder.apply_async(
-                args=[booking.id],
-                eta=eta,
-            )
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch(self, request):
+        """
+        POST /api/bookings/batch/
+        {"bookings": [{"showtime_id": 1, "seat_ids": [3, 4]}, {"showtime_id": 2, "seat_numbers": ["C5"]}]}
+        Book every group or none; errors come back as a list, one entry per group.
+        """
+        data = request.data.get('bookings') if isinstance(request.data, dict) else request.data
+        serializer = self.get_serializer(data=data, many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            bookings = serializer.save(user=request.user)
+            notifications.notify_many(request.user, [
+                f"✅ Booking created for {booking.showtime.movie.title}" for booking in bookings])
+        return Response(self.get_serializer(bookings, many=True).data, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['get'], url_path='user')
     def user(self, request):
@@ -677,7 +954,6 @@ class BookingViewSet(viewsets.ModelViewSet):
         if not booking.seats.exists():
             return Response({'error': 'No seats booked for this booking.'},
                             status=status.HTTP_400_BAD_REQUEST)
-        num_seats = booking.seats.count()
         # Ensure the booking is not already cancelled
         if booking.status == 'Cancelled':
             return Response({'error': 'This booking has already been cancelled.'},
@@ -685,52 +961,28 @@ class BookingViewSet(viewsets.ModelViewSet):
         booking.status = 'Cancelled'
         booking.save()
         with transaction.atomic():
-            # free the seats
-            booking.seats.update(is_booked=False)
-            # increment available_seats
-            Showtime.objects.filter(pk=booking.showtime_id).update(
-                available_seats=F('available_seats') + num_seats
+            # free the seats and give them back to the showtime
+            allocation.release(booking.showtime_id, booking.seats.values_list('id', flat=True))
+            notifications.notify(
+                user=request.user,
+                message=f"❌ Booking cancelled for {booking.showtime.movie.title}"
             )
-        Notification.objects.create(
-            user=request.user,
-            message=f"❌ Booking cancelled for {booking.showtime.movie.title}"
-        )
         booking.attended = False
         booking.status = 'Cancelled'
         booking.save()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    def list(self, request, *args, **kwargs):
-        # auto‐mark all past, non‐cancelled bookings as attended
-        now = timezone.now()
-        Booking.objects.filter(
-            showtime__start_time__lt=now,
-            attended=False,
-            status__in=['Confirmed']
-        ).exclude(status='Cancelled').update(attended=True)
-        return super().list(request, *args, **kwargs)
-
-    def retrieve(self, request, *args, **kwargs):
-        # also run it on retrieve so single‐item GETs stay in sync
-        instance = self.get_object()
-        if instance.showtime.start_time < timezone.now() \
-           and instance.status != 'Cancelled' \
-           and not instance.attended:
-            instance.attended = True
-            instance.save(update_fields=['attended'])
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
-
+    @transaction.atomic
     def perform_update(self, serializer):
         booking = serializer.save()
-        Notification.objects.create(
+        notifications.notify(
             user=self.request.user,
             message=f"✏️ Booking updated for {booking.showtime.movie.title}"
         )
         return booking
 
 
-class WatchlistViewSet(viewsets.ModelViewSet):
+class WatchlistViewSet(TimingMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """ViewSet for managing watchlists."""
     queryset = Watchlist.objects.all().order_by('id')
     serializer_class = WatchlistSerializer
@@ -747,23 +999,25 @@ class WatchlistViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(user_id=user_id)
         return queryset
 
+    @transaction.atomic
     def perform_create(self, serializer):
         new = serializer.save(user=self.request.user)
-        Notification.objects.create(
+        notifications.notify(
             user=self.request.user,
             message=f"⭐ Added {new.movie.title} to your watchlist"
         )
 
+    @transaction.atomic
     def perform_destroy(self, instance):
         title = instance.movie.title
         instance.delete()
-        Notification.objects.create(
+        notifications.notify(
             user=self.request.user,
             message=f"🗑 Removed {title} from your watchlist"
         )
 
 
-class RateServiceViewSet(viewsets.ModelViewSet):
+class RateServiceViewSet(TimingMixin, viewsets.ModelViewSet):
     """
     GET  /api/rate-services/            → list (your reviews)
     POST /api/rate-services/            → create a new service‐review
@@ -784,23 +1038,24 @@ class RateServiceViewSet(viewsets.ModelViewSet):
             return RateService.objects.all()
         return RateService.objects.filter(user=user)
 
+    @transaction.atomic
     def perform_create(self, serializer):
         booking = serializer.validated_data['booking']
         user = self.request.user
         # enforce only attended bookings can be reviewed
-        if not booking.attended:
+        if not booking.has_attended():
             raise serializers.ValidationError(
                 "Can only review service for bookings you've attended."
             )
         # UniqueTogetherValidator will prevent dup on the same booking
-        Notification.objects.create(
+        notifications.notify(
             user=user,
             message=f"🌟 New review for {booking.showtime.movie.title}"
         )
         serializer.save(user=user, booking=booking)
 
 
-class FavouriteViewSet(viewsets.ModelViewSet):
+class FavouriteViewSet(TimingMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """ViewSet for managing favourites."""
     queryset = Favourite.objects.all()
     serializer_class = FavouriteSerializer
@@ -809,28 +1064,31 @@ class FavouriteViewSet(viewsets.ModelViewSet):
     filterset_fields = ['movie']
 
     def get_queryset(self):
+        queryset = super().get_queryset()
         user = self.request.user
         if user.is_staff:
-            return Favourite.objects.all()
-        return Favourite.objects.filter(user=user)
+            return queryset
+        return queryset.filter(user=user)
 
+    @transaction.atomic
     def perform_create(self, serializer):
         fav = serializer.save(user=self.request.user)
-        Notification.objects.create(
+        notifications.notify(
             user=self.request.user,
             message=f"❤️ You favorited {fav.movie.title}"
         )
 
+    @transaction.atomic
     def perform_destroy(self, instance):
         title = instance.movie.title
         super().perform_destroy(instance)
-        Notification.objects.create(
+        notifications.notify(
             user=self.request.user,
             message=f"💔 You unfavorited {title}"
         )
 
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(TimingMixin, viewsets.ModelViewSet):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated]
@@ -844,10 +1102,13 @@ class PaymentViewSet(viewsets.ModelViewSet):
     def process_payment(self, request):
         # debug print so you see the payload
         print("🔔 process_payment called:", request.data)
+        hold_id = request.data.get('hold_id')
+        if hold_id:
+            return self.pay_for_hold(request, hold_id)
         booking_id = request.data.get('booking_id')
         if not booking_id:
             return Response(
-                {"detail": "booking_id is required"},
+                {"detail": "booking_id or hold_id is required"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         try:
@@ -866,19 +1127,20 @@ class PaymentViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # mock “charge”
-            payment = Payment.objects.create(
-                user=request.user,
-                booking=booking,
-                amount=booking.cost,
-                status="success"
-            )
+            with transaction.atomic():
+                # mock “charge”
+                payment = Payment.objects.create(
+                    user=request.user,
+                    booking=booking,
+                    amount=booking.cost,
+                    status="success"
+                )
 
-            booking.status = "Confirmed"
-            booking.save(update_fields=["status"])
-            Notification.objects.create(
-                user=request.user, message=f"💳 Payment received for booking #"
-                f"{payment.booking.showtime.movie.title}")
+                booking.status = "Confirmed"
+                booking.save(update_fields=["status"])
+                notifications.notify(
+                    user=request.user, message=f"💳 Payment received for booking #"
+                    f"{payment.booking.showtime.movie.title}")
             return Response(
                 {"payment_id": payment.id, "status": "success"},
                 status=status.HTTP_200_OK
@@ -893,218 +1155,239 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def pay_for_hold(self, request, hold_id):
+        """Promote a seat hold straight to a confirmed, paid booking."""
+        store = holds.get_store()
+        hold = store.get(hold_id)
+        if hold is None or hold['user'] != request.user.pk:
+            return Response(
+                {"detail": "Hold not found or expired."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer = BookingSerializer(data={
+            'showtime_id': hold['showtime'],
+            'seat_numbers': hold['seats'],
+        }, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            booking = serializer.save(user=request.user)
+            booking.status = "Confirmed"
+            booking.save(update_fields=["status"])
+            payment = Payment.objects.create(
+                user=request.user,
+                booking=booking,
+                amount=booking.cost,
+                status="Completed",
+                payment_method=request.data.get('payment_method', 'Credit Card')
+            )
+            notifications.notify(
+                user=request.user, message=f"💳 Payment received for booking #"
+                f"{booking.showtime.movie.title}")
+        store.release(hold_id)
+        return Response(
+            {"payment_id": payment.id, "booking_id": booking.id, "status": "success"},
+            status=status.HTTP_200_OK
+        )
+
 
-class AdminDashboardView(APIView):
+class AdminDashboardView(TimingMixin, APIView):
+    """
+    Site-wide statistics, read from the rollup tables kept by
+    ``management.rollups``, so the page costs a fixed number of queries
+    and never scans the users, bookings or payments tables.
+    """
     permission_classes = [IsAdminUser]
 
     def get(self, request):
         User = get_user_model()  # Use the custom user model
         now = timezone.now()
-        week_ago = now - timezone.timedelta(days=7)
-        month_ago = now - timezone.timedelta(days=30)
-
-        # --- existing users / growth stats ---
-        total_users = User.objects.count()
-        new_week = User.objects.filter(date_joined__gte=week_ago).count()
-        new_month = User.objects.filter(date_joined__gte=month_ago).count()
-        active_users = User.objects.filter(is_active=True).count()
-        verified_emails = User.objects.filter(
-            is_active=True, email_verified=True).count()
-
-        # --- Conversion funnel ---
-        registered = total_users
-        verified = verified_emails
-        booked = Booking.objects.filter(
-            status__in=[
-                'Pending',
-                'Confirmed']).values('user').distinct().count()
-        paid = Payment.objects.filter(status='Completed').values(
-            'booking__user').distinct().count()
-        funnel = {
-            "registered": registered,
-            "verified": verified,
-            "booked": booked,
-            "paid": paid,
-        }
-
-        # retention vs churn
-        old_users = User.objects.filter(date_joined__lte=month_ago)
-        booked_old = old_users.filter(
-            bookings__created_at__gte=month_ago).distinct().count()
-        retention_rate = booked_old / old_users.count() if old_users.exists() else 0
+        today = timezone.localdate()
+        week_ago = today - timezone.timedelta(days=6)
 
         # top 5 users by points
-        top_users_qs = User.objects.annotate(
-            total_points=Sum('points')).order_by('-total_points')[:5]
-        top_users = [{'id': u.id, 'username': u.username,
-                      'total_points': u.total_points or 0} for u in top_users_qs]
-
-        # daily growth trend (last 30 d)
-        growth = (
-            User.objects.filter(date_joined__gte=month_ago)
-            .annotate(day=TruncDate('date_joined'))
-            .values('day')
-            .annotate(count=Count('id'))
-            .order_by('day')
-        )
+        top_users = [
+            {'id': u['id'], 'username': u['username'], 'total_points': u['points'] or 0}
+            for u in User.objects.order_by('-points').values('id', 'username', 'points')[:5]
+        ]
 
-        # --- booking stats ---
-        total_bookings = Booking.objects.count()
-        pending = Booking.objects.filter(status='Pending').count()
-        confirmed = Booking.objects.filter(status='Confirmed').count()
-        cancelled = Booking.objects.filter(status='Cancelled').count()
-        attended = Booking.objects.filter(attended=True).count()
-
-        # Repeat vs one-time customers
-        repeat_customers = (
-            User.objects.annotate(bcount=Count('bookings'))
-            .filter(bcount__gt=1).count()
-        )
-        one_time_customers = (
-            User.objects.annotate(bcount=Count('bookings'))
-            .filter(bcount=1).count()
+        # --- users, bookings and revenue totals ---
+        totals = DailyRollup.objects.aggregate(
+            users=Sum('signups'),
+            active=Sum('active_signups'),
+            verified=Sum('verified_signups'),
+            established=Sum('signups', filter=Q(day__lte=today - timezone.timedelta(days=30))),
+            booked=Sum('first_bookings'),
+            repeat=Sum('repeat_bookings'),
+            paid=Sum('first_payments'),
+            bookings=Sum('bookings'),
+            pending=Sum('bookings_pending'),
+            confirmed=Sum('bookings_confirmed'),
+            cancelled=Sum('bookings_cancelled'),
+            attended=Sum('bookings_attended'),
+            lead_seconds=Sum('lead_seconds'),
+            lead_bookings=Sum('lead_bookings'),
+            revenue=Sum('revenue'),
+            refunds=Sum('refunds'),
+            failed=Sum('failed_payments'),
         )
-
+        totals = {key: value or 0 for key, value in totals.items()}
+        funnel = {
+            "registered": totals['users'],
+            "verified": totals['verified'],
+            "booked": totals['booked'],
+            "paid": totals['paid'],
+        }
         # average lead‐time (booking → showtime) in hours
-        lead_times = Booking.objects.filter(status='Confirmed')\
-            .annotate(lead=F('showtime__start_time') - F('created_at'))\
-            .aggregate(avg_lead=Avg('lead'))['avg_lead']
         avg_lead_hours = (
-            lead_times.total_seconds() /
-            3600) if lead_times else 0
+            totals['lead_seconds'] / totals['lead_bookings'] / 3600
+            if totals['lead_bookings'] else 0
+        )
+
+        # daily trends (last 30 d)
+        recent = list(
+            DailyRollup.objects.filter(day__gte=today - timezone.timedelta(days=29))
+            .order_by('day').values('day', 'signups', 'revenue', 'retained_users'))
+        growth = [{'day': r['day'], 'count': r['signups']} for r in recent if r['signups']]
+        revenue_trend = [{'day': r['day'], 'total': r['revenue']} for r in recent if r['revenue']]
+        new_week = sum(r['signups'] for r in recent if r['day'] >= week_ago)
+        new_month = sum(r['signups'] for r in recent)
+        retained = next((r['retained_users'] for r in recent if r['day'] == today), 0)
+        retention_rate = retained / totals['established'] if totals['established'] else 0
 
         # bookings by day of week
         dow = (
-            Booking.objects.annotate(dow=ExtractWeekDay('created_at'))
-            .values('dow').annotate(count=Count('id')).order_by('dow')
+            DailyRollup.objects.filter(bookings__gt=0)
+            .annotate(dow=ExtractWeekDay('day'))
+            .values('dow').annotate(count=Sum('bookings')).order_by('dow')
         )
 
-        # --- Global occupancy (all showtimes) ---
-        total_seats = Seat.objects.count()  # all seats
-        booked_seats = Seat.objects.filter(
-            is_booked=True).count()  # all booked seats
-        occupancy_rate = booked_seats / total_seats if total_seats else 0
+        # last 24 h, hour by hour
+        hourly = HourlyRollup.objects.filter(
+            hour__gte=now - timezone.timedelta(hours=24)
+        ).order_by('hour').values('hour', 'signups', 'bookings', 'revenue')
 
-        # --- Auditorium utilization (per hall) ---
-        auditoriums = Auditorium.objects.all()
-        auditorium_utilization = []
-
-        for aud in auditoriums:
-            pass
-
-        # --- revenue ---
-        total_revenue = Payment.objects.filter(
-            status='Completed').aggregate(
-            sum=Sum('amount'))['sum'] or 0
-        refunds = Payment.objects.filter(
-            status='Refunded').aggregate(
-            sum=Sum('amount'))['sum'] or 0
-        failed = Payment.objects.filter(status__in=['Failed', 'Error']).count()
-
-        # revenue by movie
-        rev_by_movie = (
-            Payment.objects.filter(status='Completed')
-            .values('booking__showtime__movie__title')
-            .annotate(revenue=Sum('amount'))
-            .order_by('-revenue')[:10]
-        )
+        # --- movie analytics: each ranking is sorted and cut in SQL ---
+        movie_totals = MovieDailyRollup.objects.values('movie_id', 'movie__title')
 
-        # Revenue trend (last 30 days)
-        revenue_trend = (
-            Payment.objects.filter(
-                status="Completed",
-                created_at__gte=month_ago) .annotate(
-                day=TruncDate("created_at")) .values("day") .annotate(
-                total=Sum("amount")) .order_by("day"))
-
-        # --- movie analytics ---
-        top_movies = Movie.objects.annotate(booked=Count(
-            'showtimes__bookings')).order_by('-booked')[:5]
-        top_movies_data = [{'title': m.title, 'bookings': m.booked}
-                           for m in top_movies]
-
-        top_rated = (
-            Review.objects.values('movie__title')
-            .annotate(avg=Avg('rating'), cnt=Count('id'))
-            .filter(cnt__gte=5)
-            .order_by('-avg')[:5]
-        )
+        def top(queryset, limit=5):
+            return list(queryset.order_by('-total', 'movie__title')[:limit])
 
+        def top_sum(field, limit=5):
+            return top(movie_totals.annotate(total=Sum(field)).filter(total__gt=0), limit)
+
+        rev_by_movie = [
+            {'booking__showtime__movie__title': r['movie__title'], 'revenue': r['total']}
+            for r in top_sum('revenue', 10)
+        ]
+        top_movies_data = [{'title': r['movie__title'], 'bookings': r['total']}
+                           for r in top_sum('bookings')]
+        top_rated = [
+            {'movie__title': r['movie__title'], 'avg': r['total'], 'cnt': r['cnt']}
+            for r in top(movie_totals.annotate(
+                cnt=Sum('reviews'),
+                total=ExpressionWrapper(Sum('review_rating_sum') / Sum('reviews'), output_field=FloatField()),
+            ).filter(cnt__gte=5))
+        ]
         most_reviewed = sorted(
             [{'title': r['movie__title'], 'reviews': r['cnt']} for r in top_rated],
             key=lambda x: -x['reviews']
         )[:5]
-        top_favorited = (
-            Favourite.objects.values('movie__title')
-            .annotate(count=Count('id'))
-            .order_by('-count')[:5]
-        )
-        Favourite_data = [{'title': f['movie__title'],
-                           'favorited': f['count']} for f in top_favorited]
-        top_watchlisted = Movie.objects.annotate(
-            watched=Count('watchlists')).order_by('-watched')[:5]
-        watchlist_data = [{'title': m.title, 'watchlisted': m.watched}
-                          for m in top_watchlisted]
-
-        # --- service review analytics ---
-        svc_aud_qs = RateService.objects.values(
-            aud_id=F('booking__showtime__auditorium__id'),
-            aud_name=F('booking__showtime__auditorium__name'),
-        ).annotate(avg_rating=Avg('all_rating')).order_by('-avg_rating')
-        service_by_auditorium = [
+        Favourite_data = [{'title': r['movie__title'], 'favorited': r['total']}
+                          for r in top_sum('favourites')]
+        watchlist_data = [{'title': r['movie__title'], 'watchlisted': r['total']}
+                          for r in top_sum('watchlists')]
+
+        # --- occupancy and service reviews per auditorium ---
+        auditorium_rows = list(
+            AuditoriumDailyRollup.objects.values(
+                'auditorium_id', 'auditorium__name',
+                'auditorium__theater_id', 'auditorium__theater__name',
+            ).annotate(
+                seats=Sum('seats'),
+                booked=Sum('seats_booked'),
+                ratings=Sum('service_ratings'),
+                rating_sum=Sum('service_rating_sum'),
+            ).order_by('auditorium_id'))
+        total_seats = sum(r['seats'] for r in auditorium_rows)
+        booked_seats = sum(r['booked'] for r in auditorium_rows)
+        occupancy_rate = booked_seats / total_seats if total_seats else 0
+        auditorium_utilization = [
             {
-                "auditorium_id": r['aud_id'],
-                "auditorium": r['aud_name'],
-                "average_rating": float(
-                    r['avg_rating'] or 0)} for r in svc_aud_qs]
-
-        svc_th_qs = RateService.objects.values(
-            th_id=F('booking__showtime__auditorium__theater__id'),
-            th_name=F('booking__showtime__auditorium__theater__name'),
-        ).annotate(avg_rating=Avg('all_rating')).order_by('-avg_rating')
-        service_by_theater = [
-            {"theater_id": r['th_id'], "theater": r['th_name'], "average_rating": float(r['avg_rating'] or 0)}
-            for r in svc_th_qs
+                "auditorium_id": r['auditorium_id'],
+                "auditorium": r['auditorium__name'],
+                "occupancy_rate": r['booked'] / r['seats'] if r['seats'] else 0,
+            }
+            for r in auditorium_rows
         ]
+        service_by_auditorium = sorted(
+            [
+                {
+                    "auditorium_id": r['auditorium_id'],
+                    "auditorium": r['auditorium__name'],
+                    "average_rating": r['rating_sum'] / r['ratings'],
+                }
+                for r in auditorium_rows if r['ratings']
+            ],
+            key=lambda x: -x['average_rating'])
+        theaters = {}
+        for r in auditorium_rows:
+            if not r['ratings']:
+                continue
+            th = theaters.setdefault(r['auditorium__theater_id'], {
+                "theater_id": r['auditorium__theater_id'],
+                "theater": r['auditorium__theater__name'],
+                "ratings": 0,
+                "rating_sum": 0,
+            })
+            th['ratings'] += r['ratings']
+            th['rating_sum'] += r['rating_sum']
+        service_by_theater = sorted(
+            [
+                {"theater_id": th['theater_id'], "theater": th['theater'],
+                 "average_rating": th['rating_sum'] / th['ratings']}
+                for th in theaters.values()
+            ],
+            key=lambda x: -x['average_rating'])
 
         return Response({
             "users": {
-                "total": total_users,
+                "total": totals['users'],
                 "new_7d": new_week,
                 "new_30d": new_month,
-                "active": active_users,
-                "verified_email": verified_emails,
+                "active": totals['active'],
+                "verified_email": totals['verified'],
                 "retention_rate": retention_rate,
                 "top_by_points": top_users,
-                "growth_trend_30d": list(growth),
+                "growth_trend_30d": growth,
                 "funnel": funnel,
             },
             "bookings": {
-                "total": total_bookings,
-                "pending": pending,
-                "confirmed": confirmed,
-                "cancelled": cancelled,
-                "attended": attended,
+                "total": totals['bookings'] or 0,
+                "pending": totals['pending'] or 0,
+                "confirmed": totals['confirmed'] or 0,
+                "cancelled": totals['cancelled'] or 0,
+                "attended": totals['attended'] or 0,
                 "avg_lead_hours": avg_lead_hours,
                 "by_day_of_week": list(dow),
                 "occupancy_rate": occupancy_rate,
-                "repeat_customers": repeat_customers,
-                "one_time_customers": one_time_customers,
+                "repeat_customers": totals['repeat'],
+                "one_time_customers": totals['booked'] - totals['repeat'],
                 "auditorium_utilization": auditorium_utilization,
+                "hourly_24h": list(hourly),
             },
             "revenue": {
-                "total": total_revenue,
-                "refunds": refunds,
-                "failed_count": failed,
-                "by_movie": list(rev_by_movie),
-                "trend_30d": list(revenue_trend),
+                "total": totals['revenue'] or 0,
+                "refunds": totals['refunds'] or 0,
+                "failed_count": totals['failed'] or 0,
+                "by_movie": rev_by_movie,
+                "trend_30d": revenue_trend,
             },
             "movies": {
                 "top_booked": top_movies_data,
-                "top_rated": list(top_rated),
+                "top_rated": top_rated,
                 "most_reviewed": most_reviewed,
                 "top_watchlisted": watchlist_data,
-                "top_favorited": list(Favourite_data),
+                "top_favorited": Favourite_data,
             },
             "service_reviews": {
                 "by_auditorium": service_by_auditorium,
@@ -1113,13 +1396,65 @@ class AdminDashboardView(APIView):
         })
 
 
-class NewsViewSet(viewsets.ModelViewSet):
+class UtilizationAnalyticsView(TimingMixin, APIView):
+    """
+    Seat utilization per auditorium (``?group=auditorium``, the default)
+    or per theater (``?group=theater``), with peak hours and a
+    weekday/hour heatmap for each row. Filters: ``start`` and ``end``
+    (dates, inclusive), ``theater`` and ``auditorium`` ids; ``ordering``
+    is one of occupancy, -occupancy, name or seats.
+    """
+    permission_classes = [IsAdminUser]
+    pagination_class = StandardPagination
+
+    def parse_day(self, name, offset=0):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        day = parse_date(value)
+        if day is None:
+            raise serializers.ValidationError({name: "Use YYYY-MM-DD."})
+        return timezone.make_aware(
+            timezone.datetime.combine(day + timezone.timedelta(days=offset), timezone.datetime.min.time()))
+
+    def get(self, request):
+        params = request.query_params
+        group = params.get('group', 'auditorium')
+        if group not in analytics.GROUPS:
+            raise serializers.ValidationError({'group': f"Choose from {', '.join(analytics.GROUPS)}."})
+        ordering = params.get('ordering', 'occupancy')
+        if ordering not in analytics.ORDERINGS:
+            raise serializers.ValidationError({'ordering': f"Choose from {', '.join(analytics.ORDERINGS)}."})
+        for name in ('theater', 'auditorium'):
+            if params.get(name) and not params[name].isdigit():
+                raise serializers.ValidationError({name: "Must be an id."})
+
+        showtimes = analytics.showtimes(
+            start=self.parse_day('start'),
+            end=self.parse_day('end', offset=1),
+            theater=params.get('theater'),
+            auditorium=params.get('auditorium'),
+        )
+        paginator = self.pagination_class()
+        rows = paginator.paginate_queryset(
+            analytics.utilization(showtimes, group, ordering), request, view=self)
+        details = analytics.breakdown(showtimes, group, [row['id'] for row in rows])
+        for row in rows:
+            row['occupancy_rate'] = row['occupancy_rate'] or 0
+            row.update(details[row['id']])
+        return paginator.get_paginated_response(rows)
+
+
+class NewsViewSet(TimingMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = News.objects.all().order_by('-published_at')
     serializer_class = NewsSerializer
+    conditional_models = (News,)
+    cache_responses = True
     permission_classes = [AllowAny]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     search_fields = ['title', 'content']
-    pagination_class = StandardPagination
+    pagination_class = HybridPagination
+    cursor_ordering = ('-published_at', '-id')
     ordering_fields = ['published_at', 'title']
     ordering = ['-published_at']
 
@@ -7,7 +7,6 @@ Generated by 'django-admin startproject' using Django 5.1.6.
 import os
 from pathlib import Path
 import dj_database_url
-from celery.schedules import crontab
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -75,15 +74,72 @@ if os.getenv("RENDER", "false") == "true":
             ssl_require=True   # ensure SSL
         )
     }
+elif os.getenv("LOCAL_DATABASE_URL"):
+    # A local Postgres (e.g. the compose "db" service), used to run the
+    # booking stress tests against a real server
+    DATABASES = {
+        "default": dj_database_url.parse(os.getenv("LOCAL_DATABASE_URL"))
+    }
 else:
     # Local (even inside Docker) → SQLite
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            "OPTIONS": {
+                # concurrent bookings wait for the write lock instead of
+                # failing with "database is locked"
+                "timeout": 20,
+                "transaction_mode": "IMMEDIATE",
+            },
+            # file-backed so the concurrency tests can share it across threads
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
+        }
+    }
+
+# ------------------------------------------------------------------------------
+# Cache
+# ------------------------------------------------------------------------------
+# Local memory by default; set CACHE_URL (e.g. redis://...) to share it
+# between workers.
+if os.getenv("CACHE_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("CACHE_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "movie-theater",
         }
     }
 
+# seconds a showtime's seat map stays cached between bookings
+SEAT_MAP_CACHE_TIMEOUT = 60 * 60
+
+# seconds the compiled price rules of a showtime stay cached (see
+# management/pricing.py); rule and showtime edits drop them right away
+PRICING_CACHE_TIMEOUT = 60 * 60
+
+# anonymous catalog responses (see management/responsecache.py): how long an
+# entry lives, and how long one request may rebuild it while others wait
+RESPONSE_CACHE_TIMEOUT = 60 * 10
+RESPONSE_CACHE_LOCK_TIMEOUT = 5
+
+# checkout seat holds (see management/holds.py)
+SEAT_HOLD_STORE = os.getenv("SEAT_HOLD_STORE", "management.holds.CacheHoldStore")
+SEAT_HOLD_TTL_MINUTES = int(os.getenv("SEAT_HOLD_TTL_MINUTES", "10"))
+
+# Notification outbox: events are drained by a Celery task shortly after
+# the write commits; eager mode delivers them (and runs the watchlist /
+# favourite fan-outs) inline instead, as the test runner does.
+NOTIFICATION_OUTBOX_EAGER = os.getenv("NOTIFICATION_OUTBOX_EAGER", "false").lower() == "true"
+NOTIFICATION_OUTBOX_DELAY_SECONDS = 1
+NOTIFICATION_OUTBOX_BATCH_SIZE = 500
+
 # ------------------------------------------------------------------------------
 # Celery
 # ------------------------------------------------------------------------------
@@ -97,9 +153,20 @@ if USE_CELERY:
         CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
 
     CELERY_BEAT_SCHEDULE = {
-        'send-showtime-reminders-every-24-hours': {
-            'task': 'management.tasks.send_upcoming_showtime_reminders',
-            'schedule': crontab(hour=0, minute=0),
+        # payment reminders, unpaid booking expiry and showtime reminders;
+        # replaces the delayed per-booking tasks
+        'sweep-bookings-every-minute': {
+            'task': 'management.tasks.sweep_bookings',
+            'schedule': 60.0,
+        },
+        'refresh-dashboard-rollups-every-5-minutes': {
+            'task': 'management.tasks.refresh_dashboard_rollups',
+            'schedule': 300.0,
+        },
+        # safety net for outbox events whose drain task was lost
+        'drain-notification-outbox-every-minute': {
+            'task': 'management.tasks.drain_notification_outbox',
+            'schedule': 60.0,
         },
     }
 else:
@@ -127,6 +194,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so its Server-Timing total covers the whole stack
+    'management.timing.ServerTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -138,6 +207,14 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# per-request timing log (see management/timing.py): the share of requests
+# logged, and the duration from which a request is always logged together
+# with its repeated queries
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv("REQUEST_LOG_SAMPLE_RATE", "0.01"))
+SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", "500"))
+# send the Server-Timing header to every client, not only to staff users
+SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "false").lower() == "true"
+
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
@@ -178,6 +255,7 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 # ------------------------------------------------------------------------------
 ROOT_URLCONF = 'movie_theater.urls'
 WSGI_APPLICATION = 'movie_theater.wsgi.application'
+TEST_RUNNER = 'movie_theater.test_runner.TestRunner'
 
 TEMPLATES = [
     {
@@ -0,0 +1,26 @@
+"""
+Test runner of ``manage.py test``: runs the suite with the settings tests
+need instead of the production ones, without a broker or request logs.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_SETTINGS = {
+    # deliver the outbox and run the notification fan-outs inline
+    'NOTIFICATION_OUTBOX_EAGER': True,
+    # no sampled or slow request log lines in the test output
+    'REQUEST_LOG_SAMPLE_RATE': 0.0,
+    'SLOW_REQUEST_MS': None,
+}
+
+
+class TestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.test_settings = override_settings(**TEST_SETTINGS)
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        super().teardown_test_environment(**kwargs)
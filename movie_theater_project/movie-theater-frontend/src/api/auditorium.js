@@ -1,6 +1,6 @@
 import { api } from './axios';
 // src/api/auditorium.js
-export const fetchAuditoriums = () => api.get('/api/auditoriums/');
-export const fetchAuditorium = id => api.get(`/api/auditoriums/${id}/`);
+export const fetchAuditoriums = () => api.get('/api/auditoriums/?expand=theater');
+export const fetchAuditorium = id => api.get(`/api/auditoriums/${id}/?expand=theater`);
 export const fetchAuditoriumByTheater = theaterId =>
-  api.get(`/api/theaters/${theaterId}/auditoriums/`);
\ No newline at end of file
+  api.get(`/api/theaters/${theaterId}/auditoriums/?expand=theater`);
\ No newline at end of file
@@ -35,4 +35,15 @@ api.interceptors.request.use(
   (error) => Promise.reject(error)
 );
 
+// paginated lists (cursor or page number): follow `next` to collect them all
+export async function fetchAllPages(url) {
+  let results = [];
+  while (url) {
+    const res = await api.get(url);
+    results = results.concat(res.data.results);
+    url = res.data.next;
+  }
+  return { data: results };
+}
+
 export { api };
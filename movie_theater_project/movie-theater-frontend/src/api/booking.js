@@ -1,25 +1,28 @@
 import { api, fetchCSRFToken } from './axios';
 
+const EXPAND = 'expand=seats,showtime.movie,showtime.auditorium.theater';
+
 
 // src/api/booking.js
-export async function createBooking(showtimeId, seatIds) {
+// seats are sent by number so layout seats without a row can be booked too
+export async function createBooking(showtimeId, seatNumbers) {
   await fetchCSRFToken();
   return await api.post('/api/bookings/', {
     showtime_id: showtimeId,
-    seat_ids: seatIds
+    seat_numbers: seatNumbers
   });
 }
 
 export const fetchBookingById = (bookingId) =>
-  api.get(`/api/bookings/${bookingId}/`);
+  api.get(`/api/bookings/${bookingId}/?${EXPAND}`);
 export const fetchBookingsByUser = (userId, page = 1, pageSize = 10) =>
-  api.get(`/api/bookings/?user=${userId}&page=${page}&page_size=${pageSize}`);
+  api.get(`/api/bookings/?user=${userId}&page=${page}&page_size=${pageSize}&${EXPAND}`);
 export const cancelBooking = async (bookingId) => {
   await fetchCSRFToken();
   await api.delete(`/api/bookings/${bookingId}/`);
 };
 export const fetchBookingDetails = fetchBookingById;  // alias for simplicity
-export const updateBooking = async (bookingId, seatIds) => {
+export const updateBooking = async (bookingId, seatNumbers) => {
   await fetchCSRFToken();
-  return await api.patch(`/api/bookings/${bookingId}/`, { seat_ids: seatIds });
+  return await api.patch(`/api/bookings/${bookingId}/?${EXPAND}`, { seat_ids: [], seat_numbers: seatNumbers });
 }
\ No newline at end of file
@@ -1,10 +1,12 @@
 // src/api/movies.js
 import { api } from './axios';
 
-export const fetchMovies = (page = 1) => api.get(`/api/movies/?page=${page}`);
-export const fetchMoviesByPage = (page) => api.get(`/api/movies/?page=${page}`);
-export const fetchMovieById = id => api.get(`/api/movies/${id}/`);
-export const fetchMovieByActor = actorId => api.get(`/api/actors/${actorId}/movies/`);
-export const fetchMovieByDirector = directorId => api.get(`/api/directors/${directorId}/movies/`);
-export const fetchMovieByProducer = producerId => api.get(`/api/producers/${producerId}/movies/`);
-export const searchMovies = (query, page = 1) => api.get(`/api/movies/?search=${query}&page=${page}`);
\ No newline at end of file
+const EXPAND = 'expand=genres,director,producer,actors';
+
+export const fetchMovies = (page = 1) => api.get(`/api/movies/?page=${page}&${EXPAND}`);
+export const fetchMoviesByPage = (page) => api.get(`/api/movies/?page=${page}&${EXPAND}`);
+export const fetchMovieById = id => api.get(`/api/movies/${id}/?${EXPAND}`);
+export const fetchMovieByActor = actorId => api.get(`/api/actors/${actorId}/movies/?${EXPAND}`);
+export const fetchMovieByDirector = directorId => api.get(`/api/directors/${directorId}/movies/?${EXPAND}`);
+export const fetchMovieByProducer = producerId => api.get(`/api/producers/${producerId}/movies/?${EXPAND}`);
+export const searchMovies = (query, page = 1) => api.get(`/api/movies/?search=${query}&page=${page}&${EXPAND}`);
\ No newline at end of file
@@ -1,6 +1,7 @@
-import { api,fetchCSRFToken } from './axios';
+import { api, fetchAllPages, fetchCSRFToken } from './axios';
 
-export const fetchNotifications  = () => api.get('/api/notifications/');
+// newest first; the list is paginated by cursor
+export const fetchNotifications  = () => fetchAllPages('/api/notifications/?page_size=100');
 export const markNotificationRead = async id => {
   await fetchCSRFToken();
   return await api.patch(`/api/notifications/${id}/`, {
@@ -11,10 +11,10 @@ export async function createReview(movieId, { content, rating, anonymous }) {
   });
 }
 export function fetchReviewsByMovie(movieId) {
-  return api.get(`/api/movies/${movieId}/reviews/`);
+  return api.get(`/api/movies/${movieId}/reviews/?expand=user`);
 }
 export function fetchReviewsByUser(userId, page = 1, pageSize = 10) {
-  return api.get(`/api/reviews/?user=${userId}&page=${page}&page_size=${pageSize}`);
+  return api.get(`/api/reviews/?user=${userId}&page=${page}&page_size=${pageSize}&expand=movie`);
 }
 
 export async function handleDeleteReview(reviewId) {
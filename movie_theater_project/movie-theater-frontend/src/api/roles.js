@@ -2,8 +2,8 @@ import { api } from './axios';
 
 // src/api/booking.js
 export function fetchRolesByMovie(movieId) {
-  return api.get(`/api/movies/${movieId}/roles/`);
+  return api.get(`/api/movies/${movieId}/roles/?expand=actor,movie`);
 }
 export function fetchRole(roleId) {
-  return api.get(`/api/roles/${roleId}/`);
+  return api.get(`/api/roles/${roleId}/?expand=actor,movie`);
 }
\ No newline at end of file
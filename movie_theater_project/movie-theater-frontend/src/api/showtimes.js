@@ -1,13 +1,16 @@
 // src/api/movies.js
-import { api} from './axios';
+import { api, fetchAllPages } from './axios';
 
-export const fetchShowtimes = () => api.get('/api/showtimes/');
-export const fetchShowtimeById = id => api.get(`/api/showtimes/${id}/`);
+// the API returns related objects as ids unless they are expanded
+const EXPAND = 'expand=movie.genres,auditorium.theater';
+
+export const fetchShowtimes = () => fetchAllPages(`/api/showtimes/?page_size=100&${EXPAND}`);
+export const fetchShowtimeById = id => api.get(`/api/showtimes/${id}/?${EXPAND}`);
 export const fetchShowtimesByMovie = movieId =>
-  api.get(`/api/movies/${movieId}/showtimes/`);
+  api.get(`/api/movies/${movieId}/showtimes/?${EXPAND}`);
 export const fetchShowtimesByTheater = theaterId =>
-  api.get(`/api/theaters/${theaterId}/showtimes/`);
+  api.get(`/api/theaters/${theaterId}/showtimes/?${EXPAND}`);
 export const fetchShowtimesByDate = date =>
-  api.get(`/api/showtimes/?date=${date}`);  
+  fetchAllPages(`/api/showtimes/?date=${date}&page_size=100&${EXPAND}`);  
 export const searchShowtimes = query =>
-  api.get(`/api/showtimes/?search=${query}`);
\ No newline at end of file
+  fetchAllPages(`/api/showtimes/?search=${query}&page_size=100&${EXPAND}`);
\ No newline at end of file
@@ -3,13 +3,13 @@ import { api, fetchCSRFToken } from './axios';
 // GET list filtered by user id
 export const fetchWatchlistByUser = (userId, page = 1, pageSize = 10) => {
   // If pageSize is large (e.g., 1000), fetch all items for checking
-  const url = `/api/watchlist/?user=${userId}&page=${page}&page_size=${pageSize}`;
+  const url = `/api/watchlist/?user=${userId}&page=${page}&page_size=${pageSize}&expand=movie.genres`;
   return api.get(url);
 };
 // POST to create a new entry (user is implicit via perform_create)
 export const addToWatchlist = async movieId => {
   await fetchCSRFToken();
-  return await api.post(`/api/watchlist/`, { movie_id: movieId });
+  return await api.post(`/api/watchlist/?expand=movie`, { movie_id: movieId });
 };
 
 // DELETE by the watchlist‐item’s own ID
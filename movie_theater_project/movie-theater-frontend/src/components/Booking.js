@@ -31,9 +31,9 @@ const handleConfirm = async e => {
   e.preventDefault();
   if (loading) return;
   setLoading(true);
-  const seatIds = seats.map(s => s.id);
+  const seatNumbers = seats.map(s => s.seat_number);
   await fetchCSRFToken();
-  createBooking(showtimeId, seatIds)
+  createBooking(showtimeId, seatNumbers)
     .then(resp => setBooking(resp.data))
     .then(() => reloadNotifs())
     .catch(err => {
@@ -46,6 +46,7 @@ const handleConfirm = async e => {
       const data = err.response?.data || {};
       const fieldErrors = [];
       if (data.seat_ids)      fieldErrors.push(...data.seat_ids);
+      if (data.seat_numbers)  fieldErrors.push(...data.seat_numbers);
       if (data.showtime_id)   fieldErrors.push(...data.showtime_id);
       if (data.detail)        fieldErrors.push(data.detail);
       setError(fieldErrors.length
@@ -40,7 +40,7 @@ export default function BookingDetail() {
   useEffect(() => {
     if (editing && booking) {
       // Initialize with current booked seats
-      setSelectedSeatIds(booking.seats.map(s => s.id));
+      setSelectedSeatIds(booking.seats.map(s => s.seat_number));
 
       fetchAvailableSeats(booking.showtime.id)
         .then(resp => setAvailableSeats(resp.data))
@@ -70,7 +70,7 @@ export default function BookingDetail() {
   const editableSeats = editing
     ? [
         ...booking.seats,
-        ...availableSeats.filter(a => !booking.seats.some(s => s.id === a.id))
+        ...availableSeats.filter(a => !booking.seats.some(s => s.seat_number === a.seat_number))
       ]
     : [];
 
@@ -117,14 +117,14 @@ export default function BookingDetail() {
         <div className="edit-form">
           <h3>Edit Seats</h3>
           {editableSeats.map(seat => (
-            <label key={seat.id} style={{ display:'block', margin:'.5rem 0' }}>
+            <label key={seat.seat_number} style={{ display:'block', margin:'.5rem 0' }}>
               <input
                 type="checkbox"
-                value={seat.id}
-                checked={selectedSeatIds.includes(seat.id)}
+                value={seat.seat_number}
+                checked={selectedSeatIds.includes(seat.seat_number)}
                 disabled={new Date(booking.showtime.start_time) <= new Date()}
                 onChange={e => {
-                  const sid = parseInt(e.target.value, 10);
+                  const sid = e.target.value;
                   setSelectedSeatIds(sel =>
                     e.target.checked
                       ? [...sel, sid]
@@ -59,12 +59,14 @@ function ShowtimeDetail() {
   const toggleSelect = seat => {
     if (seat.is_booked) return;
     setSelected(sel =>
-      sel.includes(seat.id) ? sel.filter(x => x !== seat.id) : [...sel, seat.id]
+      sel.includes(seat.seat_number)
+        ? sel.filter(x => x !== seat.seat_number)
+        : [...sel, seat.seat_number]
     );
   };
 
   // Sum up prices
-  const selectedSeatObjs = seats.filter(s => selected.includes(s.id));
+  const selectedSeatObjs = seats.filter(s => selected.includes(s.seat_number));
   const totalCost = selectedSeatObjs
     .map(seat => seat.price)
     .reduce((sum, price) => sum + Number(price), 0);
@@ -107,8 +109,8 @@ function ShowtimeDetail() {
         {seats.length === 0 && <p className="loading">Seats will be added later</p>}
         {seats.map(seat => (
           <button
-            key={seat.id}
-            className={`seat ${seat.is_booked ? 'booked' : selected.includes(seat.id) ? 'selected' : 'available'}`}
+            key={seat.seat_number}
+            className={`seat ${seat.is_booked ? 'booked' : selected.includes(seat.seat_number) ? 'selected' : 'available'}`}
             onClick={() => toggleSelect(seat)}
             disabled={seat.is_booked}
           >
@@ -127,7 +129,7 @@ function ShowtimeDetail() {
           </thead>
           <tbody>
             {selectedSeatObjs.map(s => (
-              <tr key={s.id}>
+              <tr key={s.seat_number}>
                 <td>{s.seat_number}</td>
                 <td>${s.price}</td>
               </tr>